@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+学期统计基准测试
+
+对比「逐日调用 get_courses_on_date 再累加」与 SemesterAnalytics（在学期占用数组上
+归约）统计一个学期课次、学时和空闲天数的耗时，结果以JSON输出。
+
+    python benchmarks/bench_analytics.py --courses 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import generate_courses  # noqa: E402
+
+
+def naive_stats(manager, semester):
+    """逐日取当天课程，逐门累加课次和学时"""
+    start, end = manager.get_semester_dates(semester)
+    class_schedule = manager.get_class_schedule()
+    sessions = minutes = free_days = 0
+    course_totals = Counter()
+    day = start
+    while day <= end:
+        courses = sc.get_courses_on_date(day, manager)
+        if not courses:
+            free_days += 1
+        for course in courses:
+            duration = class_schedule.for_course(course).duration(course.sections)
+            sessions += 1
+            minutes += duration
+            course_totals[course.name] += duration
+        day += sc.timedelta(days=1)
+    return sessions, minutes, free_days, course_totals
+
+
+def measure(args):
+    manager = sc.data_manager
+    manager.extend_courses(generate_courses(args.courses, seed=args.seed))
+    courses = manager.get_courses()
+
+    start = time.perf_counter()
+    naive = naive_stats(manager, args.semester)
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analytics = sc.SemesterAnalytics(manager, args.semester)
+    layout_time = time.perf_counter() - start
+    start = time.perf_counter()
+    stats = analytics.compute(courses)
+    compute_time = time.perf_counter() - start
+
+    return {
+        "courses": args.courses,
+        "semester": args.semester,
+        "days": stats.days,
+        "sessions": stats.sessions,
+        "matches_naive": (stats.sessions, stats.minutes, stats.free_days) == naive[:3],
+        "naive_s": round(naive_time, 3),
+        "layout_ms": round(layout_time * 1e3, 3),
+        "compute_s": round(compute_time, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--semester", choices=("fall", "spring"), default="fall")
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(measure(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+数据模型基准测试
+
+用合成课表对比原始JSON字典与 Course 模型（__slots__）的内存占用、加载时间
+和按周次/星期筛选课程的耗时，结果以JSON输出。
+
+    python benchmarks/bench_data_model.py --courses 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import generate_courses  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def traced_memory(func):
+    """func返回的对象所占用的内存（字节）"""
+    tracemalloc.start()
+    result = func()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # 测量时result必须仍然存活
+    del result
+    return current
+
+
+def filter_dicts(courses, week, weekday):
+    """与改造前 get_courses_on_date 相同的字典访问方式"""
+    return [c for c in courses if week in c.get("weeks", []) and weekday == c.get("weekday")]
+
+
+def filter_models(courses, week, weekday):
+    bit = 1 << week
+    return [c for c in courses if c.weekday == weekday and c.week_mask & bit]
+
+
+def measure(args):
+    payload = json.dumps(generate_courses(args.courses, seed=args.seed), ensure_ascii=False)
+
+    def load_dicts():
+        return json.loads(payload)
+
+    def load_models():
+        return sc.decode_records("courses", json.loads(payload))
+
+    dict_load, dicts = timed(load_dicts)
+    model_load, models = timed(load_models)
+    dict_memory = traced_memory(load_dicts)
+    model_memory = traced_memory(load_models)
+
+    queries = [(week, weekday) for week in range(1, 21) for weekday in range(1, 8)]
+    dict_query, _ = timed(lambda: [filter_dicts(dicts, *query) for query in queries])
+    model_query, _ = timed(lambda: [filter_models(models, *query) for query in queries])
+
+    # 逐门课程读取常用字段
+    dict_access, _ = timed(lambda: sum(len(c.get("sections", [])) + c.get("weekday", 1)
+                                       + len(c.get("name", "")) for c in dicts))
+    model_access, _ = timed(lambda: sum(len(c.sections) + c.weekday + len(c.name) for c in models))
+
+    save_time, _ = timed(lambda: json.dumps(sc.encode_section("courses", models), ensure_ascii=False))
+
+    return {
+        "courses": args.courses,
+        "dict": {
+            "memory_mb": round(dict_memory / 2 ** 20, 2),
+            "load_s": round(dict_load, 3),
+            "query_ms": round(dict_query / len(queries) * 1e3, 3),
+            "field_access_ms": round(dict_access * 1e3, 2),
+        },
+        "model": {
+            "memory_mb": round(model_memory / 2 ** 20, 2),
+            "load_s": round(model_load, 3),
+            "query_ms": round(model_query / len(queries) * 1e3, 3),
+            "field_access_ms": round(model_access * 1e3, 2),
+            "encode_and_dump_s": round(save_time, 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(measure(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+热点路径基准测试
+
+用固定种子生成的合成数据（N门课程、M条重要日期、K份课表，学期长度可调），在
+offscreen Qt平台下测量数据加载和保存、周次和当天课程查询、主窗口各表格刷新、
+Excel导入和上课提醒检查的耗时。结果以JSON输出，用 --baseline 指定之前版本的
+结果文件时附带耗时比值，便于对比。
+
+    python benchmarks/bench_hot_paths.py --courses 20000 --events 5000 --output before.json
+    python benchmarks/bench_hot_paths.py --courses 20000 --events 5000 --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QSettings, QT_VERSION_STR  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import (excel_rows, generate_courses, generate_events,  # noqa: E402
+                       generate_semesters, generate_tenants)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample(func, runs):
+    """调用func runs次，返回每次的耗时（秒）"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples, calls=1):
+    """耗时汇总；calls为每次调用内部的操作数，用于换算单次操作的耗时"""
+    result = {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1e3, 3),
+        "min_ms": round(min(samples) * 1e3, 3),
+        "max_ms": round(max(samples) * 1e3, 3),
+    }
+    if calls > 1:
+        result["calls"] = calls
+        result["per_call_us"] = round(statistics.median(samples) / calls * 1e6, 3)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def semester_days(manager):
+    days = []
+    for key in ("fall", "spring"):
+        start, end = manager.get_semester_dates(key)
+        days.extend(start + timedelta(days=offset) for offset in range((end - start).days + 1))
+    return days
+
+
+def prepare_data(args):
+    """把合成数据写入临时数据目录，并让 data_manager 重新加载"""
+    document = dict(sc.DEFAULT_DATA)
+    document["semesters"] = generate_semesters(args.weeks)
+    fall_year = int(document["semesters"]["fall"]["start_date"][:4])
+    document["courses"] = generate_courses(args.courses, seed=args.seed)
+    document["important_dates"] = generate_events(args.events, start_year=fall_year, years=2,
+                                                  seed=args.seed)
+    if hasattr(sc, "profile_manager"):
+        profile = sc.profile_manager.active
+        os.makedirs(sc.get_profile_dir(profile), exist_ok=True)
+        data_file = sc.get_data_file(profile)
+    else:
+        # 没有档案的旧版本：数据文件直接放在数据目录中；这些版本不读取 CALENDAR_DATA_DIR，
+        # 把数据目录指向临时目录，以免改动该版本的 data/
+        data_dir = os.environ["CALENDAR_DATA_DIR"]
+        sc.get_data_dir = lambda: data_dir
+        data_file = sc.get_data_file()
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False)
+    reopen(sc.data_manager)
+    return sc.data_manager
+
+
+def reopen(manager):
+    """重新加载数据并让按数据代数缓存的结果失效（旧版本没有 open_profile）"""
+    if hasattr(manager, "open_profile"):
+        manager.open_profile(manager.profile)
+    else:
+        manager.load_data()
+
+
+def skipped(reason):
+    return {"skipped": reason}
+
+
+def measure(args):
+    # 界面设置写到临时目录，不影响本机的校历助手
+    settings_dir = os.path.join(os.environ["CALENDAR_DATA_DIR"], "settings")
+    for settings_format in (QSettings.NativeFormat, QSettings.IniFormat):
+        QSettings.setPath(settings_format, QSettings.UserScope, settings_dir)
+    app = QApplication.instance() or QApplication([])
+    settings = QSettings(sc.APP_KEY, sc.APP_NAME)
+    settings.setValue("first_run_done", True)
+    settings.setValue("day_before_reminder", False)
+
+    manager = prepare_data(args)
+    results = {}
+    results["load_data"] = summarize(sample(manager.load_data, args.runs))
+    # load_data 不递增数据代数，之后重新打开一次让缓存失效
+    reopen(manager)
+    results["save_data"] = summarize(sample(manager.save_data, args.runs))
+
+    # 日期类型表和学期课次表是后来加入的，对比旧版本时跳过
+    days = semester_days(manager)
+    for name, model in (("day_table_build", "DayTable"), ("term_schedule_build", "TermSchedule")):
+        if hasattr(sc, model):
+            results[name] = summarize(sample(lambda: getattr(sc, model)(manager), args.runs))
+        else:
+            results[name] = skipped(f"{model} not available")
+    if hasattr(manager, "get_term_schedule"):
+        manager.get_term_schedule()
+    # 查询的是全局 data_manager，旧版本的这两个函数没有 manager 参数
+    results["get_week_number"] = summarize(
+        sample(lambda: [sc.get_week_number(day) for day in days], args.runs), len(days))
+    results["get_courses_on_date"] = summarize(
+        sample(lambda: [sc.get_courses_on_date(day) for day in days], args.runs), len(days))
+
+    start = time.perf_counter()
+    window = sc.CalendarApp()
+    results["window_startup"] = summarize([time.perf_counter() - start])
+    # 只测量检查本身，不弹出提醒窗口
+    window.show_class_alarm = lambda course, start_time: None
+    for name in ("populate_week_table", "highlight_course_dates", "populate_events_table",
+                 "check_class_alarm"):
+        results[name] = summarize(sample(getattr(window, name), args.runs))
+
+    if not hasattr(sc, "TimetableStore"):
+        results["load_timetables"] = skipped("TimetableStore not available")
+    elif args.timetables:
+        tenants_dir = tempfile.mkdtemp(prefix="calendar_tenants_", dir=os.environ["CALENDAR_DATA_DIR"])
+        for tenant_id, courses in generate_tenants(args.timetables, args.courses_per_timetable,
+                                                   seed=args.seed).items():
+            with open(os.path.join(tenants_dir, f"{tenant_id}.json"), "w", encoding="utf-8") as f:
+                json.dump(courses, f, ensure_ascii=False)
+        results["load_timetables"] = summarize(
+            sample(lambda: sc.TimetableStore(manager).load_directory(tenants_dir), args.runs))
+
+    try:
+        import openpyxl
+    except ImportError:
+        openpyxl = None
+    if openpyxl is None:
+        results["excel_import"] = skipped("openpyxl not installed")
+    elif not hasattr(sc, "read_excel_courses"):
+        results["excel_import"] = skipped("read_excel_courses not available")
+    else:
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(["课程名", "教师", "教室", "星期", "节次", "周次"])
+        for row in excel_rows(generate_courses(args.excel_courses, seed=args.seed)):
+            sheet.append(row)
+        excel_path = os.path.join(os.environ["CALENDAR_DATA_DIR"], "courses.xlsx")
+        workbook.save(excel_path)
+        results["excel_import"] = summarize(
+            sample(lambda: sc.read_excel_courses(excel_path), args.runs))
+        courses = sc.read_excel_courses(excel_path)
+        # 追加会改变数据，只测一次并放在最后
+        results["excel_import_extend"] = summarize(
+            sample(lambda: manager.extend_courses(courses), 1))
+
+    window.tray_icon.hide()
+    window.deleteLater()
+    app.processEvents()
+    return results
+
+
+def compare(results, baseline):
+    """在每项结果中附上基准版本的中位数耗时和比值（小于1表示变快）"""
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name, {}).get("median_ms")
+        if before and "median_ms" in result:
+            result["baseline_median_ms"] = before
+            result["ratio"] = round(result["median_ms"] / before, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--weeks", type=int, default=20, help="每个学期的周数")
+    parser.add_argument("--timetables", type=int, default=1000, help="多租户课表份数，0为不测")
+    parser.add_argument("--courses-per-timetable", type=int, default=20)
+    parser.add_argument("--excel-courses", type=int, default=2000, help="Excel导入的课程数")
+    parser.add_argument("--runs", type=int, default=5, help="每项重复测量的次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="同时把结果写入此文件")
+    parser.add_argument("--baseline", help="之前版本的结果文件")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "app_version": sc.APP_VERSION,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+            "time": datetime.now().isoformat(timespec="seconds"),
+        },
+        "params": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "baseline")},
+        "results": measure(args),
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(report["results"], json.load(f))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
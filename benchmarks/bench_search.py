@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+搜索索引基准测试
+
+用合成课表和重要日期建立 SearchIndex，测量建索引时间、增量更新时间，以及
+逐字输入时每次查询的耗时（与逐条扫描全部记录对比），结果以JSON输出。
+
+    python benchmarks/bench_search.py --courses 100000 --events 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import generate_courses, generate_events  # noqa: E402
+
+# 模拟逐字输入：每个查询的各个前缀都查询一次
+QUERIES = ["高等数学", "gdsx", "张老师", "第三教学楼2", "期末考试", "jyshy", "经济学"]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def scan(courses, events, query):
+    """不使用索引：逐条检查各字段"""
+    query = sc.normalize_search_text(query)
+    found = []
+    for course in courses:
+        for text in (course.name, course.teacher, course.location):
+            text = sc.normalize_search_text(text)
+            if query in text or query in sc.pinyin_initials(text):
+                found.append(course)
+                break
+    for item in events:
+        for text in (item.event, item.category):
+            text = sc.normalize_search_text(text)
+            if query in text or query in sc.pinyin_initials(text):
+                found.append(item)
+                break
+    return found
+
+
+def measure(args):
+    courses = sc.decode_records("courses", generate_courses(args.courses, seed=args.seed))
+    events = sc.decode_records("important_dates", generate_events(args.events, seed=args.seed))
+    index = sc.SearchIndex()
+    build, _ = timed(lambda: (index.sync_courses("local", courses), index.sync_events("local", events)))
+    
+    keystrokes = [query[:length] for query in QUERIES for length in range(1, len(query) + 1)]
+    times = []
+    for text in keystrokes:
+        elapsed, _ = timed(lambda: index.search(text))
+        times.append(elapsed)
+    times.sort()
+    
+    scan_time, _ = timed(lambda: [scan(courses, events, query) for query in QUERIES])
+    
+    # 增量更新：追加一门课程后重新同步
+    added = courses + sc.decode_records("courses", generate_courses(1, seed=args.seed + 1))
+    update, _ = timed(lambda: index.sync_courses("local", added))
+    
+    return {
+        "courses": args.courses,
+        "events": args.events,
+        "documents": len(index),
+        "terms": len(index.grams) + len(index.prefixes),
+        "pinyin": "pypinyin" if sc.lazy_pinyin else "gb2312",
+        "build_s": round(build, 3),
+        "incremental_sync_ms": round(update * 1e3, 2),
+        "keystrokes": len(keystrokes),
+        "search_median_ms": round(times[len(times) // 2] * 1e3, 3),
+        "search_max_ms": round(times[-1] * 1e3, 3),
+        "scan_per_query_ms": round(scan_time / len(QUERIES) * 1e3, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(measure(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
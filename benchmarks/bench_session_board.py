@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+批量上课状态基准测试
+
+对比「每分钟对每个学生调用 courses_on 并逐门判断」与 SessionBoard（全局上下课
+时间线）计算所有学生当前/下一节课程的耗时，结果以JSON输出。
+
+    python benchmarks/bench_session_board.py --tenants 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import generate_tenants  # noqa: E402
+
+
+def naive_tick(store, class_minutes, now):
+    """逐个学生查询当天课程，再按节次时间判断当前和下一节"""
+    minute = now.hour * 60 + now.minute
+    result = {}
+    for tenant_id in store.tenants:
+        current = following = None
+        for record in store.courses_on(tenant_id, now.date()):
+            span = class_minutes.get(record.sections[0]), class_minutes.get(record.sections[-1])
+            if not span[0] or not span[1]:
+                continue
+            start, end = span[0][0], span[1][1]
+            if start <= minute < end:
+                current = record
+            elif start > minute and following is None:
+                following = record
+        result[tenant_id] = (current, following)
+    return result
+
+
+def measure(args):
+    store = sc.TimetableStore()
+    for tenant_id, courses in generate_tenants(args.tenants, args.courses, args.catalog,
+                                               seed=args.seed).items():
+        store.set_tenant(tenant_id, courses)
+
+    class_minutes = {
+        section: (sc._hm_to_minutes(start), sc._hm_to_minutes(end))
+        for section, (start, end) in sc.data_manager.get_class_times().items()
+    }
+    fall_start, _ = sc.data_manager.get_semester_dates("fall")
+    day = datetime.combine(fall_start + timedelta(days=args.day), datetime.min.time())
+    ticks = [day + timedelta(minutes=minute) for minute in range(0, 24 * 60, args.interval)]
+
+    # 逐个学生计算太慢，只抽样若干次取平均
+    sample = ticks[::max(1, len(ticks) // args.naive_samples)]
+    start = time.perf_counter()
+    for now in sample:
+        naive_tick(store, class_minutes, now)
+    naive_per_tick = (time.perf_counter() - start) / len(sample)
+
+    board = sc.SessionBoard(store)
+    start = time.perf_counter()
+    board.build(day.date(), 0)
+    build = time.perf_counter() - start
+
+    changed = 0
+    start = time.perf_counter()
+    for now in ticks:
+        changed += len(board.advance(now))
+    board_per_tick = (time.perf_counter() - start) / len(ticks)
+
+    # 正常刷新时的整表快照：前一分钟已经推进过
+    board.advance(day + timedelta(hours=10))
+    start = time.perf_counter()
+    board.snapshot(day + timedelta(hours=10, minutes=1))
+    snapshot = time.perf_counter() - start
+
+    return {
+        "tenants": args.tenants,
+        "ticks": len(ticks),
+        "boundaries": len(board.boundary_minutes),
+        "naive_tick_ms": round(naive_per_tick * 1e3, 3),
+        "board_build_ms": round(build * 1e3, 3),
+        "board_tick_ms": round(board_per_tick * 1e3, 3),
+        "board_snapshot_ms": round(snapshot * 1e3, 3),
+        "changed_per_tick": round(changed / len(ticks), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=20, help="每名学生的课程数")
+    parser.add_argument("--catalog", type=int, default=3000, help="开课目录大小")
+    parser.add_argument("--day", type=int, default=15, help="秋季学期开始后的第几天")
+    parser.add_argument("--interval", type=int, default=1, help="两次刷新之间的分钟数")
+    parser.add_argument("--naive-samples", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(measure(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
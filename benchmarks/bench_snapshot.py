@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+二进制快照基准测试
+
+用合成课表和重要日期写入JSON数据文件，对比冷启动时解析JSON与读取二进制快照的
+耗时，并检查两者加载出的数据完全相同，结果以JSON输出。
+
+    python benchmarks/bench_snapshot.py --courses 100000 --events 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import generate_courses, generate_events  # noqa: E402
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(args):
+    document = sc.encode_document(sc.data_manager.data)
+    document["courses"] = generate_courses(args.courses, seed=args.seed)
+    document["important_dates"] = generate_events(args.events, seed=args.seed)
+    path = os.path.join(tempfile.mkdtemp(prefix="calendar_snapshot_"), "calendar_data.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    backend = sc.JsonFileBackend(path)
+
+    def load_json():
+        with open(path, "r", encoding="utf-8") as f:
+            return sc.decode_document(json.load(f))
+
+    json_load, from_json = best_of(load_json, args.repeat)
+    with open(path, "rb") as f:
+        source = sc.snapshot_source(os.fstat(f.fileno()), f.read())
+    start = time.perf_counter()
+    sc.write_snapshot(backend.snapshot_path, source, from_json)
+    snapshot_write = time.perf_counter() - start
+    snapshot_load, from_snapshot = best_of(lambda: sc.read_snapshot(backend.snapshot_path, path),
+                                           args.repeat)
+
+    # 内容相同但修改时间变了（如复制或touch过），需要校验内容哈希
+    os.utime(path)
+    rehash_load, _ = best_of(lambda: sc.read_snapshot(backend.snapshot_path, path), 1)
+
+    return {
+        "courses": args.courses,
+        "events": args.events,
+        "json_mb": round(os.path.getsize(path) / 2 ** 20, 2),
+        "snapshot_mb": round(os.path.getsize(backend.snapshot_path) / 2 ** 20, 2),
+        "json_load_s": round(json_load, 3),
+        "snapshot_write_s": round(snapshot_write, 3),
+        "snapshot_load_s": round(snapshot_load, 3),
+        "snapshot_load_after_touch_s": round(rehash_load, 3),
+        "speedup": round(json_load / snapshot_load, 1),
+        "identical": sc.encode_document(from_json) == sc.encode_document(from_snapshot),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(measure(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
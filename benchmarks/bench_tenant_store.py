@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+多租户课表存储基准测试
+
+用合成数据对比「每个学生一份课程字典」与 TimetableStore（共享课程记录）的
+内存占用、加载时间和单次查询延迟，结果以JSON输出。
+
+    python benchmarks/bench_tenant_store.py --tenants 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import generate_tenants  # noqa: E402
+
+
+def naive_courses_on(courses, target_date):
+    """与 get_courses_on_date 相同的逐门课程过滤"""
+    semester, week_num = sc.get_week_number(target_date)
+    if not semester:
+        return []
+    weekday = target_date.weekday() + 1
+    result = [c for c in courses if week_num in c.get("weeks", []) and weekday == c.get("weekday")]
+    return sorted(result, key=lambda c: c.get("sections", [0])[0])
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def traced_memory(func):
+    """func返回的对象所占用的内存（字节）"""
+    tracemalloc.start()
+    result = func()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # 测量时result必须仍然存活
+    del result
+    return current
+
+
+def measure(args):
+    tenants = generate_tenants(args.tenants, args.courses, args.catalog, seed=args.seed)
+    payload = json.dumps(tenants, ensure_ascii=False)
+    del tenants
+
+    def load_naive():
+        return json.loads(payload)
+
+    def load_store():
+        store = sc.TimetableStore()
+        for tenant_id, courses in json.loads(payload).items():
+            store.set_tenant(tenant_id, courses)
+        return store
+
+    # 加载时间不开tracemalloc，内存单独再加载一次测量
+    naive_load, naive = timed(load_naive)
+    store_load, store = timed(load_store)
+    naive_memory = traced_memory(load_naive)
+    store_memory = traced_memory(load_store)
+
+    rng = random.Random(args.seed)
+    fall_start, _ = sc.data_manager.get_semester_dates("fall")
+    tenant_ids = list(naive)
+    queries = [(rng.choice(tenant_ids), fall_start + timedelta(days=rng.randint(0, 111)))
+               for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    for tenant_id, day in queries:
+        naive_courses_on(naive[tenant_id], day)
+    naive_query = (time.perf_counter() - start) / len(queries)
+
+    start = time.perf_counter()
+    for tenant_id, day in queries:
+        store.courses_on(tenant_id, day)
+    store_query = (time.perf_counter() - start) / len(queries)
+
+    return {
+        "tenants": args.tenants,
+        "courses_per_tenant": args.courses,
+        "store": store.stats(),
+        "dict_per_tenant": {
+            "memory_mb": round(naive_memory / 2 ** 20, 2),
+            "load_s": round(naive_load, 3),
+            "query_us": round(naive_query * 1e6, 2),
+        },
+        "timetable_store": {
+            "memory_mb": round(store_memory / 2 ** 20, 2),
+            "load_s": round(store_load, 3),
+            "query_us": round(store_query * 1e6, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=20, help="每名学生的课程数")
+    parser.add_argument("--catalog", type=int, default=3000, help="开课目录大小")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(measure(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+常驻托盘进程的浸泡测试
+
+在offscreen Qt平台下创建主窗口，用虚拟时钟模拟数周的运行：每次把时钟拨到刷新
+定时器的下一次触发时刻并执行回调，每天修改一次课表、整体刷新一次界面，并由
+ResidentMonitor 每个模拟日记录一次内存、唤醒次数和Qt对象数。结果以JSON输出；
+内存增长或每周唤醒次数超过阈值时退出码为1，可用于发现泄漏和唤醒回归。
+
+    python benchmarks/soak_resident.py --weeks 4 --courses 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_soak_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QSettings  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+import sicau_calendar as sc  # noqa: E402
+from synthetic import generate_courses  # noqa: E402
+
+
+class VirtualClock:
+    def __init__(self, start):
+        self.now = start
+
+
+clock = VirtualClock(datetime(2025, 9, 1))
+
+
+class VirtualDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls.combine(clock.now.date(), clock.now.time())
+
+
+class VirtualDate(date):
+    @classmethod
+    def today(cls):
+        return clock.now.date()
+
+
+def install_clock(start):
+    """让程序中的 datetime.now() 和 date.today() 读虚拟时钟"""
+    clock.now = start
+    sc.datetime = VirtualDatetime
+    sc.date = VirtualDate
+
+
+def soak(args):
+    settings_dir = os.path.join(os.environ["CALENDAR_DATA_DIR"], "settings")
+    for settings_format in (QSettings.NativeFormat, QSettings.IniFormat):
+        QSettings.setPath(settings_format, QSettings.UserScope, settings_dir)
+    app = QApplication.instance() or QApplication([])
+    settings = QSettings(sc.APP_KEY, sc.APP_NAME)
+    settings.setValue("first_run_done", True)
+    settings.setValue("day_before_reminder", False)
+
+    manager = sc.data_manager
+    fall_start, _ = manager.get_semester_dates("fall")
+    install_clock(datetime.combine(fall_start, datetime.min.time()) - timedelta(days=args.lead_days))
+    manager.extend_courses(generate_courses(args.courses, seed=args.seed))
+
+    window = sc.CalendarApp()
+    alarms = []
+    # 提醒窗口是模态的，浸泡测试只记录提醒
+    window.show_class_alarm = lambda course, start_time: alarms.append(course.name)
+    report_path = os.path.join(os.environ["CALENDAR_DATA_DIR"], "resident_report.jsonl")
+    monitor = sc.ResidentMonitor(window, report_path, interval_minutes=24 * 60)
+    monitor.start()
+    # 暂停真实的快照定时器，改为每个模拟日记录一次
+    monitor.timer.stop()
+
+    end = clock.now + timedelta(weeks=args.weeks)
+    snapshot_day = clock.now.date()
+    extra = generate_courses(args.edits, seed=args.seed + 1)
+    day_index = 0
+    baseline = None
+    while clock.now < end:
+        window.refresh_timer.stop()
+        clock.now += timedelta(milliseconds=window.refresh_timer.interval())
+        window.on_refresh_timer()
+        app.processEvents()
+        if clock.now.date() != snapshot_day:
+            snapshot_day = clock.now.date()
+            day_index += 1
+            # 每天增删一门课程并整体刷新一次，覆盖增量刷新和全量刷新
+            course = extra[day_index % len(extra)]
+            manager.extend_courses([course])
+            app.processEvents()
+            manager.remove_courses([len(manager.get_courses()) - 1])
+            app.processEvents()
+            window.refresh_display()
+            entry = monitor.snapshot()
+            # 启动时的快照还没有建立索引和缓存，以模拟的第一天结束时为基准
+            baseline = baseline or entry
+
+    last = monitor.snapshot()
+    monitor.stop()
+    baseline = baseline or monitor.first
+    refresh_wakeups = last["wakeups"].get("refresh", 0)
+    result = {
+        "weeks": args.weeks,
+        "courses": args.courses,
+        "days": day_index,
+        "refresh_wakeups": refresh_wakeups,
+        "wakeups_per_week": round(refresh_wakeups / args.weeks, 1),
+        "alarms": len(alarms),
+        "memory_kb": {"baseline": baseline["memory_kb"], "last": last["memory_kb"],
+                      "growth": round(last["memory_kb"] - baseline["memory_kb"], 1)},
+        "widgets": {"baseline": baseline["qt"]["widgets"], "last": last["qt"]["widgets"]},
+        "table_items": {"baseline": baseline["qt"]["table_items"], "last": last["qt"]["table_items"]},
+        "wrappers": {"baseline": baseline["qt"]["wrappers"], "last": last["qt"]["wrappers"]},
+        "top_growth": last["top_growth"][:5],
+        "report": report_path,
+    }
+    problems = []
+    if result["memory_kb"]["growth"] > args.max_growth_kb:
+        problems.append(f"memory grew by {result['memory_kb']['growth']} KB")
+    if result["wakeups_per_week"] > args.max_wakeups_per_week:
+        problems.append(f"{result['wakeups_per_week']} wakeups per week")
+    if last["qt"]["widgets"] > baseline["qt"]["widgets"]:
+        problems.append("widget count grew")
+    result["problems"] = problems
+    window.tray_icon.hide()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=4, help="模拟运行的周数")
+    parser.add_argument("--courses", type=int, default=30, help="课表中的课程数")
+    parser.add_argument("--edits", type=int, default=50, help="每天轮流增删的课程数")
+    parser.add_argument("--lead-days", type=int, default=3, help="从开学前几天开始模拟")
+    parser.add_argument("--max-growth-kb", type=float, default=2048)
+    parser.add_argument("--max-wakeups-per-week", type=float, default=1000,
+                        help="每周唤醒次数上限，超过说明退化为轮询")
+    parser.add_argument("--seed", type=int, default=0)
+    result = soak(parser.parse_args())
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(1 if result["problems"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成课表生成器
+
+所有函数都接收随机种子，相同参数生成的数据完全相同，便于在不同版本间对比。
+"""
+
+import random
+from datetime import date, timedelta
+
+COURSE_NAMES = [
+    "高等数学", "线性代数", "概率论与数理统计", "大学英语", "大学物理", "程序设计基础",
+    "数据结构", "微观经济学", "宏观经济学", "会计学原理", "金融学", "统计学",
+    "植物学", "动物遗传学", "土壤学", "有机化学", "思想道德与法治", "体育",
+]
+SURNAMES = ["张", "王", "李", "赵", "刘", "陈", "杨", "黄", "周", "吴", "徐", "孙"]
+BUILDINGS = ["第一教学楼", "第二教学楼", "第三教学楼", "实验楼", "图书馆"]
+SECTION_BLOCKS = [[1, 2], [3, 4], [5, 6], [7, 8], [9, 10], [1, 2, 3], [5, 6, 7]]
+WEEK_PATTERNS = [
+    list(range(1, 17)), list(range(1, 9)), list(range(9, 17)),
+    list(range(1, 17, 2)), list(range(2, 17, 2)), list(range(1, 19)),
+]
+
+
+def generate_course(rng):
+    """随机生成一门课程（与 calendar_data.json 中的课程格式相同）"""
+    building = rng.choice(BUILDINGS)
+    return {
+        "name": rng.choice(COURSE_NAMES) + ("" if rng.random() < 0.5 else f"({rng.randint(1, 9)}班)"),
+        "teacher": rng.choice(SURNAMES) + "老师",
+        "location": f"{building}{rng.randint(1, 6)}{rng.randint(1, 30):02d}",
+        "weekday": rng.randint(1, 5) if rng.random() < 0.95 else rng.randint(6, 7),
+        "sections": list(rng.choice(SECTION_BLOCKS)),
+        "weeks": list(rng.choice(WEEK_PATTERNS)),
+        "type": rng.choice(["必修", "选修"]),
+    }
+
+
+def generate_courses(n, seed=0):
+    """生成n门互不相关的课程"""
+    rng = random.Random(seed)
+    return [generate_course(rng) for _ in range(n)]
+
+
+def generate_tenants(n_tenants, courses_per_tenant=20, catalog_size=3000, seed=0):
+    """生成n_tenants名学生的课表
+
+    学生从一个共享的开课目录中选课，同一门课会出现在许多学生的课表里，
+    与真实的选课情况一致。每个学生的课程都是独立的字典，相当于各自从文件中读出。
+    """
+    rng = random.Random(seed)
+    catalog = [generate_course(rng) for _ in range(catalog_size)]
+    tenants = {}
+    for index in range(n_tenants):
+        chosen = rng.sample(catalog, courses_per_tenant)
+        tenants[f"student{index:06d}"] = [
+            dict(course, sections=list(course["sections"]), weeks=list(course["weeks"]))
+            for course in chosen
+        ]
+    return tenants
+
+
+EVENT_NAMES = [
+    "开学报到", "正式行课", "国庆节", "元旦", "寒假开始", "春节", "劳动节", "期中考试",
+    "期末考试", "教研室例会", "学术讲座", "社会实践", "选课开始", "补考", "毕业答辩",
+]
+EVENT_CATEGORIES = ["开学", "假期", "节日", "考试", "注册", "实践", "上课"]
+
+
+def generate_events(n, start_year=2015, years=10, seed=0):
+    """生成n条重要日期，分布在start_year起的若干学年中"""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(n):
+        year = start_year + rng.randrange(years)
+        events.append({
+            "date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "event": rng.choice(EVENT_NAMES) + ("" if rng.random() < 0.5 else f"{rng.randint(1, 99)}"),
+            "category": rng.choice(EVENT_CATEGORIES),
+        })
+    return events
+
+
+def generate_semesters(weeks=20, fall_start=date(2025, 9, 8), gap_weeks=6):
+    """两个各为weeks周的学期（秋季学期从fall_start开始，寒假gap_weeks周），用于测试长学期"""
+    fall_end = fall_start + timedelta(weeks=weeks, days=-1)
+    spring_start = fall_end + timedelta(weeks=gap_weeks, days=1)
+    spring_end = spring_start + timedelta(weeks=weeks, days=-1)
+    return {
+        "fall": {"name": "秋季学期", "start_date": fall_start.isoformat(),
+                 "end_date": fall_end.isoformat()},
+        "spring": {"name": "春季学期", "start_date": spring_start.isoformat(),
+                   "end_date": spring_end.isoformat()},
+    }
+
+
+WEEKDAY_LABELS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+def excel_rows(courses):
+    """课程对应的Excel导入行：课程名, 教师, 教室, 星期, 节次, 周次"""
+    for course in courses:
+        sections, weeks = course["sections"], course["weeks"]
+        yield [course["name"], course["teacher"], course["location"],
+               WEEKDAY_LABELS[course["weekday"] - 1],
+               f"{sections[0]}-{sections[-1]}", ",".join(map(str, weeks))]
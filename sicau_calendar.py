@@ -13,10 +13,45 @@
 import sys
 import os
 import json
-import winreg
-import winsound
+import copy
+import csv
+import codecs
+import sqlite3
+import argparse
+import asyncio
+import zlib
+import hashlib
+import mmap
+import struct
+try:
+    import winreg
+    import winsound
+except ImportError:
+    # 非Windows平台（如在Linux上运行测试和基准测试）没有注册表和系统提示音
+    winreg = None
+    winsound = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
 import re
-from datetime import datetime, date, timedelta
+import gc
+import threading
+import tracemalloc
+import time
+import heapq
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, Counter, deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, wraps
+from itertools import accumulate, compress
+from operator import not_
+from string import Template
+from datetime import datetime, date, timedelta, timezone
+from urllib.parse import parse_qs, unquote
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QTableWidget, QTableWidgetItem, QHeaderView, QFrame,
@@ -25,10 +60,14 @@ from PyQt5.QtWidgets import (
     QDialogButtonBox, QTabWidget, QGridLayout, QFileDialog,
     QLineEdit, QComboBox, QSpinBox, QDateEdit, QTextEdit,
     QWizard, QWizardPage, QListWidget, QListWidgetItem, QSplitter,
-    QFormLayout, QRadioButton, QButtonGroup
+    QFormLayout, QRadioButton, QButtonGroup, QInputDialog, QTableView, QListView
+)
+from PyQt5.QtCore import (
+    Qt, QDate, QTimer, QSettings, QFileSystemWatcher, QAbstractTableModel, QAbstractListModel,
+    QModelIndex, QObject, QEvent
 )
-from PyQt5.QtCore import Qt, QDate, QTimer, QSettings
 from PyQt5.QtGui import QFont, QColor, QTextCharFormat, QIcon
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
 
 # 应用信息
 APP_NAME = "校历助手"
@@ -40,19 +79,37 @@ NEW_VERSION_NOTICE = "注意：当学校公布新的校历后，本程序会发
 
 # 获取数据存储路径
 def get_data_dir():
-    """获取数据存储目录"""
-    if getattr(sys, 'frozen', False):
-        base_dir = os.path.dirname(sys.executable)
-    else:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(base_dir, "data")
+    """获取数据存储目录（可用环境变量 CALENDAR_DATA_DIR 指定其他目录）"""
+    data_dir = os.environ.get("CALENDAR_DATA_DIR")
+    if not data_dir:
+        if getattr(sys, 'frozen', False):
+            base_dir = os.path.dirname(sys.executable)
+        else:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+        data_dir = os.path.join(base_dir, "data")
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
     return data_dir
 
-def get_data_file():
+# 默认档案直接使用数据目录，兼容旧版本的数据文件位置
+DEFAULT_PROFILE = "default"
+
+def get_profile_dir(profile=DEFAULT_PROFILE):
+    """获取档案的数据目录"""
+    if profile == DEFAULT_PROFILE:
+        return get_data_dir()
+    profile_dir = os.path.join(get_data_dir(), "profiles", profile)
+    if not os.path.exists(profile_dir):
+        os.makedirs(profile_dir)
+    return profile_dir
+
+def get_data_file(profile=DEFAULT_PROFILE):
     """获取数据文件路径"""
-    return os.path.join(get_data_dir(), "calendar_data.json")
+    return os.path.join(get_profile_dir(profile), "calendar_data.json")
+
+def get_database_file(profile=DEFAULT_PROFILE):
+    """获取SQLite数据库文件路径"""
+    return os.path.join(get_profile_dir(profile), "calendar_data.db")
 
 # ==================== 默认示例数据 ====================
 DEFAULT_DATA = {
@@ -107,6 +164,7 @@ DEFAULT_DATA = {
 
 CATEGORY_COLORS = {
     "假期": "#4CAF50",
+    "放假": "#795548",
     "开学": "#2196F3",
     "注册": "#9C27B0",
     "上课": "#FF9800",
@@ -115,35 +173,1730 @@ CATEGORY_COLORS = {
     "考试": "#F44336",
 }
 
+# ==================== 数据模型 ====================
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def _hm_to_minutes(hm):
+    hour, minute = hm.split(":")
+    return int(hour) * 60 + int(minute)
+
+def _extra_fields(data, fields):
+    """模型之外的字段原样保留，保存时写回；fields为字段名集合"""
+    extra_keys = data.keys() - fields
+    return {key: data[key] for key in extra_keys} if extra_keys else None
+
+def _extra_fingerprint(extra):
+    return json.dumps(extra, ensure_ascii=False, sort_keys=True) if extra else None
+
+# 不同课程的节次和周次组合很少，相同的元组在所有课程间共享
+_SECTIONS_POOL = {}
+_WEEKS_POOL = {}
+
+def _shared_weeks(weeks):
+    """共享的周次元组和周次位图（第N周上课则第N位为1，判断某周是否上课只需一次位运算）"""
+    entry = _WEEKS_POOL.get(weeks)
+    if entry is None:
+        week_mask = 0
+        for week in weeks:
+            week_mask |= 1 << week
+        entry = _WEEKS_POOL[weeks] = (weeks, week_mask)
+    return entry
+
+class Course:
+    """课程 - 加载时校验一次，之后按属性访问；课程、教师、教室等字符串经过驻留共享"""
+    
+    __slots__ = ("name", "teacher", "location", "weekday", "sections", "weeks", "type",
+                 "extra", "week_mask")
+    FIELDS = frozenset(("name", "teacher", "location", "weekday", "sections", "weeks", "type"))
+    
+    def __init__(self, name="", teacher="", location="", weekday=1, sections=(), weeks=(),
+                 course_type="", extra=None):
+        self.name = sys.intern(name)
+        self.teacher = sys.intern(teacher)
+        self.location = sys.intern(location)
+        self.weekday = weekday
+        sections = tuple(sections)
+        self.sections = _SECTIONS_POOL.setdefault(sections, sections)
+        self.weeks, self.week_mask = _shared_weeks(tuple(weeks))
+        self.type = sys.intern(course_type)
+        self.extra = extra
+    
+    @classmethod
+    def from_dict(cls, data):
+        """从JSON字典创建并校验，格式错误时抛出ValueError"""
+        if isinstance(data, cls):
+            return data
+        try:
+            weekday = int(data.get("weekday", 1))
+            sections = tuple(map(int, data.get("sections", ())))
+            weeks = tuple(map(int, data.get("weeks", ())))
+        except (TypeError, ValueError):
+            raise ValueError(f"课程格式错误: {data!r}")
+        if not 1 <= weekday <= 7 or min(sections, default=1) < 1 or min(weeks, default=1) < 1:
+            raise ValueError(f"课程的星期、节次或周次超出范围: {data!r}")
+        return cls(str(data.get("name", "")), str(data.get("teacher", "")),
+                   str(data.get("location", "")), weekday, sections, weeks,
+                   str(data.get("type", "")), _extra_fields(data, cls.FIELDS))
+    
+    def to_dict(self):
+        data = {
+            "name": self.name,
+            "teacher": self.teacher,
+            "location": self.location,
+            "weekday": self.weekday,
+            "sections": list(self.sections),
+            "weeks": list(self.weeks),
+            "type": self.type
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    def key(self):
+        """共享记录的键：内容相同的课程键相同；额外字段（如校区，决定节次时间表）也计入"""
+        return (self.name, self.teacher, self.location, self.weekday, self.sections,
+                self.weeks, self.type, _extra_fingerprint(self.extra))
+    
+    @classmethod
+    def key_of(cls, course):
+        return cls.from_dict(course).key()
+    
+    @classmethod
+    def from_key(cls, key):
+        """按键还原课程记录，包括额外字段"""
+        extra = key[7]
+        return cls(*key[:7], json.loads(extra) if extra else None)
+    
+    def fingerprint(self):
+        return hash(self.key())
+    
+    def __repr__(self):
+        return f"Course({self.name!r}, weekday={self.weekday}, sections={self.sections})"
+
+class ImportantDate:
+    """重要日期"""
+    
+    __slots__ = ("date", "event", "category", "day", "extra")
+    FIELDS = frozenset(("date", "event", "category"))
+    
+    def __init__(self, date_str, event="", category="", extra=None):
+        self.date = date_str
+        self.day = _parse_date(date_str)
+        self.event = event
+        self.category = sys.intern(category)
+        self.extra = extra
+    
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        try:
+            return cls(str(data["date"]), str(data.get("event", "")), str(data.get("category", "")),
+                       _extra_fields(data, cls.FIELDS))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"重要日期格式错误: {data!r}")
+    
+    def to_dict(self):
+        data = {"date": self.date, "event": self.event, "category": self.category}
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    def fingerprint(self):
+        return hash((self.date, self.event, self.category, _extra_fingerprint(self.extra)))
+    
+    def __repr__(self):
+        return f"ImportantDate({self.date!r}, {self.event!r})"
+
+class Semester:
+    """学期"""
+    
+    __slots__ = ("name", "start_date", "end_date", "extra")
+    FIELDS = frozenset(("name", "start_date", "end_date"))
+    
+    def __init__(self, name, start_date=None, end_date=None, extra=None):
+        self.name = name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.extra = extra
+    
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            start = data.get("start_date")
+            end = data.get("end_date")
+            start = _parse_date(start) if start else None
+            end = _parse_date(end) if end else None
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError(f"学期日期格式错误: {data!r}")
+        if start and end and start > end:
+            raise ValueError(f"学期开始日期晚于结束日期: {data!r}")
+        return cls(str(data.get("name", "")), start, end, _extra_fields(data, cls.FIELDS))
+    
+    def to_dict(self):
+        data = {
+            "name": self.name,
+            "start_date": self.start_date.strftime("%Y-%m-%d") if self.start_date else "",
+            "end_date": self.end_date.strftime("%Y-%m-%d") if self.end_date else ""
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+# 日期类型：正常上课 / 放假 / 调休补课（按其他星期的课表上课）/ 考试（照常上课）
+DAY_TEACHING, DAY_HOLIDAY, DAY_MAKEUP, DAY_EXAM = range(4)
+DAY_TYPE_NAMES = {"teaching": DAY_TEACHING, "holiday": DAY_HOLIDAY,
+                  "makeup": DAY_MAKEUP, "exam": DAY_EXAM}
+# 重要日期类别 -> 日期类型；只有「放假」停课，节日和假期只是提示，不影响课表
+CATEGORY_DAY_TYPES = {"放假": DAY_HOLIDAY, "考试": DAY_EXAM}
+# 类别为「节日」、事件名恰好是这些法定节假日时也停课（教师节、体育节等照常上课）
+STATUTORY_HOLIDAYS = frozenset(("元旦", "春节", "清明节", "劳动节", "端午节", "中秋节", "国庆节"))
+
+def event_day_type(category, event):
+    """重要日期对应的日期类型，不影响课表时为 None"""
+    if category == "节日" and event.strip() in STATUTORY_HOLIDAYS:
+        return DAY_HOLIDAY
+    return CATEGORY_DAY_TYPES.get(category)
+
+class DayOverride:
+    """手动指定的日期类型（day_overrides），可以覆盖一段日期"""
+    
+    __slots__ = ("first", "last", "day_type", "weekday", "week", "note", "extra")
+    FIELDS = frozenset(("date", "end_date", "type", "weekday", "week", "note"))
+    
+    def __init__(self, first, last=None, day_type=DAY_HOLIDAY, weekday=None, week=None,
+                 note="", extra=None):
+        self.first = first
+        self.last = last or first
+        self.day_type = day_type
+        self.weekday = weekday
+        self.week = week
+        self.note = note
+        self.extra = extra
+    
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            first = _parse_date(data["date"])
+            last = _parse_date(data["end_date"]) if data.get("end_date") else first
+            day_type = DAY_TYPE_NAMES[data.get("type", "holiday")]
+            weekday = int(data["weekday"]) if data.get("weekday") else None
+            week = int(data["week"]) if data.get("week") else None
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError(f"日期类型设置格式错误: {data!r}")
+        if last < first:
+            raise ValueError(f"日期类型设置的结束日期早于开始日期: {data!r}")
+        if day_type == DAY_MAKEUP and not (weekday and 1 <= weekday <= 7):
+            raise ValueError(f"调休补课需要指定按星期几上课: {data!r}")
+        if week is not None and week < 1:
+            raise ValueError(f"周次超出范围: {data!r}")
+        return cls(first, last, day_type, weekday, week, str(data.get("note", "")),
+                   _extra_fields(data, cls.FIELDS))
+    
+    def to_dict(self):
+        data = {"date": self.first.strftime("%Y-%m-%d")}
+        if self.last != self.first:
+            data["end_date"] = self.last.strftime("%Y-%m-%d")
+        data["type"] = next(name for name, value in DAY_TYPE_NAMES.items() if value == self.day_type)
+        if self.weekday:
+            data["weekday"] = self.weekday
+        if self.week:
+            data["week"] = self.week
+        if self.note:
+            data["note"] = self.note
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+# 重复规则 -> (显示名称, 周期单位)
+RECURRENCE_NAMES = {"weekly": ("周", "每周"), "monthly": ("个月", "每月"), "yearly": ("年", "每年")}
+
+class RecurringDate:
+    """按规则重复的重要日期（recurring_dates），只在需要的日期范围内展开"""
+    
+    __slots__ = ("start", "event", "category", "repeat", "interval", "until", "exceptions", "extra")
+    FIELDS = frozenset(("date", "event", "category", "repeat", "interval", "until", "except"))
+    
+    def __init__(self, start, event="", category="", repeat="weekly", interval=1, until=None,
+                 exceptions=(), extra=None):
+        self.start = start
+        self.event = sys.intern(event)
+        self.category = sys.intern(category)
+        self.repeat = repeat
+        self.interval = interval
+        self.until = until
+        self.exceptions = frozenset(exceptions)
+        self.extra = extra
+    
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        try:
+            start = _parse_date(data["date"])
+            until = _parse_date(data["until"]) if data.get("until") else None
+            exceptions = [_parse_date(day) for day in data.get("except", [])]
+            interval = int(data.get("interval", 1))
+            repeat = data.get("repeat", "weekly")
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError(f"重复日期格式错误: {data!r}")
+        if repeat not in RECURRENCE_NAMES or interval < 1:
+            raise ValueError(f"重复规则无效: {data!r}")
+        return cls(start, str(data.get("event", "")), str(data.get("category", "")), repeat,
+                   interval, until, exceptions, _extra_fields(data, cls.FIELDS))
+    
+    def to_dict(self):
+        data = {"date": self.start.strftime("%Y-%m-%d"), "event": self.event,
+                "category": self.category, "repeat": self.repeat}
+        if self.interval != 1:
+            data["interval"] = self.interval
+        if self.until:
+            data["until"] = self.until.strftime("%Y-%m-%d")
+        if self.exceptions:
+            data["except"] = sorted(day.strftime("%Y-%m-%d") for day in self.exceptions)
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    def describe(self):
+        unit, name = RECURRENCE_NAMES[self.repeat]
+        text = name if self.interval == 1 else f"每{self.interval}{unit}"
+        return text + (f"，至{self.until.strftime('%Y-%m-%d')}" if self.until else "")
+    
+    def occurs_on(self, day):
+        if day < self.start or (self.until and day > self.until) or day in self.exceptions:
+            return False
+        if self.repeat == "weekly":
+            return (day - self.start).days % (7 * self.interval) == 0
+        if self.repeat == "monthly":
+            months = (day.year - self.start.year) * 12 + day.month - self.start.month
+            return day.day == self.start.day and months % self.interval == 0
+        return ((day.month, day.day) == (self.start.month, self.start.day)
+                and (day.year - self.start.year) % self.interval == 0)
+    
+    def occurrences(self, first, last):
+        """[first, last] 内的各次日期，按时间顺序"""
+        first = max(first, self.start)
+        if self.until:
+            last = min(last, self.until)
+        if first > last:
+            return
+        if self.repeat == "weekly":
+            step = 7 * self.interval
+            day = self.start + timedelta(days=-(-(first - self.start).days // step) * step)
+            while day <= last:
+                if day not in self.exceptions:
+                    yield day
+                day += timedelta(days=step)
+            return
+        # 按月或按年：31日、2月29日等不存在的日期跳过
+        months = 12 * self.interval if self.repeat == "yearly" else self.interval
+        origin = self.start.year * 12 + self.start.month - 1
+        index = origin + -(-(first.year * 12 + first.month - 1 - origin) // months) * months
+        while index <= last.year * 12 + last.month - 1:
+            try:
+                day = date(index // 12, index % 12 + 1, self.start.day)
+            except ValueError:
+                day = None
+            if day and first <= day <= last and day not in self.exceptions:
+                yield day
+            index += months
+    
+    def occurrence(self, day):
+        """某一次的重要日期记录"""
+        return ImportantDate(day.strftime("%Y-%m-%d"), self.event, self.category,
+                             {"repeat": self.repeat})
+
+class ClassPeriod:
+    """节次时间，同时保存 HH:MM 文本和当天的分钟数"""
+    
+    __slots__ = ("section", "start", "end", "start_minute", "end_minute")
+    
+    def __init__(self, section, start, end):
+        self.section = section
+        self.start = start
+        self.end = end
+        self.start_minute = _hm_to_minutes(start)
+        self.end_minute = _hm_to_minutes(end)
+    
+    @classmethod
+    def from_item(cls, section, value):
+        """从JSON中的 "节次": ["开始", "结束"] 创建"""
+        try:
+            period = cls(int(section), *value)
+        except (TypeError, ValueError):
+            raise ValueError(f"节次时间格式错误: {section!r}: {value!r}")
+        if not 0 <= period.start_minute < period.end_minute <= 24 * 60:
+            raise ValueError(f"节次时间范围错误: {section!r}: {value!r}")
+        return period
+    
+    def to_item(self):
+        return [self.start, self.end]
+
+# 记录段 -> 记录模型
+RECORD_MODELS = {"important_dates": ImportantDate, "courses": Course}
+
+def decode_records(section, records):
+    """把JSON记录列表转换为模型，跳过无法识别的记录"""
+    model = RECORD_MODELS[section]
+    result = []
+    for record in records or []:
+        try:
+            result.append(model.from_dict(record))
+        except ValueError:
+            continue
+    return result
+
+def decode_section(section, value):
+    """把存储中的一个数据段转换为内存中的模型"""
+    if section in RECORD_MODELS:
+        return decode_records(section, value)
+    if section == "semesters":
+        semesters = {}
+        for key, item in (value or {}).items():
+            try:
+                semesters[key] = Semester.from_dict(item)
+            except ValueError:
+                continue
+        return semesters
+    if section == "class_times":
+        periods = {}
+        for key, item in (value or {}).items():
+            try:
+                period = ClassPeriod.from_item(key, item)
+            except ValueError:
+                continue
+            periods[period.section] = period
+        return periods
+    if section == "recurring_dates":
+        rules = []
+        for item in value or []:
+            try:
+                rules.append(RecurringDate.from_dict(item))
+            except ValueError:
+                continue
+        return rules
+    if section == "day_overrides":
+        overrides = []
+        for item in value or []:
+            try:
+                overrides.append(DayOverride.from_dict(item))
+            except ValueError:
+                continue
+        return overrides
+    if section == "class_time_tables":
+        tables = {}
+        for name, spec in (value or {}).items():
+            try:
+                tables[name] = {
+                    "campus": spec.get("campus") or None,
+                    "weekdays": [int(weekday) for weekday in spec.get("weekdays", [])],
+                    "times": decode_section("class_times", spec.get("times")),
+                }
+            except (AttributeError, TypeError, ValueError):
+                continue
+        return tables
+    return value
+
+def encode_section(section, value):
+    """把内存中的数据段转换回JSON结构，只在保存和计算指纹时使用"""
+    if section in RECORD_MODELS:
+        return [record.to_dict() for record in value]
+    if section == "semesters":
+        return {key: semester.to_dict() for key, semester in value.items()}
+    if section == "class_times":
+        return {str(section): period.to_item() for section, period in sorted(value.items())}
+    if section in ("day_overrides", "recurring_dates"):
+        return [item.to_dict() for item in value]
+    if section == "class_time_tables":
+        tables = {}
+        for name, spec in value.items():
+            table = {"times": encode_section("class_times", spec["times"])}
+            if spec["campus"]:
+                table["campus"] = spec["campus"]
+            if spec["weekdays"]:
+                table["weekdays"] = spec["weekdays"]
+            tables[name] = table
+        return tables
+    return value
+
+def decode_document(raw):
+    return {section: decode_section(section, value) for section, value in raw.items()}
+
+def encode_document(data):
+    return {section: encode_section(section, value) for section, value in data.items()}
+
+# ==================== 节次时间表 ====================
+def minutes_to_hm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class PeriodTable:
+    """编译后的节次时间表 - 按节次顺序保存在紧凑数组中，时间为当天的分钟数"""
+    
+    def __init__(self, periods, name="默认"):
+        ordered = sorted(periods.values(), key=lambda period: period.section)
+        self.name = name
+        self.sections = array("H", (period.section for period in ordered))
+        self.starts = array("H", (period.start_minute for period in ordered))
+        self.ends = array("H", (period.end_minute for period in ordered))
+        self.positions = {section: index for index, section in enumerate(self.sections)}
+        # 兼容 get_class_times 的 {节次: (开始, 结束)}
+        self.times = {period.section: (period.start, period.end) for period in ordered}
+        # 供按时间匹配节次使用的 [(节次, 开始分钟, 结束分钟)]
+        self.ranges = list(zip(self.sections, self.starts, self.ends))
+        self.problems = self.validate()
+    
+    def validate(self):
+        """检查节次时间是否按顺序排列且互不重叠，返回问题描述列表"""
+        problems = []
+        for index in range(1, len(self.sections)):
+            if self.starts[index] < self.ends[index - 1]:
+                problems.append(f"{self.name}: 第{self.sections[index - 1]}节和第"
+                                f"{self.sections[index]}节时间重叠或顺序颠倒")
+        return problems
+    
+    def __len__(self):
+        return len(self.sections)
+    
+    def __contains__(self, section):
+        return section in self.positions
+    
+    def max_section(self):
+        return self.sections[-1] if self.sections else 0
+    
+    def span(self, first, last):
+        """第first到第last节的 (开始分钟, 结束分钟)，节次不存在时为None"""
+        start = self.positions.get(first)
+        end = self.positions.get(last)
+        if start is None or end is None:
+            return None
+        return self.starts[start], self.ends[end]
+    
+    def start_text(self, section, default="?"):
+        index = self.positions.get(section)
+        return minutes_to_hm(self.starts[index]) if index is not None else default
+    
+    def duration(self, sections):
+        """若干节课的总分钟数"""
+        total = 0
+        for section in sections:
+            index = self.positions.get(section)
+            if index is not None:
+                total += self.ends[index] - self.starts[index]
+        return total
+
+class ClassSchedule:
+    """全部节次时间表 - 默认表，加上按星期或校区生效的附加表（class_time_tables）
+    
+    查找顺序：校区+星期 > 校区 > 星期 > 默认表；由 DataManager.get_class_schedule 按数据代数缓存。
+    """
+    
+    def __init__(self, manager=None):
+        manager = manager or data_manager
+        self.generation = manager.generation
+        self.default = PeriodTable(manager.get_class_periods())
+        self.tables = [self.default]
+        # (校区, 星期) -> PeriodTable，校区为None表示所有校区
+        self.lookup = {}
+        specs = manager.data.get("class_time_tables", {}).items()
+        # 不限星期的表先登记，限定星期的表再覆盖
+        for name, spec in sorted(specs, key=lambda item: bool(item[1]["weekdays"])):
+            table = PeriodTable(spec["times"], name)
+            self.tables.append(table)
+            for weekday in spec["weekdays"] or range(1, 8):
+                self.lookup[(spec["campus"], weekday)] = table
+        self.problems = [problem for table in self.tables for problem in table.problems]
+    
+    def table_for(self, weekday, campus=None):
+        table = self.lookup.get((campus, weekday)) if campus else None
+        return table or self.lookup.get((None, weekday)) or self.default
+    
+    def for_course(self, course):
+        campus = course.extra.get("campus") if course.extra else None
+        return self.table_for(course.weekday, campus)
+    
+    def max_section(self):
+        return max(table.max_section() for table in self.tables)
+
+# ==================== 文件锁 ====================
+class FileLock:
+    """跨进程的建议性文件锁（Windows用msvcrt，其他平台用fcntl），同一进程内可重入"""
+    
+    def __init__(self, path, timeout=10):
+        self.path = path
+        self.timeout = timeout
+        self.handle = None
+        self.depth = 0
+    
+    def acquire(self, blocking=True):
+        """获取锁，非阻塞模式下或等待超时仍未获得时返回False"""
+        if self.depth:
+            self.depth += 1
+            return True
+        handle = open(self.path, "a+")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if msvcrt:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if not blocking or time.monotonic() >= deadline:
+                    handle.close()
+                    return False
+                time.sleep(0.05)
+        self.handle = handle
+        self.depth = 1
+        return True
+    
+    def release(self):
+        if not self.depth:
+            return
+        self.depth -= 1
+        if self.depth:
+            return
+        try:
+            if msvcrt:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.handle.close()
+            self.handle = None
+    
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f"等待文件锁超时: {self.path}")
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+
+# ==================== 二进制快照 ====================
+SNAPSHOT_MAGIC = b"SCALSNAP"
+# 格式或模型字段变化时递增，旧快照会被当作无效而重新生成
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot"
+# 记录数少于此值时JSON解析本来就很快，不生成快照
+SNAPSHOT_MIN_RECORDS = 2000
+_SNAPSHOT_PREFIX = struct.Struct("<8sHxxI")
+
+def snapshot_path_for(json_path):
+    return os.path.splitext(json_path)[0] + SNAPSHOT_SUFFIX
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_source(stat, content):
+    """快照对应的数据文件内容：content为解析或写入的字节，stat为读写这些字节时打开的文件的状态
+    
+    不在读写之后重新stat路径，否则其他程序在中间替换了文件时，快照会记下新文件的
+    修改时间和哈希，却保存旧文件的数据。
+    """
+    return {"mtime_ns": stat.st_mtime_ns, "size": len(content),
+            "digest": hashlib.blake2b(content, digest_size=16).hexdigest()}
+
+class _SnapshotWriter:
+    """把记录段按列写成定长数组：字符串和节次/周次元组各存一份，列中只保存编号"""
+    
+    def __init__(self):
+        self.strings = {}
+        self.tuples = {}
+        self.blocks = {}
+        self.extras = {}
+    
+    def string_id(self, text):
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+    
+    def tuple_id(self, values):
+        index = self.tuples.get(values)
+        if index is None:
+            index = self.tuples[values] = len(self.tuples)
+        return index
+    
+    def strings_column(self, name, values):
+        self.blocks[name] = array("I", map(self.string_id, values))
+    
+    def add_records(self, section, records):
+        prefix = section + "."
+        if section == "courses":
+            for field in ("name", "teacher", "location", "type"):
+                self.strings_column(prefix + field, [getattr(record, field) for record in records])
+            self.blocks[prefix + "weekday"] = array("B", (record.weekday for record in records))
+            for field in ("sections", "weeks"):
+                self.blocks[prefix + field] = array(
+                    "I", (self.tuple_id(getattr(record, field)) for record in records))
+        else:
+            for field in ("date", "event", "category"):
+                self.strings_column(prefix + field, [getattr(record, field) for record in records])
+        extras = {index: record.extra for index, record in enumerate(records) if record.extra}
+        if extras:
+            self.extras[section] = extras
+    
+    def finish(self):
+        texts = list(self.strings)
+        self.blocks["strings.offsets"] = array("I", accumulate(map(len, texts), initial=0))
+        self.blocks["strings.text"] = array("B", "".join(texts).encode("utf-8"))
+        tuples = list(self.tuples)
+        self.blocks["tuples.offsets"] = array("I", accumulate(map(len, tuples), initial=0))
+        self.blocks["tuples.values"] = array("I", (value for values in tuples for value in values))
+        if self.extras:
+            self.blocks["extras"] = array("B", json.dumps(self.extras, ensure_ascii=False).encode("utf-8"))
+
+def write_snapshot(snapshot_path, source, data):
+    """写入与data对应的快照，source为 snapshot_source() 给出的、data所来自的数据文件内容"""
+    writer = _SnapshotWriter()
+    sections = {}
+    for section, value in data.items():
+        if section in RECORD_MODELS:
+            writer.add_records(section, value)
+        else:
+            sections[section] = encode_section(section, value)
+    writer.finish()
+    
+    layout = {}
+    offset = 0
+    for name, block in writer.blocks.items():
+        # 每个数组按8字节对齐，加载时可以直接在映射的内存上按类型读取
+        offset = (offset + 7) & ~7
+        layout[name] = (offset, block.typecode, len(block))
+        offset += len(block) * block.itemsize
+    header = json.dumps({
+        "source": source,
+        "byteorder": sys.byteorder,
+        "itemsize": array("I").itemsize,
+        "order": list(data),
+        "records": {section: len(data[section]) for section in RECORD_MODELS if section in data},
+        "sections": sections,
+        "blocks": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    
+    base = (_SNAPSHOT_PREFIX.size + len(header) + 7) & ~7
+    temp_path = snapshot_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_SNAPSHOT_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for name, block in writer.blocks.items():
+            f.seek(base + layout[name][0])
+            block.tofile(f)
+    os.replace(temp_path, snapshot_path)
+
+def _snapshot_matches(info, source_path):
+    """快照是否对应当前的数据文件：修改时间和大小一致，或内容哈希一致（如文件被复制或touch过）"""
+    try:
+        stat = os.stat(source_path)
+    except OSError:
+        return False
+    source = info["source"]
+    if (stat.st_mtime_ns, stat.st_size) == (source["mtime_ns"], source["size"]):
+        return True
+    return stat.st_size == source["size"] and file_digest(source_path) == source["digest"]
+
+def read_snapshot(snapshot_path, source_path):
+    """读取快照中的数据字典；快照不存在、版本不符或与数据文件不一致时返回None"""
+    try:
+        f = open(snapshot_path, "rb")
+    except OSError:
+        return None
+    with f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+    try:
+        return _decode_snapshot(mapped, source_path)
+    except (ValueError, KeyError, TypeError, struct.error):
+        return None
+    finally:
+        mapped.close()
+
+def _decode_snapshot(mapped, source_path):
+    magic, version, header_size = _SNAPSHOT_PREFIX.unpack_from(mapped)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    info = json.loads(mapped[_SNAPSHOT_PREFIX.size:_SNAPSHOT_PREFIX.size + header_size])
+    if (info["byteorder"] != sys.byteorder or info["itemsize"] != array("I").itemsize
+            or not _snapshot_matches(info, source_path)):
+        return None
+    
+    base = (_SNAPSHOT_PREFIX.size + header_size + 7) & ~7
+    buffer = memoryview(mapped)
+    views = []
+    
+    def column(name):
+        # 直接在映射的内存上按类型读取，不复制、不解析
+        offset, typecode, count = info["blocks"][name]
+        start = base + offset
+        view = buffer[start:start + count * array(typecode).itemsize].cast(typecode)
+        views.append(view)
+        return view
+    
+    try:
+        offsets = column("strings.offsets")
+        text = str(column("strings.text"), "utf-8")
+        strings = [sys.intern(text[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+        offsets = column("tuples.offsets")
+        values = column("tuples.values")
+        tuples = [tuple(values[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+        extras = json.loads(str(column("extras"), "utf-8")) if "extras" in info["blocks"] else {}
+        
+        data = {}
+        for section in info["order"]:
+            if section == "courses":
+                data[section] = _restore_courses(column, strings, tuples, extras.get(section, {}),
+                                                 info["records"][section])
+            elif section == "important_dates":
+                data[section] = _restore_dates(column, strings, extras.get(section, {}),
+                                               info["records"][section])
+            else:
+                data[section] = decode_section(section, info["sections"][section])
+        return data
+    finally:
+        for view in views:
+            view.release()
+        buffer.release()
+
+def _restore_courses(column, strings, tuples, extras, count):
+    """按列还原课程；字符串已驻留，节次和周次元组取自共享池，不再逐条校验"""
+    sections_pool = [_SECTIONS_POOL.setdefault(values, values) for values in tuples]
+    weeks_pool = [_shared_weeks(values) for values in tuples]
+    names, teachers, locations, types = (column("courses." + field)
+                                         for field in ("name", "teacher", "location", "type"))
+    weekdays, sections, weeks = (column("courses." + field) for field in ("weekday", "sections", "weeks"))
+    new = Course.__new__
+    courses = []
+    for index in range(count):
+        course = new(Course)
+        course.name = strings[names[index]]
+        course.teacher = strings[teachers[index]]
+        course.location = strings[locations[index]]
+        course.weekday = weekdays[index]
+        course.sections = sections_pool[sections[index]]
+        course.weeks, course.week_mask = weeks_pool[weeks[index]]
+        course.type = strings[types[index]]
+        course.extra = extras.get(str(index))
+        courses.append(course)
+    return courses
+
+def _restore_dates(column, strings, extras, count):
+    dates, events, categories = (column("important_dates." + field)
+                                 for field in ("date", "event", "category"))
+    days = {}
+    new = ImportantDate.__new__
+    records = []
+    for index in range(count):
+        record = new(ImportantDate)
+        record.date = strings[dates[index]]
+        day = days.get(record.date)
+        if day is None:
+            day = days[record.date] = _parse_date(record.date)
+        record.day = day
+        record.event = strings[events[index]]
+        record.category = strings[categories[index]]
+        record.extra = extras.get(str(index))
+        records.append(record)
+    return records
+
+# ==================== 存储后端 ====================
+# 以记录列表形式保存、支持逐行写入的数据段
+RECORD_SECTIONS = ("important_dates", "courses")
+
+class StorageBackend:
+    """存储后端接口 - 默认实现把所有单点修改都退化为整体保存"""
+    
+    # 单点修改是否只写入对应的行；否则批量更新结束时只整体保存一次
+    ROW_WRITES = False
+    
+    def load(self):
+        """读取数据字典，存储不存在时返回None"""
+        raise NotImplementedError
+    
+    def save(self, data):
+        """整体写入数据"""
+        raise NotImplementedError
+    
+    def save_settings(self, data):
+        """写入学校信息、学期、节次等设置项"""
+        self.save(data)
+    
+    def append_records(self, data, section, records):
+        """在记录段末尾追加记录"""
+        self.save(data)
+    
+    def replace_records(self, data, section, records):
+        """替换整个记录段"""
+        self.save(data)
+    
+    def delete_records(self, data, section, rows):
+        """删除记录段中的若干行，rows为删除前的行号"""
+        self.save(data)
+    
+    def stamp(self):
+        """存储的版本戳，其他程序写入后会改变；不支持检测时返回None"""
+        return None
+    
+    def watch_paths(self):
+        """需要监视变化的文件"""
+        return []
+    
+    def lock(self):
+        """写入时持有的跨进程锁"""
+        return nullcontext()
+
+class JsonFileBackend(StorageBackend):
+    """JSON文件后端 - 整个数据保存在一个JSON文件中"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.snapshot_path = snapshot_path_for(path)
+        self.file_lock = FileLock(path + ".lock")
+    
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        # 数据多时先读二进制快照，JSON文件仍是唯一的数据来源，快照不一致时重新生成
+        data = read_snapshot(self.snapshot_path, self.path)
+        if data is not None:
+            return data
+        with open(self.path, 'rb') as f:
+            before = os.fstat(f.fileno())
+            content = f.read()
+            after = os.fstat(f.fileno())
+        data = decode_document(json.loads(content.decode('utf-8')))
+        # 读取期间文件被原地改写时不生成快照，下次加载再生成
+        if ((before.st_mtime_ns, before.st_size) == (after.st_mtime_ns, after.st_size)
+                and before.st_size == len(content)):
+            self.update_snapshot(data, snapshot_source(before, content))
+        return data
+    
+    def update_snapshot(self, data, source):
+        try:
+            if sum(len(data.get(section) or ()) for section in RECORD_MODELS) >= SNAPSHOT_MIN_RECORDS:
+                write_snapshot(self.snapshot_path, source, data)
+            elif os.path.exists(self.snapshot_path):
+                os.remove(self.snapshot_path)
+        except OSError:
+            # 快照只是缓存，写不了也不影响数据
+            pass
+    
+    def save(self, data):
+        content = json.dumps(encode_document(data), ensure_ascii=False, indent=2).encode('utf-8')
+        # 先写临时文件再替换，其他程序不会读到写了一半的文件
+        temp_file = self.path + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(content)
+            f.flush()
+            stat = os.fstat(f.fileno())
+        try:
+            os.replace(temp_file, self.path)
+        except PermissionError:
+            # Windows上目标文件正被其他程序打开时无法替换，退回直接写入
+            with open(self.path, 'wb') as f:
+                f.write(content)
+                f.flush()
+                stat = os.fstat(f.fileno())
+            os.remove(temp_file)
+        self.update_snapshot(data, snapshot_source(stat, content))
+    
+    def lock(self):
+        return self.file_lock
+    
+    def stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def watch_paths(self):
+        return [self.path]
+
+class SqliteBackend(StorageBackend):
+    """SQLite后端 - WAL模式，记录按行存储并按日期、周次/星期、地点和教师建立索引"""
+    
+    ROW_WRITES = True
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS important_dates (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            event TEXT,
+            category TEXT,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_dates_date ON important_dates(date);
+        CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            teacher TEXT,
+            location TEXT,
+            weekday INTEGER,
+            sections TEXT,
+            weeks TEXT,
+            type TEXT,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_courses_location ON courses(location);
+        CREATE INDEX IF NOT EXISTS idx_courses_teacher ON courses(teacher);
+        CREATE TABLE IF NOT EXISTS course_slots (
+            course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+            week INTEGER NOT NULL,
+            weekday INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_slots_week_weekday ON course_slots(week, weekday);
+        CREATE INDEX IF NOT EXISTS idx_slots_course ON course_slots(course_id);
+    """
+    
+    COLUMNS = {
+        "important_dates": ("date", "event", "category"),
+        "courses": ("name", "teacher", "location", "weekday", "sections", "weeks", "type"),
+    }
+    # 以JSON文本保存的列
+    JSON_COLUMNS = ("sections", "weeks")
+    
+    def __init__(self, path):
+        self.path = path
+        self.file_lock = FileLock(path + ".lock")
+        self.conn = None
+        # 每个记录段中各记录对应的行id，与内存中的列表顺序一致
+        self.row_ids = {section: [] for section in RECORD_SECTIONS}
+    
+    def connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+            self.conn.executescript(self.SCHEMA)
+        return self.conn
+    
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+    
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        conn = self.connect()
+        data = {key: decode_section(key, json.loads(value))
+                for key, value in conn.execute("SELECT key, value FROM settings")}
+        if not data:
+            return None
+        for section in RECORD_SECTIONS:
+            columns = self.COLUMNS[section]
+            rows = conn.execute(
+                f"SELECT id, {', '.join(columns)}, extra FROM {section} ORDER BY id"
+            )
+            records = []
+            ids = []
+            model = RECORD_MODELS[section]
+            for row in rows:
+                try:
+                    record = model.from_dict(self.row_to_record(columns, row[1:-1], row[-1]))
+                except ValueError:
+                    continue
+                records.append(record)
+                ids.append(row[0])
+            data[section] = records
+            self.row_ids[section] = ids
+        return data
+    
+    def row_to_record(self, columns, values, extra):
+        record = {}
+        for column, value in zip(columns, values):
+            if value is None:
+                continue
+            record[column] = json.loads(value) if column in self.JSON_COLUMNS else value
+        if extra:
+            record.update(json.loads(extra))
+        return record
+    
+    def record_to_row(self, section, record):
+        record = record.to_dict()
+        columns = self.COLUMNS[section]
+        values = []
+        for column in columns:
+            value = record.get(column)
+            if column in self.JSON_COLUMNS and value is not None:
+                value = json.dumps(value)
+            values.append(value)
+        extra = {k: v for k, v in record.items() if k not in columns}
+        values.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        return values
+    
+    def insert_records(self, conn, section, records):
+        columns = self.COLUMNS[section] + ("extra",)
+        sql = (f"INSERT INTO {section} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        ids = self.row_ids[section]
+        for record in records:
+            cursor = conn.execute(sql, self.record_to_row(section, record))
+            ids.append(cursor.lastrowid)
+            if section == "courses":
+                conn.executemany(
+                    "INSERT INTO course_slots (course_id, week, weekday) VALUES (?, ?, ?)",
+                    [(cursor.lastrowid, week, record.weekday) for week in record.weeks]
+                )
+    
+    def bump_generation(self, conn):
+        """每个写事务都递增代数，其他进程据此发现数据已被修改"""
+        conn.execute("INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                     "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+    
+    def stamp(self):
+        if not os.path.exists(self.path):
+            return None
+        row = self.connect().execute(
+            "SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+    
+    def watch_paths(self):
+        return [self.path, self.path + "-wal"]
+    
+    def lock(self):
+        return self.file_lock
+    
+    def write_settings(self, conn, data):
+        conn.execute("DELETE FROM settings")
+        conn.executemany(
+            "INSERT INTO settings (key, value) VALUES (?, ?)",
+            [(key, json.dumps(encode_section(key, value), ensure_ascii=False))
+             for key, value in data.items() if key not in RECORD_SECTIONS]
+        )
+    
+    def clear_records(self, conn, section):
+        if section == "courses":
+            conn.execute("DELETE FROM course_slots")
+        conn.execute(f"DELETE FROM {section}")
+        self.row_ids[section] = []
+    
+    def save(self, data):
+        conn = self.connect()
+        with conn:
+            self.bump_generation(conn)
+            self.write_settings(conn, data)
+            for section in RECORD_SECTIONS:
+                self.clear_records(conn, section)
+                self.insert_records(conn, section, data.get(section, []))
+    
+    def save_settings(self, data):
+        conn = self.connect()
+        with conn:
+            self.bump_generation(conn)
+            self.write_settings(conn, data)
+    
+    def append_records(self, data, section, records):
+        conn = self.connect()
+        with conn:
+            self.bump_generation(conn)
+            self.insert_records(conn, section, records)
+    
+    def replace_records(self, data, section, records):
+        conn = self.connect()
+        with conn:
+            self.bump_generation(conn)
+            self.clear_records(conn, section)
+            self.insert_records(conn, section, records)
+    
+    def delete_records(self, data, section, rows):
+        ids = self.row_ids[section]
+        doomed = [(ids[row],) for row in rows]
+        conn = self.connect()
+        with conn:
+            self.bump_generation(conn)
+            # course_slots 随 courses 级联删除
+            conn.executemany(f"DELETE FROM {section} WHERE id = ?", doomed)
+        removed = set(rows)
+        self.row_ids[section] = [row_id for row, row_id in enumerate(ids) if row not in removed]
+    
+    def query_courses(self, week=None, weekday=None, location=None, teacher=None):
+        """按周次/星期、地点、教师查询课程（走索引，不需要加载全部数据）"""
+        conn = self.connect()
+        columns = self.COLUMNS["courses"]
+        sql = f"SELECT {', '.join('c.' + c for c in columns)}, c.extra FROM courses c"
+        conditions = []
+        params = []
+        if week is not None or weekday is not None:
+            sql += " JOIN course_slots s ON s.course_id = c.id"
+            if week is not None:
+                conditions.append("s.week = ?")
+                params.append(week)
+            if weekday is not None:
+                conditions.append("s.weekday = ?")
+                params.append(weekday)
+        if location is not None:
+            conditions.append("c.location = ?")
+            params.append(location)
+        if teacher is not None:
+            conditions.append("c.teacher = ?")
+            params.append(teacher)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " GROUP BY c.id ORDER BY c.id"
+        return [Course.from_dict(self.row_to_record(columns, row[:-1], row[-1]))
+                for row in conn.execute(sql, params)]
+
+def create_storage_backend(profile=DEFAULT_PROFILE):
+    """选择存储后端：档案目录中已有SQLite数据库时使用它，否则使用JSON文件"""
+    if os.path.exists(get_database_file(profile)):
+        return SqliteBackend(get_database_file(profile))
+    return JsonFileBackend(get_data_file(profile))
+
+def migrate_json_to_sqlite(json_path=None, db_path=None):
+    """把JSON数据文件迁移到SQLite数据库，返回 (重要日期数, 课程数)"""
+    json_path = json_path or get_data_file()
+    db_path = db_path or get_database_file()
+    data = JsonFileBackend(json_path).load()
+    if data is None:
+        data = decode_document(DEFAULT_DATA)
+    backend = SqliteBackend(db_path)
+    try:
+        backend.save(data)
+    finally:
+        backend.close()
+    return len(data.get("important_dates", [])), len(data.get("courses", []))
+
+def record_fingerprint(record):
+    return record.fingerprint()
+
+def section_fingerprint(section, value):
+    """数据段指纹：记录段为各记录指纹的计数，其他数据段为整体指纹"""
+    if section in RECORD_SECTIONS:
+        return Counter(map(record_fingerprint, value or []))
+    if value is None:
+        return hash("null")
+    return hash(json.dumps(encode_section(section, value), ensure_ascii=False, sort_keys=True))
+
+def merge_records(base, local, theirs):
+    """三方合并记录列表：保留对方的记录（本地已删除的除外），再追加本地新增的记录"""
+    local_keys = Counter(map(record_fingerprint, local))
+    their_keys = Counter(map(record_fingerprint, theirs))
+    merged = [record for record in theirs
+              if not (base[record_fingerprint(record)] and not local_keys[record_fingerprint(record)])]
+    merged.extend(record for record in local
+                  if not their_keys[record_fingerprint(record)] and not base[record_fingerprint(record)])
+    return merged
+
+# ==================== 性能诊断 ====================
+# 设置此环境变量（非空且不为0）时启动即记录耗时，也可以在设置的「诊断」页打开
+PROFILE_ENV = "CALENDAR_PROFILE"
+# 耗时直方图各桶的上界（毫秒），超过最后一个上界的计入溢出桶
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+HISTOGRAM_LABELS = tuple(f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS) + (f">{HISTOGRAM_BOUNDS_MS[-1]}",)
+# 保留的最近调用数，用于导出Chrome trace
+TRACE_EVENT_LIMIT = 20000
+
+class TimingHistogram:
+    """一个计时点的耗时分布：次数、总和、最值和按 HISTOGRAM_BOUNDS_MS 分桶的计数"""
+    
+    __slots__ = ("count", "total", "min", "max", "buckets")
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    
+    def add(self, milliseconds):
+        self.count += 1
+        self.total += milliseconds
+        self.min = milliseconds if self.min is None else min(self.min, milliseconds)
+        self.max = max(self.max, milliseconds)
+        self.buckets[bisect_left(HISTOGRAM_BOUNDS_MS, milliseconds)] += 1
+    
+    def percentile(self, fraction):
+        """fraction分位数所在桶的上界（毫秒），落在溢出桶时为最大值"""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return HISTOGRAM_BOUNDS_MS[index] if index < len(HISTOGRAM_BOUNDS_MS) else self.max
+        return self.max
+    
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0,
+            "min_ms": round(self.min or 0, 3),
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "buckets": {label: count for label, count in zip(HISTOGRAM_LABELS, self.buckets) if count},
+        }
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+    
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+    
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+
+_NO_SPAN = nullcontext()
+
+class Profiler:
+    """耗时记录 - 默认关闭，关闭时计时点只多一次属性判断
+    
+    用 timed 装饰方法、span 包住代码段或 call 调用函数；开启后每次调用计入按名称的
+    直方图，并保留最近的调用供导出为Chrome trace（chrome://tracing 或 Perfetto 打开）。
+    """
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+    
+    def reset(self):
+        self.histograms = {}
+        self.events = deque(maxlen=TRACE_EVENT_LIMIT)
+        self.started = time.time()
+        self.origin = time.perf_counter()
+    
+    def enable(self, enabled=True):
+        self.enabled = enabled
+    
+    def record(self, name, start, end):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = TimingHistogram()
+        histogram.add((end - start) * 1e3)
+        self.events.append((name, start, end, threading.get_ident()))
+    
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NO_SPAN
+    
+    def call(self, name, func, *args):
+        if not self.enabled:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.record(name, start, time.perf_counter())
+    
+    def timed(self, name=None):
+        """方法装饰器，name默认为方法的限定名"""
+        def decorate(func):
+            label = name or func.__qualname__
+            
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(label, start, time.perf_counter())
+            return wrapper
+        return decorate
+    
+    def summary(self):
+        """[(名称, TimingHistogram)]，按总耗时从多到少排序"""
+        return sorted(self.histograms.items(), key=lambda item: -item[1].total)
+    
+    def to_dict(self):
+        return {
+            "app_version": APP_VERSION,
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "timings": {name: histogram.to_dict() for name, histogram in self.summary()},
+        }
+    
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+    
+    def export_chrome_trace(self, path):
+        """Chrome trace event格式：每次调用一个完整事件（ph=X），时间单位为微秒"""
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "pid": pid, "tid": tid,
+                   "ts": round((start - self.origin) * 1e6, 1),
+                   "dur": round((end - start) * 1e6, 1)}
+                  for name, start, end, tid in self.events]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+profiler = Profiler(os.environ.get(PROFILE_ENV, "") not in ("", "0"))
+
+# 常驻监控：设置此环境变量（1或报告文件路径）时启动即开启，也可用命令行参数 --profile-resident
+RESIDENT_PROFILE_ENV = "CALENDAR_RESIDENT_PROFILE"
+RESIDENT_SNAPSHOT_MINUTES = 10
+# 报告文件超过此大小时改名为 .1 后重新开始，只保留最近的两份
+RESIDENT_REPORT_BYTES = 1 << 20
+RESIDENT_TOP_ALLOCATIONS = 10
+# 按Python包装对象计数的Qt类型，反复刷新时这些对象不应持续增多
+RESIDENT_COUNTED_TYPES = ("QTableWidgetItem", "QListWidgetItem", "QTextCharFormat", "QTimer",
+                          "QMessageBox", "QDialog")
+
+def resident_report_path():
+    return os.path.join(get_data_dir(), "diagnostics", "resident_report.jsonl")
+
+class ResidentMonitor(QObject):
+    """常驻进程监控 - 定期记录内存分配、定时器唤醒次数和Qt对象数，写入滚动报告
+    
+    用于排查托盘常驻数周后的内存泄漏和唤醒过多：tracemalloc 给出当前内存和与上次
+    快照相比增长最多的分配位置；应用级事件过滤器统计各对象收到的定时器事件；
+    window.wakeups 是主窗口各定时回调的次数。快照逐行追加到报告文件（JSON Lines），
+    文件按大小滚动；内存中只保留第一份快照用于计算累计变化，监控本身不会越用越多。
+    """
+    
+    def __init__(self, window=None, report_path=None, interval_minutes=RESIDENT_SNAPSHOT_MINUTES):
+        super().__init__()
+        self.window = window
+        self.report_path = report_path or resident_report_path()
+        self.interval_minutes = interval_minutes
+        self.first = None
+        self.timer_events = Counter()
+        self.previous = None
+        self.timer = QTimer(self)
+        self.timer.setObjectName("resident_monitor")
+        self.timer.timeout.connect(self.snapshot)
+    
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        QApplication.instance().installEventFilter(self)
+        self.timer.start(int(self.interval_minutes * 60000))
+        self.snapshot()
+        return self
+    
+    def stop(self):
+        self.timer.stop()
+        QApplication.instance().removeEventFilter(self)
+    
+    def eventFilter(self, receiver, event):
+        if event.type() == QEvent.Timer:
+            self.timer_events[receiver.objectName() or type(receiver).__name__] += 1
+        return False
+    
+    def allocation_growth(self, current):
+        """与上次快照相比增长最多的分配位置"""
+        if self.previous is None:
+            return []
+        stats = [stat for stat in current.compare_to(self.previous, "lineno") if stat.size_diff > 0]
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        growth = []
+        for stat in stats[:RESIDENT_TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            growth.append({"where": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                           "size_kb": round(stat.size / 1024, 1),
+                           "size_diff_kb": round(stat.size_diff / 1024, 1),
+                           "count_diff": stat.count_diff})
+        return growth
+    
+    def qt_objects(self):
+        widgets = QApplication.allWidgets()
+        table_items = 0
+        for widget in widgets:
+            if isinstance(widget, QTableWidget):
+                rows, columns = widget.rowCount(), widget.columnCount()
+                table_items += sum(1 for row in range(rows) for column in range(columns)
+                                   if widget.item(row, column) is not None)
+        counted = set(RESIDENT_COUNTED_TYPES)
+        wrappers = Counter()
+        for obj in gc.get_objects():
+            name = type(obj).__name__
+            if name in counted:
+                wrappers[name] += 1
+        return {
+            "widgets": len(widgets),
+            "widget_types": dict(Counter(type(widget).__name__ for widget in widgets).most_common(10)),
+            "table_items": table_items,
+            "wrappers": dict(sorted(wrappers.items())),
+        }
+    
+    def snapshot(self):
+        """记录一次快照并重写报告，返回快照"""
+        # 先回收循环引用，只统计真正存活的对象
+        gc.collect()
+        current = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+        memory, peak = tracemalloc.get_traced_memory()
+        entry = {
+            "app_version": APP_VERSION,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "memory_kb": round(memory / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top_growth": self.allocation_growth(current),
+            "wakeups": dict(self.window.wakeups) if self.window is not None else {},
+            "timer_events": dict(self.timer_events),
+            "qt": self.qt_objects(),
+        }
+        self.previous = current
+        if self.first is None:
+            self.first = entry
+        entry["since_start"] = self.summary(self.first, entry)
+        self.write_report(entry)
+        return entry
+    
+    @staticmethod
+    def summary(first, last):
+        """两份快照之间的变化；唤醒次数换算为每小时"""
+        hours = (datetime.fromisoformat(last["time"]) - datetime.fromisoformat(first["time"])
+                 ).total_seconds() / 3600
+        wakeups = sum(last["wakeups"].values()) - sum(first["wakeups"].values())
+        return {
+            "hours": round(hours, 2),
+            "memory_growth_kb": round(last["memory_kb"] - first["memory_kb"], 1),
+            "widget_growth": last["qt"]["widgets"] - first["qt"]["widgets"],
+            "table_item_growth": last["qt"]["table_items"] - first["qt"]["table_items"],
+            "wakeups_per_hour": round(wakeups / hours, 2) if hours else None,
+        }
+    
+    def write_report(self, entry):
+        os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+        try:
+            if os.path.getsize(self.report_path) > RESIDENT_REPORT_BYTES:
+                os.replace(self.report_path, self.report_path + ".1")
+        except OSError:
+            pass
+        with open(self.report_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
 # ==================== 数据管理类 ====================
+# 重复日期展开结果的缓存条数（按日期范围）
+RECURRENCE_CACHE_SIZE = 32
+
 class DataManager:
     """数据管理器 - 负责加载、保存和管理校历数据"""
     
-    def __init__(self):
+    def __init__(self, backend=None, profile=DEFAULT_PROFILE):
+        self.profile = profile
+        self.backend = backend or create_storage_backend(profile)
         self.data = None
+        self.on_write = None
+        # 归档档案只读，由ProfileManager.attach设置
+        self.read_only = False
+        # 每次数据变化（本地修改或外部修改重新加载）递增，供界面和索引判断缓存是否过期
+        self.generation = 0
+        self.listeners = []
+        # 与存储一致的基准版本：存储戳和各数据段的指纹，用于检测和合并外部修改
+        self._stamp = None
+        self._base = {}
+        self._batch_depth = 0
+        # 批量更新期间推迟的写入 [(数据段, 写入函数, 参数, 追加的记录, 删除的记录)]
+        self._pending_writes = []
+        self._schedule = None
+        self._class_schedule = None
+        self._day_table = None
+        self._occurrences = OrderedDict()
+        self._occurrences_generation = None
         self.load_data()
     
+    def open_profile(self, profile):
+        """切换到另一个档案并加载其数据"""
+        close = getattr(self.backend, "close", None)
+        if close:
+            close()
+        self.profile = profile
+        self.backend = create_storage_backend(profile)
+        self.load_data()
+        self._changed(set(self.data))
+    
     def load_data(self):
         """加载数据，如果不存在则使用默认数据"""
-        data_file = get_data_file()
-        if os.path.exists(data_file):
-            try:
-                with open(data_file, 'r', encoding='utf-8') as f:
-                    self.data = json.load(f)
-            except:
-                self.data = DEFAULT_DATA.copy()
+        # 版本戳在读取之前取得：读取期间文件被替换时戳与新文件不符，之后会重新加载
+        stamp = self.backend.stamp()
+        try:
+            self.data = self.backend.load()
+        except:
+            self.data = None
+        if self.data is None:
+            self.data = decode_document(DEFAULT_DATA)
+        self._base = {}
+        self._remember_base()
+        self._stamp = stamp
+    
+    def add_listener(self, callback):
+        """注册数据变化监听器，回调参数为 (发生变化的数据段集合, 增量)
+        
+        增量为 {数据段: [(追加的记录, 删除的记录), ...]}，按写入顺序排列；只有全部修改都是
+        追加或删除记录的数据段才有增量，其他数据段需要监听器自己重新读取。
+        """
+        self.listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+    
+    def _changed(self, sections, deltas=None):
+        self.generation += 1
+        deltas = deltas or {}
+        for callback in list(self.listeners):
+            callback(sections, deltas)
+    
+    def _remember_base(self, sections=None, appended=None, removed=None):
+        """记录刚与存储同步的数据段指纹；appended/removed为追加或删除的记录时增量更新"""
+        if appended is not None and sections and all(s in self._base for s in sections):
+            for section in sections:
+                self._base[section].update(map(record_fingerprint, appended))
+        elif removed is not None and sections and all(s in self._base for s in sections):
+            for section in sections:
+                self._base[section] -= Counter(map(record_fingerprint, removed))
         else:
-            self.data = DEFAULT_DATA.copy()
+            for section in sections if sections is not None else set(self.data) | set(self._base):
+                if section in self.data:
+                    self._base[section] = section_fingerprint(section, self.data[section])
+                else:
+                    self._base.pop(section, None)
+        self._stamp = self.backend.stamp()
     
+    def _merge_external_changes(self):
+        """写入前检查存储是否被其他程序修改过，若是则三方合并
+        
+        返回合并后与内存不同的数据段；存储未被修改时返回None。
+        """
+        stamp = self.backend.stamp()
+        if stamp == self._stamp:
+            return None
+        try:
+            disk = self.backend.load()
+        except (OSError, ValueError, sqlite3.Error):
+            disk = None
+        if disk is None:
+            return None
+        changed = set()
+        for section in set(disk) | set(self.data):
+            base = self._base.get(section)
+            theirs = disk.get(section)
+            if section_fingerprint(section, theirs) == base:
+                continue
+            local = self.data.get(section)
+            if section_fingerprint(section, local) == base:
+                merged = theirs
+            elif section in RECORD_SECTIONS and theirs is not None and local is not None:
+                merged = merge_records(base, local, theirs)
+            else:
+                # 双方都修改了同一设置项时以本地为准
+                continue
+            changed.add(section)
+            if merged is None:
+                self.data.pop(section, None)
+            else:
+                self.data[section] = merged
+        return changed
+    
+    def _check_writable(self):
+        """修改数据前检查：只读归档拒绝修改，且内存中的数据保持不变"""
+        if self.read_only:
+            raise PermissionError(f"档案「{self.profile}」是只读归档，不能修改")
+    
+    @profiler.timed("DataManager.write")
+    def _write(self, sections, write, *args, appended=None, removed=None):
+        """写入存储并通知监听器；批量更新期间推迟到批量结束时一起写入"""
+        self._check_writable()
+        write_item = (set(sections), write, args, appended, removed)
+        if self._batch_depth:
+            self._pending_writes.append(write_item)
+            return
+        self._flush([write_item])
+    
+    def _flush(self, writes):
+        """依次执行写入；后端不支持按行写入或需要整体保存时只整体保存一次"""
+        sections = set().union(*(item[0] for item in writes))
+        deltas = {}
+        replaced = set()
+        for write_sections, _, _, appended, removed in writes:
+            for section in write_sections:
+                if appended is None and removed is None:
+                    replaced.add(section)
+                else:
+                    deltas.setdefault(section, []).append((appended or (), removed or ()))
+        deltas = {section: steps for section, steps in deltas.items() if section not in replaced}
+        # 从检查外部修改到写入完成都持有文件锁，其他实例不会在中间写入
+        with self.backend.lock():
+            merged = self._merge_external_changes()
+            row_writes = len(writes) == 1 or (
+                self.backend.ROW_WRITES and all(item[1] != self.backend.save for item in writes))
+            if merged is None and row_writes:
+                for write_sections, write, args, appended, removed in writes:
+                    write(self.data, *args)
+                    self._remember_base(write_sections, appended, removed)
+            else:
+                # 已合并外部修改时单点写入不再适用，改为整体保存
+                self.backend.save(self.data)
+                self._remember_base()
+                if merged:
+                    sections |= merged
+                    # 合并了外部修改，增量不再完整
+                    deltas = {}
+        self._changed(sections, deltas)
+        if self.on_write:
+            self.on_write(self)
+    
+    @profiler.timed("DataManager.save_data")
     def save_data(self):
-        """保存数据到文件"""
-        data_file = get_data_file()
-        with open(data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        """保存全部数据（批量更新期间推迟到批量结束时统一写入）"""
+        self._write(set(self.data), self.backend.save)
+    
+    def reload_if_changed(self):
+        """存储被其他程序修改时重新加载，返回发生变化的数据段"""
+        if self._batch_depth or self.backend.stamp() == self._stamp:
+            return set()
+        try:
+            # 版本戳和数据在同一次加锁中读取，两者一定对应同一次写入
+            with self.backend.lock():
+                stamp = self.backend.stamp()
+                disk = self.backend.load()
+        except (OSError, ValueError, sqlite3.Error):
+            # 文件可能正在被写入，等下一次变化通知再读
+            return set()
+        if disk is None:
+            return set()
+        fingerprints = {section: section_fingerprint(section, value)
+                        for section, value in disk.items()}
+        changed = {section for section in set(fingerprints) | set(self._base)
+                   if fingerprints.get(section) != self._base.get(section)}
+        self.data = disk
+        self._base = fingerprints
+        self._stamp = stamp
+        if changed:
+            self._changed(changed)
+        return changed
+    
+    @contextmanager
+    def batch(self):
+        """批量更新 - 期间的多次修改只在最外层结束时写入一次"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._pending_writes:
+                writes, self._pending_writes = self._pending_writes, []
+                self._flush(writes)
     
     def reset_to_default(self):
         """重置为默认数据"""
-        self.data = DEFAULT_DATA.copy()
+        self._check_writable()
+        self.data = decode_document(DEFAULT_DATA)
         self.save_data()
     
     def get_school_name(self):
@@ -154,20 +1907,36 @@ class DataManager:
     
     def get_semester_dates(self, semester):
         """获取学期开始和结束日期"""
-        sem_data = self.data.get("semesters", {}).get(semester, {})
-        start = sem_data.get("start_date")
-        end = sem_data.get("end_date")
-        if start and end:
-            return (
-                datetime.strptime(start, "%Y-%m-%d").date(),
-                datetime.strptime(end, "%Y-%m-%d").date()
-            )
+        sem = self.data.get("semesters", {}).get(semester)
+        if sem and sem.start_date and sem.end_date:
+            return sem.start_date, sem.end_date
         return None, None
     
+    def get_term_schedule(self):
+        """学期课次时间表，数据变化后重新生成"""
+        if self._schedule is None or self._schedule.generation != self.generation:
+            self._schedule = TermSchedule(self)
+        return self._schedule
+    
+    def get_day_table(self):
+        """学期日期类型表，数据变化后重新生成"""
+        if self._day_table is None or self._day_table.generation != self.generation:
+            self._day_table = DayTable(self)
+        return self._day_table
+    
+    def get_class_periods(self):
+        """节次 -> ClassPeriod"""
+        return self.data.get("class_times", {})
+    
+    def get_class_schedule(self):
+        """编译后的节次时间表，数据变化后重新生成"""
+        if self._class_schedule is None or self._class_schedule.generation != self.generation:
+            self._class_schedule = ClassSchedule(self)
+        return self._class_schedule
+    
     def get_class_times(self):
-        """获取节次时间表"""
-        times = self.data.get("class_times", {})
-        return {int(k): tuple(v) for k, v in times.items()}
+        """获取默认的节次时间表 {节次: (开始, 结束)}，返回的字典是共享的，不要修改"""
+        return self.get_class_schedule().default.times
     
     def get_important_dates(self):
         return self.data.get("important_dates", [])
@@ -175,88 +1944,505 @@ class DataManager:
     def get_courses(self):
         return self.data.get("courses", [])
     
+    def get_recurring_dates(self):
+        return self.data.get("recurring_dates", [])
+    
+    def get_recurring_occurrences(self, first, last):
+        """[first, last] 内重复日期的各次记录，按日期排序；展开结果按日期范围缓存，数据变化后失效"""
+        if self._occurrences_generation != self.generation:
+            self._occurrences.clear()
+            self._occurrences_generation = self.generation
+        key = (first, last)
+        result = self._occurrences.get(key)
+        if result is not None:
+            self._occurrences.move_to_end(key)
+            return result
+        result = sorted((rule.occurrence(day) for rule in self.get_recurring_dates()
+                         for day in rule.occurrences(first, last)), key=lambda item: item.date)
+        self._occurrences[key] = result
+        if len(self._occurrences) > RECURRENCE_CACHE_SIZE:
+            self._occurrences.popitem(last=False)
+        return result
+    
+    def get_term_range(self):
+        """两个学期覆盖的日期范围，没有设置学期时为 (None, None)"""
+        dates = [day for key in ("fall", "spring") for day in self.get_semester_dates(key) if day]
+        return (min(dates), max(dates)) if dates else (None, None)
+    
     def set_school_info(self, name, year):
+        self._check_writable()
         self.data["school_name"] = name
         self.data["academic_year"] = year
-        self.save_data()
+        self._write({"school_name", "academic_year"}, self.backend.save_settings)
     
     def set_semester(self, semester, name, start_date, end_date):
+        self._check_writable()
         if "semesters" not in self.data:
             self.data["semesters"] = {}
-        self.data["semesters"][semester] = {
+        self.data["semesters"][semester] = Semester.from_dict({
             "name": name,
             "start_date": start_date,
             "end_date": end_date
-        }
-        self.save_data()
+        })
+        self._write({"semesters"}, self.backend.save_settings)
+    
+    def _replace_records(self, section, records):
+        # 接受模型或JSON字典，格式错误时抛出ValueError
+        self._check_writable()
+        records = [RECORD_MODELS[section].from_dict(record) for record in records]
+        self.data[section] = records
+        # 批量更新中随后的追加会扩展同一个列表，推迟的写入需要当时的副本
+        self._write({section}, self.backend.replace_records, section, list(records))
+    
+    def _append_records(self, section, records):
+        self._check_writable()
+        records = [RECORD_MODELS[section].from_dict(record) for record in records]
+        self.data.setdefault(section, []).extend(records)
+        self._write({section}, self.backend.append_records, section, records,
+                    appended=records)
+    
+    def _delete_records(self, section, rows):
+        self._check_writable()
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        records = self.data.get(section, [])
+        removed = [records[row] for row in rows]
+        for row in reversed(rows):
+            del records[row]
+        self._write({section}, self.backend.delete_records, section, rows, removed=removed)
     
     def set_important_dates(self, dates):
-        self.data["important_dates"] = dates
-        self.save_data()
+        self._replace_records("important_dates", dates)
     
     def add_important_date(self, date_str, event, category):
-        if "important_dates" not in self.data:
-            self.data["important_dates"] = []
-        self.data["important_dates"].append({
-            "date": date_str,
-            "event": event,
-            "category": category
-        })
-        self.save_data()
+        self._append_records("important_dates", [ImportantDate(date_str, event, category)])
     
     def set_courses(self, courses):
-        self.data["courses"] = courses
-        self.save_data()
+        self._replace_records("courses", courses)
     
     def add_course(self, course):
-        if "courses" not in self.data:
-            self.data["courses"] = []
-        self.data["courses"].append(course)
-        self.save_data()
+        self._append_records("courses", [course])
+    
+    def extend_important_dates(self, items):
+        """批量追加重要日期，只写入一次"""
+        self._append_records("important_dates", items)
+    
+    def extend_courses(self, courses):
+        """批量追加课程，只写入一次"""
+        self._append_records("courses", courses)
+    
+    def remove_important_dates(self, rows):
+        """按行号批量删除重要日期，只写入一次"""
+        self._delete_records("important_dates", rows)
+    
+    def remove_courses(self, rows):
+        """按行号批量删除课程，只写入一次"""
+        self._delete_records("courses", rows)
+    
+    def set_recurring_dates(self, rules):
+        # 接受 RecurringDate 或JSON字典，格式错误时抛出ValueError
+        self._check_writable()
+        self.data["recurring_dates"] = [RecurringDate.from_dict(rule) for rule in rules]
+        self._write({"recurring_dates"}, self.backend.save_settings)
+    
+    def add_recurring_date(self, rule):
+        self.set_recurring_dates(self.get_recurring_dates() + [rule])
 
-# 全局数据管理器
-data_manager = DataManager()
+# ==================== 档案管理 ====================
+PROFILE_CACHE_SIZE = 8
+# 新建档案时不沿用的数据段：课程、重要日期和按日期的安排只属于原档案
+PROFILE_CONTENT_SECTIONS = RECORD_SECTIONS + ("recurring_dates", "day_overrides")
+
+class ProfileManager:
+    """档案管理器 - 按学生/班级、学年分档保存数据
+    
+    清单文件只记录每个档案的摘要，列出档案时不需要解析各档案的数据；
+    只有当前档案常驻内存，其他档案按需加载并在有限的缓存中保留。
+    """
+    
+    def __init__(self):
+        self.manifest_file = os.path.join(get_data_dir(), "profiles.json")
+        self.loaded = OrderedDict()
+        self.manifest = self.load_manifest()
+        self.listeners = []
+    
+    def load_manifest(self):
+        manifest = None
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except:
+                manifest = None
+        if not manifest or not manifest.get("profiles"):
+            manifest = {
+                "active": DEFAULT_PROFILE,
+                "profiles": {DEFAULT_PROFILE: {"name": "默认档案"}}
+            }
+        if manifest.get("active") not in manifest["profiles"]:
+            manifest["active"] = DEFAULT_PROFILE
+        return manifest
+    
+    def save_manifest(self):
+        temp_file = self.manifest_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.manifest_file)
+    
+    @property
+    def active(self):
+        return self.manifest["active"]
+    
+    def get_info(self, profile_id):
+        return self.manifest["profiles"].get(profile_id, {})
+    
+    def get_display_name(self, profile_id):
+        info = self.get_info(profile_id)
+        name = info.get("name", profile_id)
+        if info.get("archived"):
+            name += "（归档）"
+        return name
+    
+    def list_profiles(self):
+        """列出所有档案 [(档案ID, 摘要)]，只读取清单"""
+        return sorted(self.manifest["profiles"].items(),
+                      key=lambda item: (item[1].get("archived", False), item[0] != DEFAULT_PROFILE,
+                                        item[1].get("name", item[0])))
+    
+    def attach(self, manager):
+        """登记已加载的DataManager，修改数据时同步清单中的摘要；归档档案设为只读"""
+        manager.on_write = self.update_summary
+        manager.read_only = bool(self.get_info(manager.profile).get("archived"))
+    
+    def add_listener(self, callback):
+        """注册档案切换监听器，回调参数为新的当前档案ID"""
+        self.listeners.append(callback)
+    
+    def update_summary(self, manager):
+        info = self.manifest["profiles"].setdefault(manager.profile, {"name": manager.profile})
+        summary = {
+            "school_name": manager.get_school_name(),
+            "academic_year": manager.get_academic_year(),
+            "courses": len(manager.get_courses()),
+            "important_dates": len(manager.get_important_dates()),
+        }
+        if any(info.get(key) != value for key, value in summary.items()):
+            info.update(summary)
+            info["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M")
+            self.save_manifest()
+    
+    def get_manager(self, profile_id):
+        """获取档案的DataManager，非当前档案按需加载"""
+        if profile_id == self.active:
+            return data_manager
+        if profile_id not in self.manifest["profiles"]:
+            raise KeyError(profile_id)
+        manager = self.loaded.get(profile_id)
+        if manager is None:
+            manager = DataManager(profile=profile_id)
+            self.attach(manager)
+            self.loaded[profile_id] = manager
+            while len(self.loaded) > PROFILE_CACHE_SIZE:
+                self.loaded.popitem(last=False)
+        else:
+            self.loaded.move_to_end(profile_id)
+        return manager
+    
+    def new_profile_id(self, name):
+        base = re.sub(r'[\\/:*?"<>|\s]+', "_", name).strip("._") or "profile"
+        profile_id = base
+        index = 2
+        while profile_id in self.manifest["profiles"] or profile_id == DEFAULT_PROFILE:
+            profile_id = f"{base}_{index}"
+            index += 1
+        return profile_id
+    
+    def create_profile(self, name, academic_year, template=None):
+        """新建档案，沿用模板档案的学校、学期和节次设置，课程、重要日期、重复日期和放假调休为空"""
+        profile_id = self.new_profile_id(name)
+        data = {key: copy.deepcopy(value) for key, value in (template or data_manager).data.items()
+                if key not in PROFILE_CONTENT_SECTIONS}
+        data["academic_year"] = academic_year
+        data["important_dates"] = []
+        data["courses"] = []
+        self.manifest["profiles"][profile_id] = {"name": name}
+        create_storage_backend(profile_id).save(data)
+        self.save_manifest()
+        return profile_id
+    
+    def archive_profile(self, profile_id):
+        """把档案当前学年的完整数据另存为只读归档"""
+        manager = self.get_manager(profile_id)
+        info = self.get_info(profile_id)
+        year = manager.get_academic_year()
+        archive_id = self.new_profile_id(f"{profile_id}_{year}")
+        self.manifest["profiles"][archive_id] = {
+            "name": f"{info.get('name', profile_id)} {year}学年",
+            "archived": True,
+            "school_name": manager.get_school_name(),
+            "academic_year": year,
+            "courses": len(manager.get_courses()),
+            "important_dates": len(manager.get_important_dates()),
+            "updated": datetime.now().strftime("%Y-%m-%d %H:%M")
+        }
+        create_storage_backend(archive_id).save(copy.deepcopy(manager.data))
+        self.save_manifest()
+        return archive_id
+    
+    def switch_profile(self, profile_id):
+        """切换当前档案，全局data_manager就地加载新档案"""
+        if profile_id == self.active or profile_id not in self.manifest["profiles"]:
+            return False
+        self.loaded.pop(profile_id, None)
+        self.manifest["active"] = profile_id
+        self.save_manifest()
+        data_manager.open_profile(profile_id)
+        self.attach(data_manager)
+        for callback in list(self.listeners):
+            callback(profile_id)
+        return True
+
+# 全局档案管理器和当前档案的数据管理器
+profile_manager = ProfileManager()
+data_manager = DataManager(profile=profile_manager.active)
+profile_manager.attach(data_manager)
+
+# ==================== 工具函数 ====================
+class DayInfo:
+    """学期中某一天的安排：周次、日期类型，以及当天按哪一天的课表上课"""
+    
+    __slots__ = ("day", "semester", "week", "day_type", "weekday", "class_week", "note")
+    
+    def __init__(self, day, semester, week):
+        self.day = day
+        self.semester = semester
+        self.week = week
+        self.day_type = DAY_TEACHING
+        # 当天实际执行的课表：星期几、第几周（调休补课时与日历上的不同）
+        self.weekday = day.isoweekday()
+        self.class_week = week
+        self.note = ""
+    
+    @property
+    def has_classes(self):
+        return self.day_type != DAY_HOLIDAY
+    
+    def describe(self):
+        """非正常上课日的说明，正常上课日为空字符串"""
+        note = f"（{self.note}）" if self.note else ""
+        if self.day_type == DAY_HOLIDAY:
+            return f"放假{note}"
+        if self.day_type == DAY_MAKEUP:
+            return f"调休补课：上第{self.class_week}周{WEEKDAY_NAMES[self.weekday - 1]}的课{note}"
+        if self.day_type == DAY_EXAM:
+            return f"考试{note}"
+        return ""
+
+class DayTable:
+    """学期日期类型表 - 每个学期每天一项，记录放假、调休补课和考试
+    
+    由重要日期（「放假」类别和法定节假日为放假，「考试」类别为考试）和 day_overrides 中的手动设置
+    生成，手动设置优先；按日期查询只是一次下标访问。由 DataManager.get_day_table
+    按数据代数缓存。
+    """
+    
+    SEMESTER_NAMES = (("fall", "秋季学期"), ("spring", "春季学期"))
+    
+    def __init__(self, manager=None):
+        manager = manager or data_manager
+        self.generation = manager.generation
+        # [(第一天的序数, 最后一天的序数, [DayInfo])]，两个学期日期重叠时以前一个为准
+        self.terms = []
+        for key, name in self.SEMESTER_NAMES:
+            start, end = manager.get_semester_dates(key)
+            if not start or not end:
+                continue
+            days = [DayInfo(start + timedelta(days=offset), name, offset // 7 + 1)
+                    for offset in range((end - start).days + 1)]
+            self.terms.append((start.toordinal(), end.toordinal(), days))
+        
+        for item in manager.get_important_dates():
+            day_type = event_day_type(item.category, item.event)
+            if day_type is None:
+                continue
+            # 连续多天的假期可以在记录中加 end_date
+            last = item.extra.get("end_date") if item.extra else None
+            try:
+                last = _parse_date(last) if last else item.day
+            except (TypeError, ValueError):
+                last = item.day
+            self.mark(item.day, last, day_type, note=item.event)
+        if self.terms:
+            for rule in manager.get_recurring_dates():
+                day_type = event_day_type(rule.category, rule.event)
+                if day_type is None:
+                    continue
+                for _, _, days in self.terms:
+                    for day in rule.occurrences(days[0].day, days[-1].day):
+                        self.mark(day, day, day_type, note=rule.event)
+        for override in manager.data.get("day_overrides", []):
+            self.mark(override.first, override.last, override.day_type,
+                      override.weekday, override.week, override.note)
+    
+    def mark(self, first, last, day_type, weekday=None, week=None, note=""):
+        """把 [first, last] 中落在学期内的日期设为指定类型"""
+        for term_first, term_last, days in self.terms:
+            low = max(first.toordinal(), term_first)
+            high = min(last.toordinal(), term_last)
+            for info in days[low - term_first:high - term_first + 1]:
+                info.day_type = day_type
+                info.note = note
+                if day_type == DAY_MAKEUP:
+                    info.weekday = weekday
+                    info.class_week = week or info.week
+                else:
+                    info.weekday = info.day.isoweekday()
+                    info.class_week = info.week
+    
+    def day_info(self, day):
+        """某一天的 DayInfo，不在学期内时为 None"""
+        ordinal = day.toordinal()
+        for first, last, days in self.terms:
+            if first <= ordinal <= last:
+                return days[ordinal - first]
+        return None
+    
+    def class_day(self, day):
+        """当天执行的课表 (星期几, 第几周)，不在学期内或放假时为 None"""
+        info = self.day_info(day)
+        if info is None or not info.has_classes:
+            return None
+        return info.weekday, info.class_week
+    
+    def days(self):
+        """学期内的每一天，重叠的日期只出现一次"""
+        for _, _, days in self.terms:
+            for info in days:
+                if self.day_info(info.day) is info:
+                    yield info
 
-# ==================== 工具函数 ====================
-def get_week_number(target_date):
+def get_week_number(target_date, manager=None):
     """计算给定日期是第几周"""
     if isinstance(target_date, datetime):
         target_date = target_date.date()
-    
-    # 检查秋季学期
-    fall_start, fall_end = data_manager.get_semester_dates("fall")
-    if fall_start and fall_end and fall_start <= target_date <= fall_end:
-        days_diff = (target_date - fall_start).days
-        week_num = days_diff // 7 + 1
-        return ("秋季学期", week_num)
-    
-    # 检查春季学期
-    spring_start, spring_end = data_manager.get_semester_dates("spring")
-    if spring_start and spring_end and spring_start <= target_date <= spring_end:
-        days_diff = (target_date - spring_start).days
-        week_num = days_diff // 7 + 1
-        return ("春季学期", week_num)
-    
-    return (None, None)
+    manager = manager or data_manager
+    info = manager.get_day_table().day_info(target_date)
+    if info is None:
+        return (None, None)
+    return (info.semester, info.week)
+
+WEEKDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
 
 def get_weekday_name(target_date):
     """获取星期几的中文名称"""
-    weekdays = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-    return weekdays[target_date.weekday()]
+    return WEEKDAY_NAMES[target_date.weekday()]
 
-def get_courses_on_date(target_date):
-    """获取指定日期的课程"""
-    semester, week_num = get_week_number(target_date)
-    if not semester:
+def get_courses_on_date(target_date, manager=None):
+    """获取指定日期的课程，放假的日期没有课，调休补课的日期按所补那天的课表"""
+    manager = manager or data_manager
+    class_day = manager.get_day_table().class_day(target_date)
+    if not class_day:
         return []
     
-    weekday = target_date.weekday() + 1
-    courses = []
-    for course in data_manager.get_courses():
-        if week_num in course.get("weeks", []) and weekday == course.get("weekday"):
-            courses.append(course)
+    weekday, week_num = class_day
+    bit = 1 << week_num
+    courses = [course for course in manager.get_courses()
+               if course.weekday == weekday and course.week_mask & bit]
+    
+    return sorted(courses, key=lambda course: course.sections[0] if course.sections else 0)
+
+class Session:
+    """一次上课：某门课在某一天的一段连续节次"""
+    __slots__ = ("day", "start", "end", "start_time", "end_time", "course")
+    
+    def __init__(self, day, start, end, start_time, end_time, course):
+        self.day = day
+        # 开始和结束时刻，单位为分钟（日期序数 × 1440 + 当天分钟数）
+        self.start = start
+        self.end = end
+        self.start_time = start_time
+        self.end_time = end_time
+        self.course = course
+    
+    def sections_text(self):
+        sections = self.course.sections
+        return f"第{sections[0]}-{sections[-1]}节" if sections else ""
+
+def moment_of(moment):
+    """datetime 对应的分钟时刻，与 Session.start/end 可直接比较"""
+    return moment.toordinal() * 1440 + moment.hour * 60 + moment.minute
+
+class TermSchedule:
+    """学期课次时间表 - 把两个学期的全部上课时段按开始时刻排序
+    
+    「当前课程」「下一节课」「某天的课程」都在有序数组上二分查找，不再逐门课程
+    解析时间；由 DataManager.get_term_schedule 按数据代数缓存。
+    """
+    
+    def __init__(self, manager=None):
+        manager = manager or data_manager
+        self.generation = manager.generation
+        class_schedule = manager.get_class_schedule()
+        # 星期几 -> [(课程, 开始分钟, 结束分钟, 开始时间, 结束时间)]
+        by_weekday = {}
+        for course in manager.get_courses():
+            sections = course.sections
+            span = class_schedule.for_course(course).span(sections[0], sections[-1]) if sections else None
+            if not span:
+                continue
+            start_minute, end_minute = span
+            by_weekday.setdefault(course.weekday, []).append(
+                (course, start_minute, end_minute, minutes_to_hm(start_minute), minutes_to_hm(end_minute)))
+        
+        sessions = []
+        # 逐日按日期类型表取当天执行的课表，放假和调休补课都在表中处理
+        for info in manager.get_day_table().days():
+            if not info.has_classes or info.weekday not in by_weekday:
+                continue
+            bit = 1 << info.class_week
+            base = info.day.toordinal() * 1440
+            for course, start_minute, end_minute, start_time, end_time in by_weekday[info.weekday]:
+                if course.week_mask & bit:
+                    sessions.append(Session(info.day, base + start_minute, base + end_minute,
+                                            start_time, end_time, course))
+        sessions.sort(key=lambda session: session.start)
+        self.sessions = sessions
+        self.starts = array("q", (session.start for session in sessions))
+        # 到每个位置为止最晚的下课时刻，用于在课程重叠时判断是否仍在上课
+        self.running_ends = array("q")
+        latest = 0
+        for session in sessions:
+            latest = max(latest, session.end)
+            self.running_ends.append(latest)
+    
+    def current_session(self, now):
+        """now 时正在上的课，没有则为 None"""
+        moment = moment_of(now)
+        index = bisect_right(self.starts, moment) - 1
+        while index >= 0 and self.running_ends[index] > moment:
+            if self.sessions[index].end > moment:
+                return self.sessions[index]
+            index -= 1
+        return None
+    
+    def next_session(self, now):
+        """now 之后开始的第一节课，没有则为 None"""
+        index = bisect_right(self.starts, moment_of(now))
+        return self.sessions[index] if index < len(self.sessions) else None
+    
+    def sessions_between(self, start, end):
+        """开始时刻在 [start, end) 内的课程"""
+        low = bisect_left(self.starts, moment_of(start))
+        high = bisect_left(self.starts, moment_of(end))
+        return self.sessions[low:high]
     
-    return sorted(courses, key=lambda x: x.get("sections", [0])[0])
+    def sessions_on(self, day):
+        """某一天的课程，按开始时间排序"""
+        base = day.toordinal() * 1440
+        low = bisect_left(self.starts, base)
+        high = bisect_left(self.starts, base + 1440)
+        return self.sessions[low:high]
 
 def get_app_path():
     if getattr(sys, 'frozen', False):
@@ -264,6 +2450,8 @@ def get_app_path():
     return os.path.abspath(__file__)
 
 def is_autostart_enabled():
+    if winreg is None:
+        return False
     try:
         key = winreg.OpenKey(
             winreg.HKEY_CURRENT_USER,
@@ -281,6 +2469,8 @@ def is_autostart_enabled():
         return False
 
 def set_autostart(enable):
+    if winreg is None:
+        return
     key = winreg.OpenKey(
         winreg.HKEY_CURRENT_USER,
         r"Software\Microsoft\Windows\CurrentVersion\Run",
@@ -298,7 +2488,1452 @@ def set_autostart(enable):
     finally:
         winreg.CloseKey(key)
 
+WEEKDAY_MAP = {
+    "周一": 1, "周二": 2, "周三": 3, "周四": 4, "周五": 5, "周六": 6, "周日": 7,
+    "星期一": 1, "星期二": 2, "星期三": 3, "星期四": 4, "星期五": 5, "星期六": 6, "星期日": 7,
+    "1": 1, "2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7
+}
+
+def parse_range(text):
+    """解析范围字符串如 '1-16' 或 '1,3,5'"""
+    result = []
+    parts = text.replace(" ", "").replace("，", ",").split(",")
+    for part in parts:
+        if "-" in part:
+            start, end = part.split("-")
+            result.extend(range(int(start), int(end) + 1))
+        else:
+            result.append(int(part))
+    return result
+
+@profiler.timed("import.excel")
+def read_excel_courses(file_path):
+    """读取Excel课表，列顺序为 课程名, 教师, 教室, 星期, 节次, 周次；格式错误的行跳过"""
+    import openpyxl
+    # 只读模式按行流式读取，大表格也不必先载入全部单元格
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        courses = []
+        for row in wb.active.iter_rows(min_row=2, values_only=True):
+            if not row or not row[0]:
+                continue
+            row = tuple(row) + (None,) * (6 - len(row))
+            try:
+                courses.append(Course.from_dict({
+                    "name": str(row[0]),
+                    "teacher": str(row[1]) if row[1] else "",
+                    "location": str(row[2]) if row[2] else "",
+                    "weekday": WEEKDAY_MAP.get(str(row[3]).strip(), 1),
+                    "sections": parse_range(str(row[4])) if row[4] else [1, 2],
+                    "weeks": parse_range(str(row[5])) if row[5] else list(range(1, 17)),
+                    "type": "导入"
+                }))
+            except Exception:
+                continue
+        return courses
+    finally:
+        wb.close()
+
+# ==================== 多租户课表 ====================
+class TimetableStore:
+    """多租户课表存储 - 在一个进程内保存数万名学生的课表
+    
+    课程记录经过驻留共享，每个租户只保存记录编号数组；学期和节次设置取自manager。
+    """
+    
+    def __init__(self, manager=None):
+        self.manager = manager or data_manager
+        self.records = []
+        self.record_ids = {}
+        self.refcounts = []
+        self.free_ids = []
+        self.tenants = {}
+        # 租户课表每次变化都加一，供按天构建的派生数据判断是否过期
+        self.generation = 0
+    
+    def intern(self, course):
+        """返回课程对应的共享记录编号，必要时新建记录"""
+        record = Course.from_dict(course)
+        key = record.key()
+        record_id = self.record_ids.get(key)
+        if record_id is None:
+            if self.free_ids:
+                record_id = self.free_ids.pop()
+                self.records[record_id] = record
+                self.refcounts[record_id] = 0
+            else:
+                record_id = len(self.records)
+                self.records.append(record)
+                self.refcounts.append(0)
+            self.record_ids[key] = record_id
+        self.refcounts[record_id] += 1
+        return record_id
+    
+    def release(self, record_id):
+        self.refcounts[record_id] -= 1
+        if not self.refcounts[record_id]:
+            del self.record_ids[self.records[record_id].key()]
+            self.records[record_id] = None
+            self.free_ids.append(record_id)
+    
+    def set_tenant(self, tenant_id, courses):
+        """设置（或替换）一个租户的课表"""
+        record_ids = array("I", (self.intern(course) for course in courses))
+        self.remove_tenant(tenant_id)
+        self.tenants[sys.intern(tenant_id)] = record_ids
+        self.generation += 1
+    
+    def remove_tenant(self, tenant_id):
+        record_ids = self.tenants.pop(tenant_id, None)
+        if record_ids is not None:
+            for record_id in record_ids:
+                self.release(record_id)
+            self.generation += 1
+    
+    def load_directory(self, path):
+        """从目录加载课表，每个JSON文件是一个租户（文件名为租户ID）"""
+        for file_name in sorted(os.listdir(path)):
+            if not file_name.endswith(".json"):
+                continue
+            with open(os.path.join(path, file_name), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            courses = data if isinstance(data, list) else data.get("courses", [])
+            self.set_tenant(file_name[:-5], courses)
+    
+    def load_profiles(self, profiles=None):
+        """把各档案（不含归档）的课表作为租户加载，不保留档案的其他数据"""
+        profiles = profiles or profile_manager
+        for profile_id, info in profiles.list_profiles():
+            if info.get("archived"):
+                continue
+            data = create_storage_backend(profile_id).load() or {}
+            self.set_tenant(profile_id, data.get("courses", []))
+    
+    def tenant_records(self, tenant_id):
+        records = self.records
+        return [records[record_id] for record_id in self.tenants.get(tenant_id, ())]
+    
+    def courses_on(self, tenant_id, target_date):
+        """获取租户在指定日期的课程记录，按节次排序"""
+        class_day = self.manager.get_day_table().class_day(target_date)
+        if not class_day:
+            return []
+        weekday, week_num = class_day
+        bit = 1 << week_num
+        records = self.records
+        result = [records[record_id] for record_id in self.tenants.get(tenant_id, ())
+                  if records[record_id].weekday == weekday and records[record_id].week_mask & bit]
+        result.sort(key=lambda record: record.sections[0] if record.sections else 0)
+        return result
+    
+    def stats(self):
+        return {
+            "tenants": len(self.tenants),
+            "records": len(self.record_ids),
+            "references": sum(len(ids) for ids in self.tenants.values()),
+        }
+
+# ==================== 批量上课状态 ====================
+class SessionBoard:
+    """所有租户的「当前课程 / 下一节课程」看板
+    
+    按天把各共享课程记录的上下课时刻排成一条全局时间线，每次 advance 只处理
+    上次调用以来跨过的时刻，并只更新拥有这些课程的租户。下一节只在当天内查找。
+    """
+    
+    def __init__(self, store):
+        self.store = store
+        self.day = None
+        self.version = None
+        self.minute = -1
+        # 租户 -> 当天课程 [(开始分钟, 结束分钟, 记录编号)]，按开始时间排序
+        self.sessions = {}
+        # 租户 -> 已开始的课程数
+        self.positions = {}
+        # 租户 -> (当前课程, 下一节课程)，当天没有课的租户不在其中
+        self.states = {}
+        # 全局时间线：上下课时刻和对应的记录编号
+        self.boundary_minutes = array("H")
+        self.boundary_records = array("I")
+        self.cursor = 0
+        # 记录编号 -> 当天有这门课的租户
+        self.record_tenants = {}
+    
+    def build(self, day, minute):
+        store = self.store
+        self.day = day
+        self.version = (store.generation, store.manager.generation)
+        self.sessions = {}
+        self.positions = {}
+        self.states = {}
+        self.record_tenants = {}
+        
+        class_day = store.manager.get_day_table().class_day(day)
+        spans = {}
+        if class_day:
+            weekday, week_num = class_day
+            bit = 1 << week_num
+            class_schedule = store.manager.get_class_schedule()
+            for record_id, record in enumerate(store.records):
+                if (record is None or record.weekday != weekday or not record.week_mask & bit
+                        or not record.sections):
+                    continue
+                span = class_schedule.for_course(record).span(record.sections[0], record.sections[-1])
+                if span:
+                    spans[record_id] = span
+        
+        if spans:
+            for tenant_id, record_ids in store.tenants.items():
+                today = [spans[record_id] + (record_id,) for record_id in record_ids if record_id in spans]
+                if not today:
+                    continue
+                today.sort()
+                self.sessions[tenant_id] = today
+                for _, _, record_id in today:
+                    self.record_tenants.setdefault(record_id, []).append(tenant_id)
+        
+        boundaries = sorted((moment, record_id)
+                            for record_id, (start, end) in spans.items()
+                            if record_id in self.record_tenants
+                            for moment in (start, end))
+        self.boundary_minutes = array("H", (moment for moment, _ in boundaries))
+        self.boundary_records = array("I", (record_id for _, record_id in boundaries))
+        self.cursor = bisect_right(self.boundary_minutes, minute)
+        self.minute = minute
+        for tenant_id, today in self.sessions.items():
+            self.positions[tenant_id] = bisect_left(today, (minute + 1,))
+            self.states[tenant_id] = self.compute_state(tenant_id)
+    
+    def advance(self, now):
+        """推进到 now，返回状态发生变化的租户集合（日期或数据变化时返回全部租户）"""
+        minute = now.hour * 60 + now.minute
+        store = self.store
+        if (now.date() != self.day or minute < self.minute
+                or self.version != (store.generation, store.manager.generation)):
+            self.build(now.date(), minute)
+            return set(store.tenants)
+        
+        changed = set()
+        minutes, records = self.boundary_minutes, self.boundary_records
+        cursor = self.cursor
+        while cursor < len(minutes) and minutes[cursor] <= minute:
+            changed.update(self.record_tenants[records[cursor]])
+            cursor += 1
+        self.cursor = cursor
+        self.minute = minute
+        
+        for tenant_id in changed:
+            today = self.sessions[tenant_id]
+            position = self.positions[tenant_id]
+            while position < len(today) and today[position][0] <= minute:
+                position += 1
+            self.positions[tenant_id] = position
+            self.states[tenant_id] = self.compute_state(tenant_id)
+        return changed
+    
+    def compute_state(self, tenant_id):
+        today = self.sessions[tenant_id]
+        position = self.positions[tenant_id]
+        records = self.store.records
+        current = following = None
+        # 课程时间可能重叠，向前找仍未下课的课程
+        for start, end, record_id in reversed(today[:position]):
+            if end > self.minute:
+                current = (start, end, records[record_id])
+                break
+        if position < len(today):
+            start, end, record_id = today[position]
+            following = (start, end, records[record_id])
+        return current, following
+    
+    def state(self, tenant_id):
+        """租户当前的 (当前课程, 下一节课程)，课程为 (开始分钟, 结束分钟, Course) 或 None"""
+        return self.states.get(tenant_id, (None, None))
+    
+    def snapshot(self, now):
+        """推进到 now 并返回所有当天有课租户的 {租户: (当前课程, 下一节课程)}
+        
+        返回的是看板内部的字典，下次 advance 时会原地更新。
+        """
+        self.advance(now)
+        return self.states
+
+# ==================== 课程索引 ====================
+class CourseIndex:
+    """课程索引基类 - 按来源比较课程的增减，只对变化的课程增量更新索引"""
+    
+    def __init__(self):
+        # 来源 -> 课程键计数（来源如当前档案的课表、多租户课表存储）
+        self.sources = {}
+    
+    def sync(self, source, courses):
+        """用来源的当前课程列表更新索引"""
+        self.sync_keys(source, map(Course.key_of, courses))
+    
+    def sync_store(self, store, source="store"):
+        """用多租户课表存储中的全部共享记录更新索引"""
+        self.sync_keys(source, store.record_ids.keys())
+    
+    def sync_keys(self, source, keys):
+        new = Counter(keys)
+        old = self.sources.get(source, Counter())
+        for key, count in (old - new).items():
+            for _ in range(count):
+                self.remove(Course.from_key(key))
+        for key, count in (new - old).items():
+            for _ in range(count):
+                self.add(Course.from_key(key))
+        self.sources[source] = new
+    
+    def apply(self, source, appended, removed):
+        """按追加和删除的课程更新来源，不必比较全部课程"""
+        counts = self.sources.setdefault(source, Counter())
+        for record in removed:
+            key = record.key()
+            if counts[key]:
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+                self.remove(record)
+        for record in appended:
+            counts[record.key()] += 1
+            self.add(record)
+    
+    def attach(self, manager):
+        """跟随DataManager中的课表自动更新"""
+        self.sync("local", manager.get_courses())
+        
+        def on_changed(sections, deltas):
+            if "courses" not in sections:
+                return
+            if "courses" in deltas:
+                for appended, removed in deltas["courses"]:
+                    self.apply("local", appended, removed)
+            else:
+                self.sync("local", manager.get_courses())
+        manager.add_listener(on_changed)
+        return self
+    
+    def add(self, record):
+        raise NotImplementedError
+    
+    def remove(self, record):
+        raise NotImplementedError
+
+# ==================== 教室占用索引 ====================
+# 每个 (周次, 星期) 用一个节次位图表示，默认16位；节次时间表或课程中的节次更多时自动加宽
+MAX_SECTIONS_PER_DAY = 16
+# 16/32/64位的位图数组，超过64节时改用Python整数列表
+ROOM_MASK_TYPECODES = ("H", "I", "Q")
+
+ROOM_SPACE_PATTERN = re.compile(r"\s+")
+ROOM_DASH_PATTERN = re.compile(r"[－—–_]")
+ROOM_NUMBER_PATTERN = re.compile(r"^(.*?)[-#]?([A-Z]?\d+[A-Z]?)$")
+
+@lru_cache(maxsize=4096)
+def normalize_room(location):
+    """规范化教室名称：全角转半角、去掉空白、字母大写、统一连接符"""
+    text = unicodedata.normalize("NFKC", location or "")
+    text = ROOM_SPACE_PATTERN.sub("", text).upper()
+    return ROOM_DASH_PATTERN.sub("-", text)
+
+def split_building(room):
+    """把规范化后的教室名拆成 (楼栋, 房间号)，如 '第一教学楼101' -> ('第一教学楼', '101')"""
+    match = ROOM_NUMBER_PATTERN.match(room)
+    if match and match.group(1):
+        return match.group(1), match.group(2)
+    return room, ""
+
+def sections_mask(sections):
+    mask = 0
+    for section in sections:
+        if section >= 1:
+            mask |= 1 << (section - 1)
+    return mask
+
+def new_room_slots(width):
+    """能容纳width节的空占用表"""
+    for typecode in ROOM_MASK_TYPECODES:
+        if array(typecode).itemsize * 8 >= width:
+            return array(typecode)
+    return []
+
+class RoomIndex(CourseIndex):
+    """教室占用索引 - 教室 -> (周次×星期×节次) 占用位图，用于查询空教室"""
+    
+    def __init__(self, max_sections=MAX_SECTIONS_PER_DAY):
+        super().__init__()
+        # 位图能表示的最大节次
+        self.max_sections = max_sections
+        # 教室 -> 位图数组，下标 周次*7+星期-1，值为该天被占用的节次位图
+        self.busy = {}
+        # 教室 -> 占用该教室的课程键计数，删除课程时据此重算位图
+        self.room_courses = {}
+        self.buildings = {}
+        self.display_names = {}
+    
+    @staticmethod
+    def slot(week, weekday):
+        return week * 7 + weekday - 1
+    
+    def add(self, record):
+        room = normalize_room(record.location)
+        if not room:
+            return
+        if room not in self.busy:
+            self.busy[room] = new_room_slots(self.max_sections)
+            self.room_courses[room] = Counter()
+            self.display_names[room] = record.location.strip()
+            self.buildings.setdefault(split_building(room)[0], set()).add(room)
+        self.room_courses[room][record.key()] += 1
+        self.mark(self.busy[room], record)
+    
+    def remove(self, record):
+        room = normalize_room(record.location)
+        courses = self.room_courses.get(room)
+        if not courses:
+            return
+        courses[record.key()] -= 1
+        if courses[record.key()] <= 0:
+            del courses[record.key()]
+        if not courses:
+            del self.busy[room], self.room_courses[room], self.display_names[room]
+            building = split_building(room)[0]
+            self.buildings[building].discard(room)
+            if not self.buildings[building]:
+                del self.buildings[building]
+            return
+        # 同一时段可能有多门课，只能按剩余课程重算该教室的位图
+        busy = self.busy[room] = new_room_slots(self.max_sections)
+        for key in courses:
+            self.mark(busy, Course.from_key(key))
+    
+    def attach(self, manager):
+        self.widen(manager.get_class_schedule().max_section())
+        
+        def on_changed(sections, deltas):
+            if "class_times" in sections or "class_time_tables" in sections:
+                self.widen(manager.get_class_schedule().max_section())
+        manager.add_listener(on_changed)
+        return super().attach(manager)
+    
+    def widen(self, width):
+        """把位图加宽到至少width节，已有的占用保持不变"""
+        if width <= self.max_sections:
+            return
+        self.max_sections = width
+        for room, busy in self.busy.items():
+            slots = new_room_slots(width)
+            slots.extend(map(int, busy))
+            self.busy[room] = slots
+    
+    def mark(self, busy, record):
+        top = max(record.sections, default=0)
+        if top > self.max_sections:
+            self.widen(top)
+            busy = self.busy[normalize_room(record.location)]
+        mask = sections_mask(record.sections)
+        for week in record.weeks:
+            index = self.slot(week, record.weekday)
+            if index >= len(busy):
+                busy.extend([0] * (index + 1 - len(busy)))
+            busy[index] |= mask
+    
+    def is_free(self, room, week, weekday, sections):
+        busy = self.busy.get(room)
+        if busy is None:
+            return True
+        index = self.slot(week, weekday)
+        return index >= len(busy) or not busy[index] & sections_mask(sections)
+    
+    def free_rooms(self, week, weekday, sections, building=None):
+        """查询空闲教室，如 第7周周三3-4节 第一教学楼 的空教室"""
+        rooms = self.buildings.get(building, ()) if building else self.busy
+        index = self.slot(week, weekday)
+        mask = sections_mask(sections)
+        busy = self.busy
+        return sorted(self.display_names[room] for room in rooms
+                      if index >= len(busy[room]) or not busy[room][index] & mask)
+    
+    def list_buildings(self):
+        return sorted(self.buildings)
+
+# ==================== 教师工作量索引 ====================
+TEACHER_SEPARATOR_PATTERN = re.compile(r"[,，、/;；\s]+")
+
+def split_teachers(teacher):
+    """一门课可能由多位教师共同讲授，如 '张老师、李老师'"""
+    return [name for name in TEACHER_SEPARATOR_PATTERN.split(teacher or "") if name]
+
+class TeacherIndex(CourseIndex):
+    """教师索引 - 预先汇总每位教师的课程、每周和整学期的授课时长，并检测时间冲突"""
+    
+    def __init__(self, manager=None):
+        super().__init__()
+        self.manager = manager or data_manager
+        # 教师 -> 课程键计数
+        self.teacher_courses = {}
+        # 教师 -> {周次: 授课分钟数}
+        self.weekly_minutes = {}
+        self.total_minutes = Counter()
+        # 教师 -> {(周次, 星期, 节次): (课程名, 教室) 计数}；同一时段只有同一门课在同一教室
+        # （合班上课）不算冲突，不同的课程即使在同一教室也是冲突
+        self.slot_lectures = {}
+        self.conflict_slots = {}
+    
+    def attach(self, manager):
+        self.manager = manager
+        
+        def on_changed(sections, deltas):
+            # 节次时间变化后所有时长都要重算
+            if "class_times" in sections or "class_time_tables" in sections:
+                self.rebuild()
+        manager.add_listener(on_changed)
+        return super().attach(manager)
+    
+    def rebuild(self):
+        sources = self.sources
+        self.__init__(self.manager)
+        for source, keys in sources.items():
+            self.sync_keys(source, keys.elements())
+    
+    def course_minutes(self, record):
+        return self.manager.get_class_schedule().for_course(record).duration(record.sections)
+    
+    def add(self, record):
+        minutes = self.course_minutes(record)
+        key = record.key()
+        for teacher in split_teachers(record.teacher):
+            courses = self.teacher_courses.setdefault(teacher, Counter())
+            courses[key] += 1
+            if courses[key] > 1:
+                # 重复的同一门课不重复计算课时
+                continue
+            weekly = self.weekly_minutes.setdefault(teacher, Counter())
+            slots = self.slot_lectures.setdefault(teacher, {})
+            conflicts = self.conflict_slots.setdefault(teacher, set())
+            lecture = (record.name, normalize_room(record.location))
+            for week in record.weeks:
+                weekly[week] += minutes
+                for section in record.sections:
+                    slot = (week, record.weekday, section)
+                    lectures = slots.setdefault(slot, Counter())
+                    lectures[lecture] += 1
+                    if len(lectures) > 1:
+                        conflicts.add(slot)
+            self.total_minutes[teacher] += minutes * len(record.weeks)
+    
+    def remove(self, record):
+        minutes = self.course_minutes(record)
+        key = record.key()
+        for teacher in split_teachers(record.teacher):
+            courses = self.teacher_courses.get(teacher)
+            if not courses or not courses[key]:
+                continue
+            courses[key] -= 1
+            if courses[key]:
+                continue
+            del courses[key]
+            weekly = self.weekly_minutes[teacher]
+            slots = self.slot_lectures[teacher]
+            conflicts = self.conflict_slots[teacher]
+            lecture = (record.name, normalize_room(record.location))
+            for week in record.weeks:
+                weekly[week] -= minutes
+                for section in record.sections:
+                    slot = (week, record.weekday, section)
+                    lectures = slots[slot]
+                    lectures[lecture] -= 1
+                    if lectures[lecture] <= 0:
+                        del lectures[lecture]
+                    if len(lectures) <= 1:
+                        conflicts.discard(slot)
+                    if not lectures:
+                        del slots[slot]
+            self.total_minutes[teacher] -= minutes * len(record.weeks)
+            if not courses:
+                for table in (self.teacher_courses, self.weekly_minutes, self.slot_lectures,
+                              self.conflict_slots, self.total_minutes):
+                    table.pop(teacher, None)
+    
+    def teachers(self):
+        return sorted(self.teacher_courses)
+    
+    def timetable(self, teacher, week):
+        """教师某周的课表 [(星期, 节次, 课程记录)]"""
+        bit = 1 << week
+        result = []
+        for key in self.teacher_courses.get(teacher, ()):
+            record = Course.from_key(key)
+            if record.week_mask & bit:
+                for section in record.sections:
+                    result.append((record.weekday, section, record))
+        result.sort(key=lambda item: (item[0], item[1]))
+        return result
+    
+    def week_hours(self, teacher, week):
+        return self.weekly_minutes.get(teacher, {}).get(week, 0) / 60
+    
+    def weekly_hours(self, teacher):
+        """{周次: 授课小时数}"""
+        return {week: minutes / 60
+                for week, minutes in sorted(self.weekly_minutes.get(teacher, {}).items())
+                if minutes}
+    
+    def semester_hours(self, teacher):
+        return self.total_minutes.get(teacher, 0) / 60
+    
+    def conflicts(self, teacher=None):
+        """时间冲突（同一时段安排了不同的课程或不同的教室）
+        
+        返回 [(教师, 周次, 星期, 节次, [(课程名, 教室)])]
+        """
+        teachers = [teacher] if teacher else self.teachers()
+        result = []
+        for name in teachers:
+            slots = self.slot_lectures.get(name, {})
+            for slot in sorted(self.conflict_slots.get(name, ())):
+                result.append((name,) + slot + (sorted(slots[slot]),))
+        return result
+
+# ==================== 学期统计 ====================
+# 开始时间不早于此（当天分钟数）的课算作晚上的课
+EVENING_START_MINUTE = 18 * 60
+BUSIEST_DAYS_LIMIT = 10
+
+class SemesterLayout:
+    """学期占用布局 - 把学期的每一天映射到 (星期, 周次) 格子
+    
+    格子编号为 星期 × week_span + 周次，放假的日期指向恒为0的空白格。统计时课程只需
+    按周次累加到格子上，每天的数据再按 gather 一次取出，不必逐日逐门课程判断。
+    """
+    
+    def __init__(self, manager=None, semester="fall"):
+        manager = manager or data_manager
+        self.semester = semester
+        self.generation = manager.generation
+        self.name = dict(DayTable.SEMESTER_NAMES)[semester]
+        infos = [info for info in manager.get_day_table().days() if info.semester == self.name]
+        self.days = [info.day for info in infos]
+        self.week_span = max((info.class_week for info in infos), default=0) + 1
+        self.blank = 8 * self.week_span
+        self.size = self.blank + 1
+        # 每天对应的格子：放假为空白格，调休补课为所补那天的格子
+        self.gather = array("I", (info.weekday * self.week_span + info.class_week
+                                  if info.has_classes else self.blank for info in infos))
+        self.day_weeks = array("H", (info.week for info in infos))
+        self.day_weekdays = array("B", (info.day.isoweekday() for info in infos))
+        # 每个格子在学期中实际上课的天数
+        self.cell_days = array("I", bytes(4 * self.size))
+        for cell in self.gather:
+            self.cell_days[cell] += 1
+        self.cell_days[self.blank] = 0
+    
+    def weeks(self):
+        return self.day_weeks[-1] if self.day_weeks else 0
+    
+    def week_slice(self, week):
+        """第week周在按日数组中的下标范围"""
+        return slice(bisect_left(self.day_weeks, week), bisect_right(self.day_weeks, week))
+    
+    def new_grid(self):
+        return array("I", bytes(4 * self.size))
+
+class SemesterStats:
+    """一个学期的统计结果：每周课次和学时、每门课程的学时、最忙的日期、晚课比例和空闲天数"""
+    
+    def __init__(self, semester, name, days):
+        self.semester = semester
+        self.name = name
+        self.days = days
+        self.courses = 0
+        self.sessions = 0
+        self.minutes = 0
+        self.evening_sessions = 0
+        # 下标为周次，第0项不用
+        self.weekly_sessions = []
+        self.weekly_minutes = []
+        # 课程名 -> [课次, 分钟数]
+        self.course_totals = {}
+        # [(日期, 课次, 分钟数)]
+        self.busiest_days = []
+        self.holidays = 0
+        self.free_days = 0
+        self.free_days_by_weekday = Counter()
+    
+    @property
+    def evening_share(self):
+        return self.evening_sessions / self.sessions if self.sessions else 0.0
+    
+    def course_hours(self):
+        """[(课程名, 课次, 学时)]，按学时从多到少排序"""
+        return sorted(((name, sessions, minutes / 60)
+                       for name, (sessions, minutes) in self.course_totals.items()),
+                      key=lambda item: (-item[2], item[0]))
+    
+    def to_dict(self):
+        return {
+            "semester": self.semester,
+            "days": self.days,
+            "courses": self.courses,
+            "sessions": self.sessions,
+            "hours": round(self.minutes / 60, 2),
+            "evening_sessions": self.evening_sessions,
+            "evening_share": round(self.evening_share, 4),
+            "holidays": self.holidays,
+            "free_days": self.free_days,
+            "free_days_by_weekday": {WEEKDAY_NAMES[weekday - 1]: count for weekday, count
+                                     in sorted(self.free_days_by_weekday.items())},
+            "weeks": [{"week": week, "sessions": self.weekly_sessions[week],
+                       "hours": round(self.weekly_minutes[week] / 60, 2)}
+                      for week in range(1, len(self.weekly_sessions))],
+            "course_hours": [{"name": name, "sessions": sessions, "hours": round(hours, 2)}
+                             for name, sessions, hours in self.course_hours()],
+            "busiest_days": [{"date": day.strftime("%Y-%m-%d"), "sessions": sessions,
+                              "hours": round(minutes / 60, 2)}
+                             for day, sessions, minutes in self.busiest_days],
+        }
+    
+    def csv_rows(self):
+        """导出用的行：概要、每周、每门课程、最忙的日期四个表，表之间空一行"""
+        yield ["项目", "数值"]
+        yield ["学期", self.name]
+        yield ["天数", self.days]
+        yield ["课程数", self.courses]
+        yield ["课次", self.sessions]
+        yield ["学时", round(self.minutes / 60, 2)]
+        yield ["晚课课次", self.evening_sessions]
+        yield ["晚课比例", f"{self.evening_share:.1%}"]
+        yield ["放假天数", self.holidays]
+        yield ["无课天数", self.free_days]
+        for weekday, count in sorted(self.free_days_by_weekday.items()):
+            yield [f"无课天数（{WEEKDAY_NAMES[weekday - 1]}）", count]
+        yield []
+        yield ["周次", "课次", "学时"]
+        for week in range(1, len(self.weekly_sessions)):
+            yield [week, self.weekly_sessions[week], round(self.weekly_minutes[week] / 60, 2)]
+        yield []
+        yield ["课程", "课次", "学时"]
+        for name, sessions, hours in self.course_hours():
+            yield [name, sessions, round(hours, 2)]
+        yield []
+        yield ["日期", "星期", "课次", "学时"]
+        for day, sessions, minutes in self.busiest_days:
+            yield [day.strftime("%Y-%m-%d"), get_weekday_name(day), sessions, round(minutes / 60, 2)]
+    
+    def write_csv(self, path):
+        # 带BOM的UTF-8，Excel可以直接打开
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            csv.writer(f).writerows(self.csv_rows())
+
+class SemesterAnalytics:
+    """学期统计 - 对一份或多份课表在学期占用数组上做一次归约
+    
+    每门课程按周次把课次、分钟数累加到 (星期, 周次) 格子上，之后的每日、每周、空闲天数
+    等统计都是对数组的整体 map/sum，与学期天数和课程数相乘的逐日循环无关。
+    """
+    
+    def __init__(self, manager=None, semester="fall"):
+        self.manager = manager or data_manager
+        self.layout = SemesterLayout(self.manager, semester)
+        self.class_schedule = self.manager.get_class_schedule()
+    
+    def compute(self, courses, evening_start=EVENING_START_MINUTE, busiest=BUSIEST_DAYS_LIMIT):
+        """统计courses（任意可迭代的课程记录，可以是整个学院的课表）"""
+        layout = self.layout
+        span = layout.week_span
+        cell_days = layout.cell_days
+        sessions = layout.new_grid()
+        minutes = layout.new_grid()
+        evening = layout.new_grid()
+        stats = SemesterStats(layout.semester, layout.name, len(layout.days))
+        course_totals = stats.course_totals
+        # 周次和节次组合在课程之间大量重复，按组合累计后再一次性加到格子上
+        timings = {}
+        day_counts = {}
+        groups = Counter()
+        
+        for course in courses:
+            sections = course.sections
+            table = self.class_schedule.for_course(course)
+            timing = timings.get((table, sections))
+            if timing is None:
+                bounds = table.span(sections[0], sections[-1]) if sections else None
+                timing = timings[(table, sections)] = (
+                    (table.duration(sections), bounds[0] >= evening_start) if bounds else None)
+            if timing is None:
+                continue
+            stats.courses += 1
+            pattern = (course.weekday, course.weeks)
+            count = day_counts.get(pattern)
+            if count is None:
+                base = course.weekday * span
+                count = day_counts[pattern] = sum(cell_days[base + week]
+                                                  for week in course.weeks if week < span)
+            groups[pattern + timing] += 1
+            totals = course_totals.setdefault(course.name, [0, 0])
+            totals[0] += count
+            totals[1] += count * timing[0]
+        
+        for (weekday, weeks, duration, is_evening), multiplicity in groups.items():
+            base = weekday * span
+            for week in weeks:
+                if week < span:
+                    sessions[base + week] += multiplicity
+                    minutes[base + week] += multiplicity * duration
+                    if is_evening:
+                        evening[base + week] += multiplicity
+        
+        gather = layout.gather
+        day_sessions = array("I", map(sessions.__getitem__, gather))
+        day_minutes = array("I", map(minutes.__getitem__, gather))
+        stats.sessions = sum(day_sessions)
+        stats.minutes = sum(day_minutes)
+        stats.evening_sessions = sum(map(evening.__getitem__, gather))
+        
+        weeks = range(1, layout.weeks() + 1)
+        stats.weekly_sessions = [0] + [sum(day_sessions[layout.week_slice(week)]) for week in weeks]
+        stats.weekly_minutes = [0] + [sum(day_minutes[layout.week_slice(week)]) for week in weeks]
+        
+        busiest_days = heapq.nlargest(busiest, range(len(gather)), key=day_minutes.__getitem__)
+        stats.busiest_days = [(layout.days[index], day_sessions[index], day_minutes[index])
+                              for index in busiest_days if day_minutes[index]]
+        
+        stats.holidays = gather.count(layout.blank)
+        free = list(map(not_, day_sessions))
+        stats.free_days = sum(free)
+        stats.free_days_by_weekday = Counter(compress(layout.day_weekdays, free))
+        return stats
+    
+    def compute_store(self, store):
+        """多租户课表中所有不同的课程记录（同一门课只计一次）"""
+        return self.compute(record for record in store.records if record is not None)
+
+# ==================== 搜索索引 ====================
+# 字段前缀索引的最大长度，更长的查询先按前缀取候选再逐个核对
+SEARCH_PREFIX_LENGTH = 8
+SEARCH_RESULT_LIMIT = 50
+SEARCH_SPACE_PATTERN = re.compile(r"\s+")
+
+try:
+    from pypinyin import Style as PinyinStyle, lazy_pinyin
+except ImportError:
+    # 没有安装pypinyin时按GB2312一级汉字的拼音排序取首字母
+    lazy_pinyin = None
+
+# GB2312一级汉字按拼音排序，以下为各首字母第一个汉字的编码
+GB2312_INITIAL_CODES = (
+    0xB0A1, 0xB0C5, 0xB2C1, 0xB4EE, 0xB6EA, 0xB7A2, 0xB8C1, 0xB9FE, 0xBBF7, 0xBFA6, 0xC0AC, 0xC2E8,
+    0xC4C3, 0xC5B6, 0xC5BE, 0xC6DA, 0xC8BB, 0xC8F6, 0xCBFA, 0xCDDA, 0xCEF4, 0xD1B9, 0xD4D1,
+)
+GB2312_INITIALS = "abcdefghjklmnopqrstwxyz"
+GB2312_LEVEL1_LAST = 0xD7F9
+
+def hanzi_initial(char):
+    """单个汉字的拼音首字母，GB2312二级汉字和非汉字为空字符串"""
+    try:
+        code = int.from_bytes(char.encode("gb2312"), "big")
+    except UnicodeEncodeError:
+        return ""
+    if not GB2312_INITIAL_CODES[0] <= code <= GB2312_LEVEL1_LAST:
+        return ""
+    return GB2312_INITIALS[bisect_right(GB2312_INITIAL_CODES, code) - 1]
+
+@lru_cache(maxsize=8192)
+def pinyin_initials(text):
+    """拼音首字母，如 '高等数学' -> 'gdsx'，非汉字字符忽略"""
+    if lazy_pinyin:
+        hanzi = "".join(char for char in text if "一" <= char <= "鿿")
+        return "".join(lazy_pinyin(hanzi, style=PinyinStyle.FIRST_LETTER)).lower()
+    return "".join(map(hanzi_initial, text))
+
+def normalize_search_text(text):
+    return SEARCH_SPACE_PATTERN.sub("", unicodedata.normalize("NFKC", text or "").casefold())
+
+class SearchResult:
+    """一条搜索结果"""
+    __slots__ = ("source", "kind", "title", "detail", "day")
+    
+    def __init__(self, source, kind, title, detail, day=None):
+        self.source = source
+        self.kind = kind
+        self.title = title
+        self.detail = detail
+        # 重要日期的日期，课程为None
+        self.day = day
+
+class SearchIndex:
+    """课程和重要日期的搜索索引 - 字段文本的1-2字n-gram和前缀倒排表
+    
+    课程按课程名、教师、教室，重要日期按事件和类别建立索引，汉字字段同时索引拼音首字母。
+    不同的字段文本远少于记录数，所以倒排表指向字段文本，再由字段文本找到记录；
+    按来源（当前档案、其他档案）分别比较记录的增减，只对变化的记录增量更新。
+    """
+    
+    def __init__(self):
+        # (来源, 类型) -> {记录键: 文档编号}；内容相同的记录共用一个文档
+        self.sources = {}
+        # (来源, 类型) -> 记录键计数，最后一条相同记录删除后才删除文档
+        self.counts = {}
+        # 文档编号 -> 归一化后的字段文本 / SearchResult
+        self.fields = []
+        self.results = []
+        self.free_ids = []
+        # 字段文本 -> 文档编号集合
+        self.field_docs = {}
+        # n-gram / 前缀 -> 字段文本集合
+        self.grams = {}
+        self.prefixes = {}
+    
+    def __len__(self):
+        return len(self.results) - len(self.free_ids)
+    
+    def attach(self, manager, source="local"):
+        """跟随DataManager中的课表和重要日期自动更新"""
+        self.sync_courses(source, manager.get_courses())
+        self.sync_events(source, manager.get_important_dates(), manager.get_recurring_dates())
+        
+        def on_changed(sections, deltas):
+            if "courses" in deltas:
+                for appended, removed in deltas["courses"]:
+                    self.apply(source, "course", map(self.course_item, appended),
+                               map(self.course_item, removed))
+            elif "courses" in sections:
+                self.sync_courses(source, manager.get_courses())
+            if "important_dates" in deltas and "recurring_dates" not in sections:
+                for appended, removed in deltas["important_dates"]:
+                    self.apply(source, "event", map(self.date_item, appended),
+                               map(self.date_item, removed))
+            elif "important_dates" in sections or "recurring_dates" in sections:
+                self.sync_events(source, manager.get_important_dates(), manager.get_recurring_dates())
+        manager.add_listener(on_changed)
+        return self
+    
+    @staticmethod
+    def course_item(course):
+        return course.key(), course
+    
+    @staticmethod
+    def date_item(item):
+        return ("date", item.date, item.event, item.category), item
+    
+    def sync_courses(self, source, courses):
+        self.sync(source, "course", map(self.course_item, courses))
+    
+    def sync_events(self, source, events, rules=()):
+        items = list(map(self.date_item, events))
+        items.extend((("rule", rule.start, rule.event, rule.category, rule.repeat), rule)
+                     for rule in rules)
+        self.sync(source, "event", items)
+    
+    def sync(self, source, kind, items):
+        """用来源的当前记录 [(记录键, 记录)] 更新索引"""
+        docs = self.sources.setdefault((source, kind), {})
+        counts = Counter()
+        records = {}
+        for key, item in items:
+            counts[key] += 1
+            records.setdefault(key, item)
+        for key in docs.keys() - records.keys():
+            self.remove_document(docs.pop(key))
+        for key in records.keys() - docs.keys():
+            docs[key] = self.add_document(source, kind, records[key])
+        self.counts[(source, kind)] = counts
+    
+    def apply(self, source, kind, appended, removed):
+        """按追加和删除的 (记录键, 记录) 更新索引，不必比较来源的全部记录"""
+        docs = self.sources.setdefault((source, kind), {})
+        counts = self.counts.setdefault((source, kind), Counter())
+        for key, _ in removed:
+            if counts[key]:
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+                    self.remove_document(docs.pop(key))
+        for key, item in appended:
+            counts[key] += 1
+            if key not in docs:
+                docs[key] = self.add_document(source, kind, item)
+    
+    def describe(self, source, kind, item):
+        """记录 -> (参与检索的字段, SearchResult)"""
+        if kind == "course":
+            sections = f" 第{item.sections[0]}-{item.sections[-1]}节" if item.sections else ""
+            detail = f"{item.teacher} {item.location} {WEEKDAY_NAMES[item.weekday - 1]}{sections}"
+            fields = [item.name, *split_teachers(item.teacher), item.location]
+            return fields, SearchResult(source, kind, item.name, detail)
+        if isinstance(item, RecurringDate):
+            detail = f"{item.start.strftime('%Y-%m-%d')}起{item.describe()} {item.category}"
+            return [item.event, item.category], SearchResult(source, kind, item.event, detail, item.start)
+        return ([item.event, item.category],
+                SearchResult(source, kind, item.event, f"{item.date} {item.category}", item.day))
+    
+    def add_document(self, source, kind, item):
+        raw_fields, result = self.describe(source, kind, item)
+        fields = tuple(set(filter(None, map(normalize_search_text, raw_fields))))
+        if self.free_ids:
+            doc_id = self.free_ids.pop()
+            self.fields[doc_id] = fields
+            self.results[doc_id] = result
+        else:
+            doc_id = len(self.results)
+            self.fields.append(fields)
+            self.results.append(result)
+        for field in fields:
+            docs = self.field_docs.get(field)
+            if docs is None:
+                docs = self.field_docs[field] = set()
+                self.add_field(field)
+            docs.add(doc_id)
+        return doc_id
+    
+    def remove_document(self, doc_id):
+        for field in self.fields[doc_id]:
+            docs = self.field_docs[field]
+            docs.discard(doc_id)
+            if not docs:
+                del self.field_docs[field]
+                self.remove_field(field)
+        self.fields[doc_id] = ()
+        self.results[doc_id] = None
+        self.free_ids.append(doc_id)
+    
+    @staticmethod
+    def field_terms(field):
+        """字段文本及其拼音首字母的 (n-gram集合, 前缀集合)"""
+        grams = set()
+        prefixes = set()
+        for form in (field, pinyin_initials(field)):
+            if not form:
+                continue
+            grams.update(form)
+            grams.update(form[i:i + 2] for i in range(len(form) - 1))
+            prefixes.update(form[:length] for length in range(1, min(len(form), SEARCH_PREFIX_LENGTH) + 1))
+        return grams, prefixes
+    
+    def add_field(self, field):
+        grams, prefixes = self.field_terms(field)
+        for table, terms in ((self.grams, grams), (self.prefixes, prefixes)):
+            for term in terms:
+                table.setdefault(term, set()).add(field)
+    
+    def remove_field(self, field):
+        grams, prefixes = self.field_terms(field)
+        for table, terms in ((self.grams, grams), (self.prefixes, prefixes)):
+            for term in terms:
+                fields = table[term]
+                fields.discard(field)
+                if not fields:
+                    del table[term]
+    
+    @staticmethod
+    def field_matches(field, query):
+        return query in field or query in pinyin_initials(field)
+    
+    def matching_fields(self, query):
+        """(以查询开头的字段, 其他包含查询的字段)，各按长度排序"""
+        prefix_fields = [field for field in self.prefixes.get(query[:SEARCH_PREFIX_LENGTH], ())
+                         if len(query) <= SEARCH_PREFIX_LENGTH or self.field_matches(field, query)]
+        if len(query) <= 2:
+            fields = self.grams.get(query, ())
+        else:
+            # 从最短的倒排表开始求交集，最后核对整个查询串
+            postings = sorted((self.grams.get(query[i:i + 2], ()) for i in range(len(query) - 1)), key=len)
+            fields = [field for field in postings[0]
+                      if all(field in other for other in postings[1:]) and self.field_matches(field, query)]
+        exclude = set(prefix_fields)
+        other_fields = [field for field in fields if field not in exclude]
+        return sorted(prefix_fields, key=lambda f: (len(f), f)), sorted(other_fields, key=lambda f: (len(f), f))
+    
+    def search(self, query, limit=SEARCH_RESULT_LIMIT, sources=None):
+        """字段以查询开头的结果在前，其次是字段中包含查询的结果；sources限定来源"""
+        query = normalize_search_text(query)
+        if not query:
+            return []
+        found = []
+        seen = set()
+        for fields in self.matching_fields(query):
+            for field in fields:
+                for doc_id in self.field_docs[field]:
+                    if doc_id in seen:
+                        continue
+                    seen.add(doc_id)
+                    result = self.results[doc_id]
+                    if sources is not None and result.source not in sources:
+                        continue
+                    found.append(result)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+# ==================== ICS/CSV 流式导入 ====================
+IMPORT_BATCH_SIZE = 1000
+
+# 外部日历类别/标题关键字 -> CATEGORY_COLORS 中的类别（按顺序匹配）；
+# 不用单字「节」「假」匹配，否则「第3节 班会」「请假」之类的标题也会归入节日或假期
+CATEGORY_KEYWORDS = [
+    ("考试", ("考试", "测验", "exam")),
+    ("放假", ("放假", "停课", "day off")),
+    ("假期", ("假期", "寒假", "暑假", "vacation", "break", "holiday")),
+    ("节日", ("节日", "festival", *sorted(STATUTORY_HOLIDAYS))),
+    ("注册", ("注册", "报到", "registration")),
+    ("开学", ("开学", "semester start")),
+    ("实践", ("实践", "实习", "军训", "practice", "internship")),
+    ("上课", ("上课", "行课", "class")),
+]
+DEFAULT_EVENT_CATEGORY = "上课"
+
+# CSV表头别名 -> 内部字段
+CSV_COLUMN_ALIASES = {
+    "date": ("日期", "date", "start", "dtstart"),
+    "event": ("事件", "事件名称", "event", "summary", "title"),
+    "category": ("类别", "分类", "category", "categories"),
+    "name": ("课程名", "课程", "课程名称", "course", "name"),
+    "teacher": ("教师", "老师", "teacher"),
+    "location": ("教室", "地点", "location", "room"),
+    "weekday": ("星期", "weekday"),
+    "sections": ("节次", "sections"),
+    "weeks": ("周次", "weeks"),
+}
+
+def map_event_category(*texts):
+    """将外部日历的类别或标题映射为CATEGORY_COLORS中的类别"""
+    for text in texts:
+        if text and text.strip() in CATEGORY_COLORS:
+            return text.strip()
+    joined = " ".join(t for t in texts if t).lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in joined for keyword in keywords):
+            return category
+    return DEFAULT_EVENT_CATEGORY
+
+def _unfold_ics_lines(lines):
+    """合并ICS的折行（以空格或制表符开头的续行），逐条产出逻辑行"""
+    pending = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if pending is not None:
+                pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+def _unescape_ics_text(value):
+    return (value.replace("\\n", "\n").replace("\\N", "\n")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+def iter_ics_events(lines):
+    """逐行解析ICS，每遇到一个完整的VEVENT产出一个 {属性: (参数, 值)} 字典"""
+    event = None
+    nested = 0
+    for line in _unfold_ics_lines(lines):
+        upper = line.upper()
+        if upper == "BEGIN:VEVENT":
+            event = {}
+            nested = 0
+        elif event is None:
+            continue
+        elif upper.startswith("BEGIN:"):
+            # 跳过VALARM等嵌套组件
+            nested += 1
+        elif upper.startswith("END:"):
+            if nested:
+                nested -= 1
+            elif upper == "END:VEVENT":
+                yield event
+                event = None
+        elif not nested:
+            name, sep, value = line.partition(":")
+            if sep:
+                key, _, params = name.partition(";")
+                event[key.upper()] = (params.upper(), value)
+
+def parse_ics_datetime(params, value):
+    """解析DTSTART/DTEND，返回 (日期, 'HH:MM' 或 None)；UTC时间转换为本地时间"""
+    value = value.strip()
+    # 按固定位置切片解析，避免对每个事件调用strptime
+    day = date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    if "VALUE=DATE" in params and "DATE-TIME" not in params or len(value) == 8:
+        return day, None
+    if value[8:9] != "T":
+        raise ValueError(f"无效的日期时间: {value}")
+    moment = datetime(day.year, day.month, day.day, int(value[9:11]), int(value[11:13]))
+    if value.endswith("Z"):
+        moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return moment.date(), moment.strftime("%H:%M")
+
+def ics_end_date(event, day):
+    """全天事件的最后一天：DTEND是不含在内的结束日期，只有一天时返回None"""
+    if "DTEND" not in event:
+        return None
+    try:
+        end = parse_ics_datetime(*event["DTEND"])[0] - timedelta(days=1)
+    except ValueError:
+        return None
+    return end if end > day else None
+
+def match_sections(start_hm, end_hm, class_times, tolerance=10):
+    """把起止时间匹配到节次范围，class_times为按节次排序的 (节次, 开始分钟, 结束分钟)"""
+    start_min = _hm_to_minutes(start_hm)
+    end_min = _hm_to_minutes(end_hm) if end_hm else None
+    first = last = None
+    for section, sec_start, sec_end in class_times:
+        if first is None and abs(sec_start - start_min) <= tolerance:
+            first = section
+        if end_min is not None and abs(sec_end - end_min) <= tolerance:
+            last = section
+    if first is None:
+        return []
+    if last is None or last < first:
+        last = first
+    return list(range(first, last + 1))
+
+def _decodes_as(file_path, encoding):
+    """整个文件能否按encoding解码（分块检查，不把文件读入内存）"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def open_text_stream(file_path):
+    """以流的方式打开文本文件，自动识别UTF-8（含BOM）或GB18030（兼容GBK）编码
+    
+    先检查整个文件的编码再开始导入，两种编码都无法解码时抛出ValueError，不会导入乱码。
+    """
+    for encoding in ("utf-8-sig", "gb18030"):
+        if _decodes_as(file_path, encoding):
+            return open(file_path, "r", encoding=encoding, newline="")
+    raise ValueError("无法识别文件编码，请另存为UTF-8或GBK编码后再导入")
+
+class CalendarFileImporter:
+    """ICS/CSV流式导入器 - 逐行解析，重要日期和课程分批提交到DataManager"""
+    
+    def __init__(self, manager, batch_size=IMPORT_BATCH_SIZE):
+        self.manager = manager
+        self.batch_size = batch_size
+        self.pending_dates = []
+        self.pending_courses = []
+        # (课程名, 地点, 教师, 星期, 节次) -> 周次集合，按课程聚合ICS中的单次课
+        self.course_weeks = {}
+        self.dates_count = 0
+        self.courses_count = 0
+    
+    @profiler.timed("import.calendar_file")
+    def import_file(self, file_path):
+        """导入ICS或CSV文件，返回 (重要日期数, 课程数)"""
+        with self.manager.batch():
+            with open_text_stream(file_path) as f:
+                if file_path.lower().endswith(".ics"):
+                    self.import_ics(f)
+                else:
+                    self.import_csv(f)
+            self.flush()
+        return self.dates_count, self.courses_count
+    
+    def import_ics(self, lines):
+        class_schedule = self.manager.get_class_schedule()
+        for event in iter_ics_events(lines):
+            if "DTSTART" not in event:
+                continue
+            try:
+                day, start_hm = parse_ics_datetime(*event["DTSTART"])
+                end_hm = parse_ics_datetime(*event["DTEND"])[1] if "DTEND" in event else None
+            except ValueError:
+                continue
+            summary = _unescape_ics_text(event.get("SUMMARY", ("", ""))[1]).strip()
+            if start_hm and self.collect_course_session(event, summary, day, start_hm,
+                                                          end_hm, class_schedule):
+                continue
+            categories = _unescape_ics_text(event.get("CATEGORIES", ("", ""))[1])
+            self.add_date(day.strftime("%Y-%m-%d"), summary,
+                          map_event_category(categories.split(",")[0], summary),
+                          ics_end_date(event, day) if not start_hm else None)
+        for (name, location, teacher, weekday, sections), weeks in self.course_weeks.items():
+            self.add_course({
+                "name": name,
+                "teacher": teacher,
+                "location": location,
+                "weekday": weekday,
+                "sections": list(sections),
+                "weeks": sorted(weeks),
+                "type": "导入"
+            })
+        self.course_weeks.clear()
+    
+    def collect_course_session(self, event, summary, day, start_hm, end_hm, class_schedule):
+        """学期内且能对上节次的定时事件视为一次课，按课程聚合周次"""
+        # 调休补课日的课归到所补那天的星期和周次
+        class_day = self.manager.get_day_table().class_day(day)
+        if not class_day:
+            return False
+        weekday, week_num = class_day
+        sections = match_sections(start_hm, end_hm, class_schedule.table_for(weekday).ranges)
+        if not sections:
+            return False
+        location = _unescape_ics_text(event.get("LOCATION", ("", ""))[1]).strip()
+        teacher = _unescape_ics_text(event.get("DESCRIPTION", ("", ""))[1]).strip()
+        if "\n" in teacher or len(teacher) > 20:
+            teacher = ""
+        key = (summary, location, teacher, weekday, tuple(sections))
+        self.course_weeks.setdefault(key, set()).add(week_num)
+        return True
+    
+    def import_csv(self, f):
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        columns = {}
+        for index, title in enumerate(header):
+            title = title.strip().lower()
+            for field, aliases in CSV_COLUMN_ALIASES.items():
+                if title in aliases and field not in columns:
+                    columns[field] = index
+        is_course = "name" in columns and ("weekday" in columns or "sections" in columns)
+        if not is_course and not ("date" in columns and "event" in columns):
+            raise ValueError("无法识别CSV表头，需要包含「日期,事件,类别」或「课程名,教师,教室,星期,节次,周次」")
+        
+        def cell(row, field):
+            index = columns.get(field)
+            return row[index].strip() if index is not None and index < len(row) else ""
+        
+        for row in reader:
+            try:
+                if is_course:
+                    if not cell(row, "name"):
+                        continue
+                    sections = cell(row, "sections")
+                    weeks = cell(row, "weeks")
+                    self.add_course({
+                        "name": cell(row, "name"),
+                        "teacher": cell(row, "teacher"),
+                        "location": cell(row, "location"),
+                        "weekday": WEEKDAY_MAP.get(cell(row, "weekday"), 1),
+                        "sections": parse_range(sections) if sections else [1, 2],
+                        "weeks": parse_range(weeks) if weeks else list(range(1, 17)),
+                        "type": "导入"
+                    })
+                else:
+                    day = datetime.strptime(cell(row, "date")[:10].replace("/", "-"),
+                                            "%Y-%m-%d").date()
+                    event = cell(row, "event")
+                    self.add_date(day.strftime("%Y-%m-%d"), event,
+                                  map_event_category(cell(row, "category"), event))
+            except ValueError:
+                continue
+    
+    def add_date(self, date_str, event, category, end_date=None):
+        extra = {"end_date": end_date.strftime("%Y-%m-%d")} if end_date else None
+        self.pending_dates.append(ImportantDate(date_str, event, category, extra))
+        if len(self.pending_dates) >= self.batch_size:
+            self.flush()
+    
+    def add_course(self, course):
+        self.pending_courses.append(Course.from_dict(course))
+        if len(self.pending_courses) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """把缓冲区中的记录提交到DataManager"""
+        if self.pending_dates:
+            self.manager.extend_important_dates(self.pending_dates)
+            self.dates_count += len(self.pending_dates)
+            self.pending_dates = []
+        if self.pending_courses:
+            self.manager.extend_courses(self.pending_courses)
+            self.courses_count += len(self.pending_courses)
+            self.pending_courses = []
+
+def ensure_writable(parent):
+    """当前档案是只读归档时提示并返回False"""
+    if data_manager.read_only:
+        QMessageBox.information(parent, "提示", "当前档案是只读归档，不能修改。\n请先在设置中切换到其他档案。")
+        return False
+    return True
+
+def import_calendar_file(parent):
+    """弹出文件选择框并导入ICS/CSV文件，导入成功返回True"""
+    file_path, _ = QFileDialog.getOpenFileName(
+        parent, "选择日历文件", "", "日历文件 (*.ics *.csv)"
+    )
+    if not file_path:
+        return False
+    
+    try:
+        dates_count, courses_count = CalendarFileImporter(data_manager).import_file(file_path)
+    except Exception as e:
+        QMessageBox.warning(parent, "导入失败", f"导入失败: {str(e)}")
+        return False
+    
+    QMessageBox.information(parent, "导入完成",
+                            f"成功导入 {dates_count} 个重要日期、{courses_count} 门课程")
+    return True
+
 # ==================== 导入向导 ====================
+class RecordListModel(QAbstractListModel):
+    """向导中的记录列表 - 增删记录时只插入或移除对应的行，显示文字在绘制时才生成"""
+    
+    def __init__(self, formatter, parent=None):
+        super().__init__(parent)
+        self.formatter = formatter
+        self.records = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.formatter(self.records[index.row()])
+        return None
+    
+    def set_records(self, records):
+        self.beginResetModel()
+        self.records = list(records)
+        self.endResetModel()
+    
+    def insert_records(self, row, records):
+        if not records:
+            return
+        self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+        self.records[row:row] = records
+        self.endInsertRows()
+    
+    def remove_rows(self, rows):
+        """删除若干行，连续的行一次移除"""
+        ranges = []
+        for row in sorted(set(rows)):
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.records[first:last + 1]
+            self.endRemoveRows()
+
+def selected_rows(view):
+    return sorted({index.row() for index in view.selectionModel().selectedIndexes()})
+
+def format_date_entry(item):
+    if isinstance(item, RecurringDate):
+        return f"{item.start.strftime('%Y-%m-%d')} 起{item.describe()} - {item.event} ({item.category})"
+    return f"{item.date} - {item.event} ({item.category})"
+
+def format_course_entry(course):
+    sections, weeks = course.sections, course.weeks
+    sec_str = f"{sections[0]}-{sections[-1]}节" if sections else ""
+    week_str = f"第{weeks[0]}-{weeks[-1]}周" if weeks else ""
+    return f"{course.name} | {WEEKDAY_NAMES[course.weekday - 1]} {sec_str} | {week_str} | {course.location}"
+
 class ImportWizard(QWizard):
     """数据导入向导"""
     
@@ -450,7 +4085,11 @@ class ImportDatesPage(QWizardPage):
         layout = QVBoxLayout(self)
         
         # 日期列表
-        self.dates_list = QListWidget()
+        self.dates_model = RecordListModel(format_date_entry, self)
+        self.dates_list = QListView()
+        self.dates_list.setModel(self.dates_model)
+        self.dates_list.setUniformItemSizes(True)
+        self.dates_list.setSelectionMode(QListView.ExtendedSelection)
         self.dates_list.setFont(QFont("Microsoft YaHei", 10))
         self.refresh_dates_list()
         layout.addWidget(self.dates_list)
@@ -472,10 +4111,27 @@ class ImportDatesPage(QWizardPage):
         add_layout.addWidget(self.new_event)
         
         self.new_category = QComboBox()
-        self.new_category.addItems(["开学", "假期", "节日", "考试", "注册", "实践", "上课"])
+        self.new_category.addItems(["开学", "假期", "放假", "节日", "考试", "注册", "实践", "上课"])
         add_layout.addWidget(QLabel("类别:"))
         add_layout.addWidget(self.new_category)
         
+        # 重复的日期保存为一条规则，不逐日添加
+        self.new_repeat = QComboBox()
+        self.new_repeat.addItem("不重复", None)
+        for repeat, (_, name) in RECURRENCE_NAMES.items():
+            self.new_repeat.addItem(name, repeat)
+        add_layout.addWidget(self.new_repeat)
+        
+        self.new_until = QDateEdit()
+        self.new_until.setCalendarPopup(True)
+        self.new_until.setDisplayFormat("yyyy-MM-dd")
+        self.new_until.setDate(QDate.currentDate().addMonths(4))
+        self.new_until.setEnabled(False)
+        self.new_repeat.currentIndexChanged.connect(
+            lambda: self.new_until.setEnabled(self.new_repeat.currentData() is not None))
+        add_layout.addWidget(QLabel("截止:"))
+        add_layout.addWidget(self.new_until)
+        
         add_btn = QPushButton("添加")
         add_btn.clicked.connect(self.add_date)
         add_layout.addWidget(add_btn)
@@ -483,35 +4139,67 @@ class ImportDatesPage(QWizardPage):
         add_group.setLayout(add_layout)
         layout.addWidget(add_group)
         
-        # 删除按钮
+        # 删除和导入按钮
+        btn_layout = QHBoxLayout()
         del_btn = QPushButton("删除选中")
         del_btn.clicked.connect(self.delete_date)
-        layout.addWidget(del_btn)
+        btn_layout.addWidget(del_btn)
+        
+        file_btn = QPushButton("从ICS/CSV导入")
+        file_btn.clicked.connect(self.import_from_file)
+        btn_layout.addWidget(file_btn)
+        layout.addLayout(btn_layout)
+    
+    def initializePage(self):
+        self.refresh_dates_list()
+    
+    def import_from_file(self):
+        if import_calendar_file(self):
+            self.refresh_dates_list()
     
     def refresh_dates_list(self):
-        self.dates_list.clear()
-        for item in data_manager.get_important_dates():
-            text = f"{item['date']} - {item['event']} ({item['category']})"
-            self.dates_list.addItem(text)
+        # 重复日期规则排在单个日期之后
+        self.dates_model.set_records(data_manager.get_important_dates()
+                                     + data_manager.get_recurring_dates())
     
     def add_date(self):
         if not self.new_event.text():
             return
-        data_manager.add_important_date(
-            self.new_date.date().toString("yyyy-MM-dd"),
-            self.new_event.text(),
-            self.new_category.currentText()
-        )
+        date_str = self.new_date.date().toString("yyyy-MM-dd")
+        repeat = self.new_repeat.currentData()
+        if repeat:
+            data_manager.add_recurring_date({
+                "date": date_str,
+                "event": self.new_event.text(),
+                "category": self.new_category.currentText(),
+                "repeat": repeat,
+                "until": self.new_until.date().toString("yyyy-MM-dd"),
+            })
+            self.dates_model.insert_records(self.dates_model.rowCount(),
+                                            data_manager.get_recurring_dates()[-1:])
+        else:
+            data_manager.add_important_date(date_str, self.new_event.text(),
+                                            self.new_category.currentText())
+            dates = data_manager.get_important_dates()
+            self.dates_model.insert_records(len(dates) - 1, dates[-1:])
         self.new_event.clear()
-        self.refresh_dates_list()
     
     def delete_date(self):
-        row = self.dates_list.currentRow()
-        if row >= 0:
-            dates = data_manager.get_important_dates()
-            del dates[row]
-            data_manager.set_important_dates(dates)
-            self.refresh_dates_list()
+        rows = selected_rows(self.dates_list)
+        if not rows:
+            return
+        count = len(data_manager.get_important_dates())
+        date_rows = [row for row in rows if row < count]
+        rule_rows = {row - count for row in rows if row >= count}
+        # 同时删除日期和重复规则时合并为一次写入
+        with data_manager.batch() if date_rows and rule_rows else nullcontext():
+            if date_rows:
+                data_manager.remove_important_dates(date_rows)
+            if rule_rows:
+                data_manager.set_recurring_dates(
+                    [rule for row, rule in enumerate(data_manager.get_recurring_dates())
+                     if row not in rule_rows])
+        self.dates_model.remove_rows(rows)
 
 class ImportCoursesPage(QWizardPage):
     """导入课程页面"""
@@ -529,6 +4217,10 @@ class ImportCoursesPage(QWizardPage):
         excel_btn.clicked.connect(self.import_from_excel)
         import_layout.addWidget(excel_btn)
         
+        file_btn = QPushButton("从ICS/CSV导入")
+        file_btn.clicked.connect(self.import_from_file)
+        import_layout.addWidget(file_btn)
+        
         clear_btn = QPushButton("清空课程")
         clear_btn.clicked.connect(self.clear_courses)
         import_layout.addWidget(clear_btn)
@@ -537,7 +4229,11 @@ class ImportCoursesPage(QWizardPage):
         layout.addLayout(import_layout)
         
         # 课程列表
-        self.courses_list = QListWidget()
+        self.courses_model = RecordListModel(format_course_entry, self)
+        self.courses_list = QListView()
+        self.courses_list.setModel(self.courses_model)
+        self.courses_list.setUniformItemSizes(True)
+        self.courses_list.setSelectionMode(QListView.ExtendedSelection)
         self.courses_list.setFont(QFont("Microsoft YaHei", 10))
         self.refresh_courses_list()
         layout.addWidget(self.courses_list)
@@ -585,37 +4281,29 @@ class ImportCoursesPage(QWizardPage):
         del_btn.clicked.connect(self.delete_course)
         layout.addWidget(del_btn)
     
+    def initializePage(self):
+        self.refresh_courses_list()
+    
+    def import_from_file(self):
+        if import_calendar_file(self):
+            self.refresh_courses_list()
+    
     def refresh_courses_list(self):
-        self.courses_list.clear()
-        weekdays = ["", "周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-        for course in data_manager.get_courses():
-            sections = course.get("sections", [])
-            weeks = course.get("weeks", [])
-            sec_str = f"{sections[0]}-{sections[-1]}节" if sections else ""
-            week_str = f"第{weeks[0]}-{weeks[-1]}周" if weeks else ""
-            weekday = weekdays[course.get("weekday", 0)]
-            text = f"{course.get('name', '')} | {weekday} {sec_str} | {week_str} | {course.get('location', '')}"
-            self.courses_list.addItem(text)
-    
-    def parse_range(self, text):
-        """解析范围字符串如 '1-16' 或 '1,3,5'"""
-        result = []
-        parts = text.replace(" ", "").split(",")
-        for part in parts:
-            if "-" in part:
-                start, end = part.split("-")
-                result.extend(range(int(start), int(end) + 1))
-            else:
-                result.append(int(part))
-        return result
+        self.courses_model.set_records(data_manager.get_courses())
+    
+    def show_appended_courses(self):
+        """把新追加到课表末尾的课程插入列表"""
+        courses = data_manager.get_courses()
+        self.courses_model.insert_records(self.courses_model.rowCount(),
+                                          courses[self.courses_model.rowCount():])
     
     def add_course(self):
         if not self.course_name.text():
             return
         
         try:
-            sections = self.parse_range(self.course_sections.text())
-            weeks = self.parse_range(self.course_weeks.text())
+            sections = parse_range(self.course_sections.text())
+            weeks = parse_range(self.course_weeks.text())
         except:
             QMessageBox.warning(self, "错误", "节次或周次格式不正确")
             return
@@ -629,8 +4317,12 @@ class ImportCoursesPage(QWizardPage):
             "weeks": weeks,
             "type": "课程"
         }
-        data_manager.add_course(course)
-        self.refresh_courses_list()
+        try:
+            data_manager.add_course(course)
+        except ValueError:
+            QMessageBox.warning(self, "错误", "节次或周次超出范围")
+            return
+        self.show_appended_courses()
         
         # 清空输入
         self.course_name.clear()
@@ -640,12 +4332,10 @@ class ImportCoursesPage(QWizardPage):
         self.course_weeks.clear()
     
     def delete_course(self):
-        row = self.courses_list.currentRow()
-        if row >= 0:
-            courses = data_manager.get_courses()
-            del courses[row]
-            data_manager.set_courses(courses)
-            self.refresh_courses_list()
+        rows = selected_rows(self.courses_list)
+        if rows:
+            data_manager.remove_courses(rows)
+            self.courses_model.remove_rows(rows)
     
     def clear_courses(self):
         reply = QMessageBox.question(self, "确认", "确定清空所有课程？",
@@ -663,41 +4353,11 @@ class ImportCoursesPage(QWizardPage):
             return
         
         try:
-            import openpyxl
-            wb = openpyxl.load_workbook(file_path)
-            ws = wb.active
-            
-            imported = 0
-            # 假设格式: 课程名, 教师, 教室, 星期, 节次, 周次
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if not row[0]:
-                    continue
-                
-                try:
-                    weekday_map = {"周一": 1, "周二": 2, "周三": 3, "周四": 4, 
-                                  "周五": 5, "周六": 6, "周日": 7,
-                                  "1": 1, "2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7}
-                    
-                    weekday = weekday_map.get(str(row[3]).strip(), 1)
-                    sections = self.parse_range(str(row[4])) if row[4] else [1, 2]
-                    weeks = self.parse_range(str(row[5])) if row[5] else list(range(1, 17))
-                    
-                    course = {
-                        "name": str(row[0]),
-                        "teacher": str(row[1]) if row[1] else "",
-                        "location": str(row[2]) if row[2] else "",
-                        "weekday": weekday,
-                        "sections": sections,
-                        "weeks": weeks,
-                        "type": "导入"
-                    }
-                    data_manager.add_course(course)
-                    imported += 1
-                except Exception as e:
-                    continue
-            
-            self.refresh_courses_list()
-            QMessageBox.information(self, "导入完成", f"成功导入 {imported} 门课程")
+            courses = read_excel_courses(file_path)
+            # 全部课程一次追加、一次写入
+            data_manager.extend_courses(courses)
+            self.show_appended_courses()
+            QMessageBox.information(self, "导入完成", f"成功导入 {len(courses)} 门课程")
             
         except ImportError:
             QMessageBox.warning(self, "错误", "请先安装openpyxl库:\npip install openpyxl")
@@ -731,11 +4391,16 @@ class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("设置")
-        self.setFixedSize(450, 350)
+        self.setFixedSize(560, 480)
         self.setup_ui()
     
     def setup_ui(self):
-        layout = QVBoxLayout(self)
+        outer = QVBoxLayout(self)
+        tabs = QTabWidget()
+        outer.addWidget(tabs)
+        general_tab = QWidget()
+        tabs.addTab(general_tab, "常规")
+        layout = QVBoxLayout(general_tab)
         layout.setSpacing(15)
         layout.setContentsMargins(20, 20, 20, 20)
         
@@ -772,6 +4437,20 @@ class SettingsDialog(QDialog):
         
         layout.addSpacing(10)
         
+        # 档案：按学生/班级和学年分别保存数据
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("当前档案:"))
+        self.profile_combo = QComboBox()
+        self.refresh_profile_combo(profile_manager.active)
+        profile_layout.addWidget(self.profile_combo, 1)
+        new_profile_btn = QPushButton("新建...")
+        new_profile_btn.clicked.connect(self.create_profile)
+        profile_layout.addWidget(new_profile_btn)
+        archive_btn = QPushButton("归档本学年")
+        archive_btn.clicked.connect(self.archive_profile)
+        profile_layout.addWidget(archive_btn)
+        layout.addLayout(profile_layout)
+        
         # 数据管理按钮
         data_btn = QPushButton("重新导入数据...")
         data_btn.clicked.connect(self.open_import_wizard)
@@ -794,12 +4473,76 @@ class SettingsDialog(QDialog):
         
         layout.addStretch()
         
+        tabs.addTab(self.setup_diagnostics_tab(settings), "诊断")
+        
         button_box = QDialogButtonBox(
             QDialogButtonBox.Ok | QDialogButtonBox.Cancel
         )
         button_box.accepted.connect(self.save_settings)
         button_box.rejected.connect(self.reject)
-        layout.addWidget(button_box)
+        outer.addWidget(button_box)
+    
+    def setup_diagnostics_tab(self, settings):
+        """诊断页：开关耗时记录，查看各计时点的耗时分布并导出"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        self.profiling_checkbox = QCheckBox("记录界面刷新、保存、导入和提醒的耗时")
+        self.profiling_checkbox.setChecked(profiler.enabled)
+        layout.addWidget(self.profiling_checkbox)
+        hint = QLabel(f"程序变慢时打开，使用一段时间后导出发给开发者；"
+                      f"也可以设置环境变量 {PROFILE_ENV}=1 从启动时开始记录。")
+        hint.setWordWrap(True)
+        hint.setStyleSheet("color: #666;")
+        layout.addWidget(hint)
+        
+        self.timings_table = QTableWidget()
+        self.timings_table.setColumnCount(6)
+        self.timings_table.setHorizontalHeaderLabels(["计时点", "次数", "平均ms", "P50≤ms", "P95≤ms", "最大ms"])
+        self.timings_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.timings_table.verticalHeader().setVisible(False)
+        self.timings_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.timings_table)
+        
+        buttons = QHBoxLayout()
+        for text, slot in (("刷新", self.refresh_timings), ("清空", self.clear_timings),
+                           ("导出JSON...", self.export_timings),
+                           ("导出Chrome Trace...", self.export_trace)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.refresh_timings()
+        return tab
+    
+    def refresh_timings(self):
+        summary = profiler.summary()
+        self.timings_table.setRowCount(len(summary))
+        for row, (name, histogram) in enumerate(summary):
+            values = (name, str(histogram.count), f"{histogram.total / histogram.count:.2f}",
+                      f"{histogram.percentile(0.5):g}", f"{histogram.percentile(0.95):g}",
+                      f"{histogram.max:.2f}")
+            for column, value in enumerate(values):
+                self.timings_table.setItem(row, column, QTableWidgetItem(value))
+    
+    def clear_timings(self):
+        profiler.reset()
+        self.refresh_timings()
+    
+    def export_timings(self):
+        self.export_profile("导出耗时统计", "timings.json", "JSON文件 (*.json)", profiler.export_json)
+    
+    def export_trace(self):
+        self.export_profile("导出Chrome Trace", "trace.json", "Trace文件 (*.json)",
+                            profiler.export_chrome_trace)
+    
+    def export_profile(self, title, file_name, file_filter, export):
+        file_path, _ = QFileDialog.getSaveFileName(self, title, file_name, file_filter)
+        if not file_path:
+            return
+        try:
+            export(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "导出失败", str(e))
     
     def save_settings(self):
         set_autostart(self.autostart_checkbox.isChecked())
@@ -808,39 +4551,405 @@ class SettingsDialog(QDialog):
         settings.setValue("minimize_to_tray", self.minimize_to_tray_checkbox.isChecked())
         settings.setValue("alarm_enabled", self.alarm_checkbox.isChecked())
         settings.setValue("day_before_reminder", self.day_before_checkbox.isChecked())
+        settings.setValue("profiling_enabled", self.profiling_checkbox.isChecked())
+        profiler.enable(self.profiling_checkbox.isChecked())
+        
+        profile_manager.switch_profile(self.profile_combo.currentData())
         
         self.accept()
     
+    def refresh_profile_combo(self, selected):
+        self.profile_combo.clear()
+        for profile_id, info in profile_manager.list_profiles():
+            text = profile_manager.get_display_name(profile_id)
+            if info.get("academic_year"):
+                text += f" ({info['academic_year']})"
+            self.profile_combo.addItem(text, profile_id)
+        index = self.profile_combo.findData(selected)
+        if index >= 0:
+            self.profile_combo.setCurrentIndex(index)
+    
+    def create_profile(self):
+        name, ok = QInputDialog.getText(self, "新建档案", "档案名称（如学生姓名或班级）:")
+        if not ok or not name.strip():
+            return
+        year, ok = QInputDialog.getText(self, "新建档案", "学年:",
+                                        text=data_manager.get_academic_year())
+        if not ok:
+            return
+        profile_id = profile_manager.create_profile(name.strip(), year.strip())
+        self.refresh_profile_combo(profile_id)
+    
+    def archive_profile(self):
+        archive_id = profile_manager.archive_profile(profile_manager.active)
+        self.refresh_profile_combo(self.profile_combo.currentData())
+        QMessageBox.information(self, "提示",
+                                f"已归档为「{profile_manager.get_display_name(archive_id)}」")
+    
     def open_import_wizard(self):
+        if not ensure_writable(self):
+            return
         wizard = ImportWizard(self)
         if wizard.exec_() == QWizard.Accepted:
-            QMessageBox.information(self, "提示", "数据已更新，请重启应用以应用更改。")
+            QMessageBox.information(self, "提示", "数据已更新。")
     
     def reset_data(self):
+        if not ensure_writable(self):
+            return
         reply = QMessageBox.question(self, "确认", 
                                     "确定重置为默认数据？\n这将删除您导入的所有数据。",
                                     QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
             data_manager.reset_to_default()
-            QMessageBox.information(self, "提示", "已重置为默认数据，请重启应用。")
+            QMessageBox.information(self, "提示", "已重置为默认数据。")
+
+# ==================== 界面渲染 ====================
+RENDER_CACHE_SIZE = 256
+
+DAY_HEADER_TEMPLATE = Template("<b>${date}${week_info}</b><br>" + "━" * 25 + "<br>")
+DAY_TYPE_TEMPLATE = Template("<span style='color:#E91E63;'>${text}</span><br>")
+DAY_EVENT_TEMPLATE = Template("<span style='color:${color};'>● ${event} (${category})</span><br>")
+DAY_COURSE_TEMPLATE = Template(
+    "<span style='color:#1565C0;'>● ${name}</span><br>"
+    "  <span style='color:#666;'>${start} ${sections} | ${location}</span><br>"
+)
+TODAY_HOLIDAY_TEMPLATE = Template(
+    "<b style='color:#E91E63;'>当前为假期</b><br><br>"
+    "<span>距离开学还有 <b>${days}</b> 天</span>"
+)
+TODAY_EMPTY_TEMPLATE = Template(
+    "<b>第${week}周 ${weekday}</b><br><br>"
+    "<span style='color:#666;'>今日没有课程安排</span>"
+)
+TODAY_DAY_OFF_TEMPLATE = Template(
+    "<b>第${week}周 ${weekday}</b><br><br>"
+    "<span style='color:#E91E63;'>今日${text}</span>"
+)
+TODAY_HEADER_TEMPLATE = Template("<b>今日课程 (第${week}周 ${weekday})</b><br><br>")
+TODAY_COURSE_TEMPLATE = Template(
+    "<div style='margin-bottom:10px; padding:10px; background:#E3F2FD; border-radius:5px;'>"
+    "<b style='color:#1565C0;'>${name}</b><br>"
+    "<span style='color:#666;'>时间: ${start}-${end} (${sections})</span><br>"
+    "<span style='color:#666;'>地点: ${location}</span>"
+    "</div>"
+)
+
+class PanelRenderer:
+    """日期详情和今日课程面板的HTML渲染，按 (面板, 日期) 缓存在LRU中，数据代数变化后清空"""
+    
+    def __init__(self, manager=None, cache_size=RENDER_CACHE_SIZE):
+        self.manager = manager or data_manager
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_generation = None
+        self.events_by_date = {}
+        self.events_generation = None
+    
+    def cached(self, key, build):
+        # 旧数据代数的结果不会再被用到，数据变化后整体丢弃，不留在LRU中占用内存
+        if self.cache_generation != self.manager.generation:
+            self.cache.clear()
+            self.cache_generation = self.manager.generation
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.move_to_end(key)
+            return result
+        result = self.cache[key] = build()
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+    
+    def events_on(self, day):
+        """按日期分组的重要日期，数据变化后重新分组；重复日期只判断当天是否发生"""
+        if self.events_generation != self.manager.generation:
+            self.events_by_date = {}
+            for item in self.manager.get_important_dates():
+                self.events_by_date.setdefault(item.date, []).append(item)
+            self.events_generation = self.manager.generation
+        events = self.events_by_date.get(day.strftime("%Y-%m-%d"), [])
+        recurring = [rule.occurrence(day) for rule in self.manager.get_recurring_dates()
+                     if rule.occurs_on(day)]
+        return events + recurring if recurring else events
+    
+    def day_detail(self, day):
+        """日期详情，返回 (HTML, 当天是否有安排)"""
+        return self.cached(("day", day), lambda: self.build_day_detail(day))
+    
+    def build_day_detail(self, day):
+        weekday = get_weekday_name(day)
+        semester, week_num = get_week_number(day, self.manager)
+        week_info = f" | {semester} 第{week_num}周 {weekday}" if semester and week_num else f" {weekday}"
+        parts = [DAY_HEADER_TEMPLATE.substitute(date=day.strftime('%Y年%m月%d日'), week_info=week_info)]
+        info = self.manager.get_day_table().day_info(day)
+        if info and info.day_type != DAY_TEACHING:
+            parts.append(DAY_TYPE_TEMPLATE.substitute(text=info.describe()))
+        
+        events = self.events_on(day)
+        for event in events:
+            parts.append(DAY_EVENT_TEMPLATE.substitute(
+                color=CATEGORY_COLORS.get(event.category, "#333"),
+                event=event.event, category=event.category))
+        
+        sessions = self.manager.get_term_schedule().sessions_on(day)
+        if sessions:
+            parts.append("<br><b>课程安排:</b><br>")
+            for session in sessions:
+                parts.append(DAY_COURSE_TEMPLATE.substitute(
+                    name=session.course.name, start=session.start_time,
+                    sections=session.sections_text(), location=session.course.location))
+        
+        if not events and not sessions:
+            parts.append("<span style='color:#666;'>无安排</span>" if semester
+                         else "<span style='color:#666;'>假期</span>")
+        return "".join(parts), bool(events or sessions)
+    
+    def today_panel(self, today):
+        return self.cached(("today", today), lambda: self.build_today_panel(today))
+    
+    def build_today_panel(self, today):
+        semester, week_num = get_week_number(today, self.manager)
+        if not semester:
+            spring_start, _ = self.manager.get_semester_dates("spring")
+            if spring_start:
+                return TODAY_HOLIDAY_TEMPLATE.substitute(days=(spring_start - today).days)
+            return "<b>当前为假期</b>"
+        
+        weekday = get_weekday_name(today)
+        info = self.manager.get_day_table().day_info(today)
+        if not info.has_classes:
+            return TODAY_DAY_OFF_TEMPLATE.substitute(week=week_num, weekday=weekday, text=info.describe())
+        sessions = self.manager.get_term_schedule().sessions_on(today)
+        if not sessions:
+            return TODAY_EMPTY_TEMPLATE.substitute(week=week_num, weekday=weekday)
+        
+        parts = [TODAY_HEADER_TEMPLATE.substitute(week=week_num, weekday=weekday)]
+        if info.day_type != DAY_TEACHING:
+            parts.append(DAY_TYPE_TEMPLATE.substitute(text=info.describe()) + "<br>")
+        for session in sessions:
+            parts.append(TODAY_COURSE_TEMPLATE.substitute(
+                name=session.course.name, start=session.start_time, end=session.end_time,
+                sections=session.sections_text(), location=session.course.location))
+        return "".join(parts)
+
+# ==================== 重要日期表格模型 ====================
+# 表格每次向下滚动到底部时加载的行数
+EVENT_FETCH_BATCH = 256
+
+class EventIndex:
+    """按日期排序的重要日期索引，日期范围用二分查找，类别和文字在范围内筛选"""
+    
+    def __init__(self, events=()):
+        self.events = sorted(events, key=lambda item: item.date)
+        self.dates = [item.date for item in self.events]
+        self.search_texts = None
+    
+    def select(self, category=None, first=None, last=None, text=""):
+        """符合条件的行号；first/last 为 YYYY-MM-DD 字符串"""
+        low = bisect_left(self.dates, first) if first else 0
+        high = bisect_right(self.dates, last) if last else len(self.dates)
+        rows = range(low, high)
+        if category:
+            events = self.events
+            rows = [row for row in rows if events[row].category == category]
+        if text:
+            if self.search_texts is None:
+                self.search_texts = [f"{item.event}\n{item.category}".casefold() for item in self.events]
+            texts = self.search_texts
+            text = text.casefold()
+            rows = [row for row in rows if text in texts[row]]
+        return rows
+
+class EventTableModel(QAbstractTableModel):
+    """重要日期表格模型 - 只为已滚动到的行生成显示内容，其余行通过 fetchMore 分批加载
+    
+    筛选直接在 EventIndex 上完成，排序只对筛选结果的行号排序，而不是用 QSortFilterProxyModel
+    逐行回调，否则代理需要先加载全部行才能筛选和排序。
+    """
+    
+    HEADERS = ("日期", "周次", "事件", "类别")
+    
+    def __init__(self, manager=None, parent=None):
+        super().__init__(parent)
+        self.manager = manager or data_manager
+        self.event_index = EventIndex()
+        self.filters = {}
+        self.rows = range(0)
+        self.loaded = 0
+        self.sort_column = 0
+        self.sort_order = Qt.AscendingOrder
+        self.colors = {category: QColor(color) for category, color in CATEGORY_COLORS.items()}
+        self.default_color = QColor("#333")
+    
+    def set_events(self, events):
+        self.beginResetModel()
+        self.event_index = EventIndex(events)
+        self.select()
+        self.endResetModel()
+    
+    def set_filter(self, category=None, first=None, last=None, text=""):
+        self.beginResetModel()
+        self.filters = {"category": category, "first": first, "last": last, "text": text}
+        self.select()
+        self.endResetModel()
+    
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.beginResetModel()
+        self.sort_column = column
+        self.sort_order = order
+        self.select()
+        self.endResetModel()
+    
+    def sort_key(self, column):
+        events = self.event_index.events
+        if column == 1:
+            def week_of(row):
+                semester, week_num = get_week_number(events[row].day, self.manager)
+                return week_num if semester and week_num else 0
+            return week_of
+        if column == 2:
+            return lambda row: events[row].event
+        return lambda row: events[row].category
+    
+    def select(self):
+        rows = self.event_index.select(**self.filters)
+        descending = self.sort_order == Qt.DescendingOrder
+        if self.sort_column == 0:
+            # 索引本来就按日期排列
+            if descending:
+                rows = rows[::-1]
+        else:
+            # 排序是稳定的，同一周次、事件或类别内仍按日期排列
+            rows = sorted(rows, key=self.sort_key(self.sort_column), reverse=descending)
+        self.rows = rows
+        self.loaded = min(EVENT_FETCH_BATCH, len(self.rows))
+    
+    def total(self):
+        """符合筛选条件的行数（包括尚未加载的）"""
+        return len(self.rows)
+    
+    def event_at(self, row):
+        return self.event_index.events[self.rows[row]]
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded < len(self.rows)
+    
+    def fetchMore(self, parent):
+        count = min(EVENT_FETCH_BATCH, len(self.rows) - self.loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.event_at(index.row())
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return item.date
+            if column == 1:
+                semester, week_num = get_week_number(item.day, self.manager)
+                return f"第{week_num}周" if semester and week_num else "-"
+            return item.event if column == 2 else item.category
+        if role == Qt.TextAlignmentRole and column != 2:
+            return Qt.AlignCenter
+        if role == Qt.ForegroundRole and column == 3:
+            return self.colors.get(item.category, self.default_color)
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
 
 # ==================== 主窗口 ====================
+# 定时刷新的最长等待时间，防止系统休眠或调整时钟后长时间不刷新
+REFRESH_MAX_WAIT_MINUTES = 60
+# 开课前一小时内托盘提示按这几档倒计时（分钟），只在跨档时唤醒，不必每分钟刷新
+TRAY_COUNTDOWN_STEPS = (60, 30, 15, 5)
+
+def countdown_step(minutes):
+    """距开课minutes分钟时托盘提示显示的档位，如 12 -> 15"""
+    for step in reversed(TRAY_COUNTDOWN_STEPS):
+        if minutes <= step:
+            return step
+    return None
+
+SELECTED_DATE_STYLE = """
+    QLabel {
+        background-color: %s;
+        padding: 15px;
+        border-radius: 8px;
+        border-left: 4px solid %s;
+    }
+"""
+
 class CalendarApp(QMainWindow):
+    # 数据段 -> 受影响的界面刷新方法
+    SECTION_VIEWS = {
+        "school_name": ("update_window_title", "update_title_labels", "update_tray_tooltip"),
+        "academic_year": ("update_window_title", "update_title_labels"),
+        "semesters": ("update_current_date", "update_tray_week_info", "update_today_course_info",
+                      "update_tray_tooltip", "update_today_courses_display", "populate_week_table",
+                      "populate_events_table", "highlight_important_dates",
+                      "highlight_course_dates", "update_stats_view"),
+        "class_times": ("update_today_courses_display", "populate_week_table", "update_tray_tooltip",
+                        "update_free_rooms", "update_teacher_view", "update_stats_view"),
+        "class_time_tables": ("update_today_courses_display", "populate_week_table",
+                              "update_tray_tooltip", "update_free_rooms", "update_teacher_view",
+                              "update_stats_view"),
+        # 放假、法定节假日和考试会改变日期类型表，上课安排也要刷新
+        "important_dates": ("update_today_course_info", "update_tray_tooltip",
+                            "update_today_courses_display", "populate_week_table",
+                            "populate_events_table", "highlight_important_dates",
+                            "highlight_course_dates", "update_stats_view"),
+        "recurring_dates": ("update_today_course_info", "update_tray_tooltip",
+                            "update_today_courses_display", "populate_week_table",
+                            "populate_events_table", "highlight_important_dates",
+                            "highlight_course_dates", "update_stats_view"),
+        "day_overrides": ("update_today_course_info", "update_tray_tooltip",
+                          "update_today_courses_display", "populate_week_table",
+                          "highlight_important_dates", "highlight_course_dates", "update_stats_view"),
+        "courses": ("update_current_date", "update_today_course_info", "update_tray_tooltip",
+                    "update_today_courses_display", "populate_week_table",
+                    "highlight_important_dates", "highlight_course_dates",
+                    "update_free_rooms", "update_teacher_view", "update_stats_view"),
+    }
+    # 刷新顺序：重要日期高亮会清除所有格式，课程高亮必须在它之后
+    VIEW_ORDER = (
+        "update_window_title", "update_title_labels", "update_tray_week_info",
+        "update_today_course_info", "update_tray_tooltip", "update_current_date",
+        "update_today_courses_display", "populate_week_table", "populate_events_table",
+        "highlight_important_dates", "highlight_course_dates", "update_free_rooms",
+        "update_teacher_view", "update_stats_view",
+    )
+    
     def __init__(self):
         super().__init__()
-        school = data_manager.get_school_name()
-        year = data_manager.get_academic_year()
-        self.setWindowTitle(f"{school}校历 {year}学年 - 2025-2026版")
+        self.update_window_title()
         self.setMinimumSize(1100, 750)
         
         self.settings = QSettings(APP_KEY, APP_NAME)
+        if self.settings.value("profiling_enabled", False, type=bool):
+            profiler.enable()
         self.reminded_classes = set()
         self.reminded_day_before = set()
+        # 各定时回调被唤醒的次数，供常驻监控统计
+        self.wakeups = Counter()
+        self.renderer = PanelRenderer(data_manager)
         
         self.setup_tray_icon()
         self.setup_ui()
         self.setup_timer()
-        self.setup_alarm_timer()
+        self.setup_file_watcher()
         
         # 首次运行显示导入向导
         if not self.settings.value("first_run_done", False, type=bool):
@@ -878,7 +4987,7 @@ class CalendarApp(QMainWindow):
         self.tray_icon = QSystemTrayIcon(self)
         icon = self.style().standardIcon(self.style().SP_ComputerIcon)
         self.tray_icon.setIcon(icon)
-        self.tray_icon.setToolTip(f"{data_manager.get_school_name()}校历")
+        self.update_tray_tooltip()
         
         tray_menu = QMenu()
         
@@ -929,12 +5038,31 @@ class CalendarApp(QMainWindow):
             self.week_action.setText("当前: 假期")
     
     def update_today_course_info(self):
-        courses = get_courses_on_date(date.today())
-        if courses:
-            self.today_course_action.setText(f"今日课程: {len(courses)}节")
+        sessions = data_manager.get_term_schedule().sessions_on(date.today())
+        if sessions:
+            self.today_course_action.setText(f"今日课程: {len(sessions)}节")
         else:
             self.today_course_action.setText("今日无课")
     
+    def update_tray_tooltip(self):
+        tooltip = f"{data_manager.get_school_name()}校历"
+        now = datetime.now()
+        schedule = data_manager.get_term_schedule()
+        current = schedule.current_session(now)
+        upcoming = schedule.next_session(now)
+        if current:
+            tooltip += f"\n正在上课: {current.course.name} 至{current.end_time}"
+        if upcoming:
+            step = countdown_step(upcoming.start - moment_of(now))
+            if step:
+                when = f"{upcoming.start_time}（{step}分钟内）"
+            elif upcoming.day == now.date():
+                when = f"今天{upcoming.start_time}"
+            else:
+                when = f"{upcoming.day.month}月{upcoming.day.day}日 {upcoming.start_time}"
+            tooltip += f"\n下一节: {upcoming.course.name} {when}"
+        self.tray_icon.setToolTip(tooltip)
+    
     def tray_icon_activated(self, reason):
         if reason == QSystemTrayIcon.DoubleClick:
             self.show_window()
@@ -944,6 +5072,10 @@ class CalendarApp(QMainWindow):
         self.activateWindow()
         self.raise_()
     
+    def handle_instance_message(self, args):
+        """再次启动程序时唤出主窗口"""
+        self.show_window()
+    
     def show_settings(self):
         dialog = SettingsDialog(self)
         dialog.exec_()
@@ -957,21 +5089,96 @@ class CalendarApp(QMainWindow):
                          f"{NEW_VERSION_NOTICE}")
     
     def open_data_manager(self):
+        if not ensure_writable(self):
+            return
         wizard = ImportWizard(self)
         if wizard.exec_() == QWizard.Accepted:
             self.refresh_display()
     
-    def refresh_display(self):
-        """刷新显示"""
+    def update_window_title(self):
         school = data_manager.get_school_name()
         year = data_manager.get_academic_year()
-        self.setWindowTitle(f"{school}校历 {year}学年 - 2025-2026版")
-        self.update_current_date()
-        self.update_today_courses_display()
-        self.populate_week_table()
-        self.populate_events_table()
-        self.highlight_important_dates()
-        self.highlight_course_dates()
+        profile = profile_manager.get_display_name(profile_manager.active)
+        self.setWindowTitle(f"{school}校历 {year}学年 - {profile}")
+    
+    def update_title_labels(self):
+        self.title_label.setText(data_manager.get_school_name())
+        self.subtitle_label.setText(f"{data_manager.get_academic_year()}学年校历")
+    
+    @profiler.timed("refresh_display")
+    def refresh_display(self):
+        """刷新显示"""
+        self.run_views(self.VIEW_ORDER)
+        self.schedule_refresh()
+    
+    def run_views(self, views):
+        """按 VIEW_ORDER 的顺序调用views中的刷新方法，开启诊断时分别计时"""
+        for name in self.VIEW_ORDER:
+            if name in views:
+                profiler.call(f"view.{name}", getattr(self, name))
+    
+    def setup_file_watcher(self):
+        """监视数据文件，被其他程序修改或同步后自动重新加载"""
+        self.pending_sections = set()
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.on_data_file_changed)
+        self.file_watcher.directoryChanged.connect(self.on_data_file_changed)
+        self.watch_data_files()
+        
+        # 文件写入往往分多次完成，稍等片刻再读
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setObjectName("reload_timer")
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(500)
+        self.reload_timer.timeout.connect(self.reload_external_changes)
+        
+        # 合并同一轮事件循环中的多次数据变化
+        self.apply_changes_timer = QTimer(self)
+        self.apply_changes_timer.setObjectName("apply_changes_timer")
+        self.apply_changes_timer.setSingleShot(True)
+        self.apply_changes_timer.setInterval(0)
+        self.apply_changes_timer.timeout.connect(self.apply_data_changes)
+        data_manager.add_listener(self.on_data_changed)
+    
+    def watch_data_files(self):
+        # 同步软件常以替换文件的方式写入，旧路径会失效，需要重新添加
+        watched = self.file_watcher.files() + self.file_watcher.directories()
+        if watched:
+            self.file_watcher.removePaths(watched)
+        paths = [path for path in data_manager.backend.watch_paths() if os.path.exists(path)]
+        if paths:
+            paths.append(os.path.dirname(paths[0]))
+            self.file_watcher.addPaths(paths)
+    
+    def on_data_file_changed(self, path):
+        self.reload_timer.start()
+    
+    @profiler.timed("timer.reload_external_changes")
+    def reload_external_changes(self):
+        self.wakeups["reload_external_changes"] += 1
+        self.watch_data_files()
+        data_manager.reload_if_changed()
+    
+    def on_data_changed(self, sections, deltas):
+        self.pending_sections.update(sections)
+        self.apply_changes_timer.start()
+    
+    @profiler.timed("timer.apply_data_changes")
+    def apply_data_changes(self):
+        """只刷新受变化数据段影响的界面"""
+        self.wakeups["apply_data_changes"] += 1
+        sections = self.pending_sections
+        self.pending_sections = set()
+        self.watch_data_files()
+        views = set()
+        for section in sections:
+            if section not in self.SECTION_VIEWS:
+                self.refresh_display()
+                return
+            views.update(self.SECTION_VIEWS[section])
+        self.run_views(views)
+        # 课表和学期变化后上下课时刻也可能变化
+        self.schedule_refresh()
     
     def quit_app(self):
         self.tray_icon.hide()
@@ -1052,6 +5259,7 @@ class CalendarApp(QMainWindow):
         self.highlight_important_dates()
         self.highlight_course_dates()
         self.calendar.clicked.connect(self.on_date_clicked)
+        self.calendar.currentPageChanged.connect(self.highlight_recurring_dates)
         left_panel.addWidget(self.calendar)
         
         bottom_layout = QHBoxLayout()
@@ -1136,14 +5344,44 @@ class CalendarApp(QMainWindow):
         # Tab 3: 重要日期
         events_tab = QWidget()
         events_layout = QVBoxLayout(events_tab)
-        self.events_table = QTableWidget()
-        self.events_table.setColumnCount(4)
-        self.events_table.setHorizontalHeaderLabels(["日期", "周次", "事件", "类别"])
+        filter_layout = QHBoxLayout()
+        self.events_category = QComboBox()
+        self.events_category.addItem("全部类别", None)
+        for category in CATEGORY_COLORS:
+            self.events_category.addItem(category, category)
+        self.events_range_checkbox = QCheckBox("日期范围")
+        self.events_from = QDateEdit()
+        self.events_to = QDateEdit()
+        for edit in (self.events_from, self.events_to):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+            edit.setEnabled(False)
+        term_first, term_last = data_manager.get_term_range()
+        self.events_from.setDate(QDate(term_first) if term_first else QDate.currentDate())
+        self.events_to.setDate(QDate(term_last) if term_last else QDate.currentDate().addYears(1))
+        self.events_search = QLineEdit()
+        self.events_search.setPlaceholderText("搜索事件")
+        self.events_count_label = QLabel()
+        filter_layout.addWidget(self.events_category)
+        filter_layout.addWidget(self.events_range_checkbox)
+        filter_layout.addWidget(self.events_from)
+        filter_layout.addWidget(QLabel("至"))
+        filter_layout.addWidget(self.events_to)
+        filter_layout.addWidget(self.events_search, 1)
+        filter_layout.addWidget(self.events_count_label)
+        events_layout.addLayout(filter_layout)
+        
+        self.events_model = EventTableModel(data_manager, self)
+        self.events_table = QTableView()
+        self.events_table.setModel(self.events_model)
+        self.events_table.verticalHeader().setVisible(False)
+        # 固定行高，滚动时不必逐行计算内容高度
+        self.events_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.events_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.events_table.setFont(QFont("Microsoft YaHei", 10))
         self.events_table.setAlternatingRowColors(True)
         self.events_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 border: 1px solid #ddd;
             }
@@ -1154,25 +5392,157 @@ class CalendarApp(QMainWindow):
                 border: none;
             }
         """)
-        self.events_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.events_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.events_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.events_table.setSortingEnabled(True)
         self.populate_events_table()
+        self.events_category.currentIndexChanged.connect(self.filter_events_table)
+        self.events_range_checkbox.toggled.connect(self.events_from.setEnabled)
+        self.events_range_checkbox.toggled.connect(self.events_to.setEnabled)
+        self.events_range_checkbox.toggled.connect(self.filter_events_table)
+        self.events_from.dateChanged.connect(self.filter_events_table)
+        self.events_to.dateChanged.connect(self.filter_events_table)
+        self.events_search.textChanged.connect(self.filter_events_table)
         events_layout.addWidget(self.events_table)
         self.tab_widget.addTab(events_tab, "重要日期")
         
+        # Tab 4: 空教室
+        self.room_index = RoomIndex().attach(data_manager)
+        rooms_tab = QWidget()
+        rooms_layout = QVBoxLayout(rooms_tab)
+        query_layout = QHBoxLayout()
+        _, current_week = get_week_number(date.today())
+        self.room_week = QSpinBox()
+        self.room_week.setRange(1, 30)
+        self.room_week.setValue(current_week or 1)
+        self.room_weekday = QComboBox()
+        self.room_weekday.addItems(["周一", "周二", "周三", "周四", "周五", "周六", "周日"])
+        self.room_weekday.setCurrentIndex(date.today().weekday())
+        self.room_section_from = QSpinBox()
+        self.room_section_from.setValue(1)
+        self.room_section_to = QSpinBox()
+        self.room_section_to.setValue(2)
+        self.room_building = QComboBox()
+        for widget in (QLabel("第"), self.room_week, QLabel("周"), self.room_weekday,
+                       QLabel("第"), self.room_section_from, QLabel("-"), self.room_section_to,
+                       QLabel("节"), self.room_building):
+            query_layout.addWidget(widget)
+        query_layout.addStretch()
+        rooms_layout.addLayout(query_layout)
+        self.free_rooms_label = QLabel()
+        rooms_layout.addWidget(self.free_rooms_label)
+        self.free_rooms_list = QListWidget()
+        rooms_layout.addWidget(self.free_rooms_list)
+        self.update_free_rooms()
+        self.room_week.valueChanged.connect(self.query_free_rooms)
+        self.room_weekday.currentIndexChanged.connect(self.query_free_rooms)
+        self.room_section_from.valueChanged.connect(self.query_free_rooms)
+        self.room_section_to.valueChanged.connect(self.query_free_rooms)
+        self.room_building.currentIndexChanged.connect(self.query_free_rooms)
+        self.tab_widget.addTab(rooms_tab, "空教室")
+        
+        # Tab 5: 教师课表
+        self.teacher_index = TeacherIndex(data_manager).attach(data_manager)
+        teacher_tab = QWidget()
+        teacher_layout = QVBoxLayout(teacher_tab)
+        teacher_query_layout = QHBoxLayout()
+        self.teacher_combo = QComboBox()
+        self.teacher_combo.setMinimumWidth(150)
+        self.teacher_week = QSpinBox()
+        self.teacher_week.setRange(1, 30)
+        self.teacher_week.setValue(current_week or 1)
+        for widget in (QLabel("教师:"), self.teacher_combo, QLabel("第"), self.teacher_week, QLabel("周")):
+            teacher_query_layout.addWidget(widget)
+        teacher_query_layout.addStretch()
+        teacher_layout.addLayout(teacher_query_layout)
+        self.teacher_hours_label = QLabel()
+        teacher_layout.addWidget(self.teacher_hours_label)
+        self.teacher_conflict_label = QLabel()
+        self.teacher_conflict_label.setWordWrap(True)
+        self.teacher_conflict_label.setStyleSheet("color: #D32F2F;")
+        teacher_layout.addWidget(self.teacher_conflict_label)
+        self.teacher_table = QTableWidget()
+        self.teacher_table.setColumnCount(7)
+        self.teacher_table.setHorizontalHeaderLabels(["周一", "周二", "周三", "周四", "周五", "周六", "周日"])
+        self.teacher_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.teacher_table.setFont(QFont("Microsoft YaHei", 9))
+        self.teacher_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        teacher_layout.addWidget(self.teacher_table)
+        self.update_teacher_view()
+        self.teacher_combo.currentIndexChanged.connect(self.query_teacher_timetable)
+        self.teacher_week.valueChanged.connect(self.query_teacher_timetable)
+        self.tab_widget.addTab(teacher_tab, "教师课表")
+        
+        # Tab 6: 搜索
+        self.search_index = SearchIndex().attach(data_manager)
+        self.search_other_profiles = set()
+        profile_manager.add_listener(self.on_profile_switched)
+        search_tab = QWidget()
+        search_layout = QVBoxLayout(search_tab)
+        search_bar = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("课程名、教师、教室、事件或拼音首字母")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_all_checkbox = QCheckBox("包括其他档案")
+        search_bar.addWidget(self.search_edit, 1)
+        search_bar.addWidget(self.search_all_checkbox)
+        search_layout.addLayout(search_bar)
+        self.search_results = QListWidget()
+        self.search_results.setFont(QFont("Microsoft YaHei", 10))
+        search_layout.addWidget(self.search_results)
+        self.search_edit.textChanged.connect(self.run_search)
+        self.search_all_checkbox.toggled.connect(self.run_search)
+        self.search_results.itemActivated.connect(self.on_search_result_activated)
+        self.search_results.itemClicked.connect(self.on_search_result_activated)
+        self.tab_widget.addTab(search_tab, "搜索")
+        
+        # Tab 7: 统计
+        stats_tab = QWidget()
+        stats_layout = QVBoxLayout(stats_tab)
+        stats_bar = QHBoxLayout()
+        self.stats_semester = QComboBox()
+        for key, name in DayTable.SEMESTER_NAMES:
+            self.stats_semester.addItem(name, key)
+        self.stats_semester.setCurrentIndex(
+            self.stats_semester.findData(current_semester_key(datetime.now(), data_manager)))
+        self.stats_export_button = QPushButton("导出CSV")
+        stats_bar.addWidget(QLabel("学期:"))
+        stats_bar.addWidget(self.stats_semester)
+        stats_bar.addStretch()
+        stats_bar.addWidget(self.stats_export_button)
+        stats_layout.addLayout(stats_bar)
+        self.stats_summary_label = QLabel()
+        self.stats_summary_label.setWordWrap(True)
+        stats_layout.addWidget(self.stats_summary_label)
+        stats_tables = QHBoxLayout()
+        self.stats_weeks_table = QTableWidget()
+        self.stats_weeks_table.setColumnCount(3)
+        self.stats_weeks_table.setHorizontalHeaderLabels(["课次", "学时", "分布"])
+        self.stats_weeks_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.stats_courses_table = QTableWidget()
+        self.stats_courses_table.setColumnCount(3)
+        self.stats_courses_table.setHorizontalHeaderLabels(["课程", "课次", "学时"])
+        self.stats_courses_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.stats_courses_table.verticalHeader().setVisible(False)
+        for table in (self.stats_weeks_table, self.stats_courses_table):
+            table.setEditTriggers(QTableWidget.NoEditTriggers)
+            table.setFont(QFont("Microsoft YaHei", 9))
+            stats_tables.addWidget(table)
+        stats_layout.addLayout(stats_tables)
+        self.semester_stats = None
+        self.update_stats_view()
+        self.stats_semester.currentIndexChanged.connect(self.update_stats_view)
+        self.stats_export_button.clicked.connect(self.export_stats)
+        self.tab_widget.addTab(stats_tab, "统计")
+        
         right_panel.addWidget(self.tab_widget)
         
         self.selected_date_label = QLabel("点击日历查看当日详情")
         self.selected_date_label.setFont(QFont("Microsoft YaHei", 11))
         self.selected_date_label.setWordWrap(True)
         self.selected_date_label.setMinimumHeight(120)
-        self.selected_date_label.setStyleSheet("""
-            QLabel {
-                background-color: #FFF8E1;
-                padding: 15px;
-                border-radius: 8px;
-                border-left: 4px solid #FFC107;
-            }
-        """)
+        self.selected_date_label.setStyleSheet(SELECTED_DATE_STYLE % ("#FFF8E1", "#FFC107"))
+        self.selected_date_has_items = False
         right_panel.addWidget(self.selected_date_label)
         
         main_layout.addLayout(right_panel, 1)
@@ -1203,50 +5573,76 @@ class CalendarApp(QMainWindow):
         """)
     
     def setup_timer(self):
-        timer = QTimer(self)
-        timer.timeout.connect(self.update_current_date)
-        timer.timeout.connect(self.update_tray_week_info)
-        timer.timeout.connect(self.update_today_course_info)
-        timer.timeout.connect(self.update_today_courses_display)
-        timer.start(60000)
-    
-    def setup_alarm_timer(self):
-        self.alarm_timer = QTimer(self)
-        self.alarm_timer.timeout.connect(self.check_class_alarm)
-        self.alarm_timer.start(60000)
+        """单次定时器：只在显示内容可能变化的时刻（零点、上下课、提醒时刻）唤醒"""
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setObjectName("refresh_timer")
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.on_refresh_timer)
+        self.display_day = date.today()
+        self.schedule_refresh()
         QTimer.singleShot(1000, self.check_class_alarm)
     
+    def next_refresh_time(self, now):
+        """下一个显示内容可能变化的时刻"""
+        moment = moment_of(now)
+        # 零点：日期、周次和今日课程
+        boundaries = [(now.toordinal() + 1) * 1440, moment + REFRESH_MAX_WAIT_MINUTES]
+        schedule = data_manager.get_term_schedule()
+        current = schedule.current_session(now)
+        if current:
+            boundaries.append(current.end)
+        upcoming = schedule.next_session(now)
+        if upcoming:
+            boundaries.append(upcoming.start)
+            # 托盘提示的倒计时档位
+            boundaries.extend(upcoming.start - step for step in TRAY_COUNTDOWN_STEPS)
+        if self.settings.value("alarm_enabled", True, type=bool):
+            alarm = schedule.next_session(now + timedelta(minutes=30))
+            if alarm:
+                boundaries.append(alarm.start - 30)
+        target = min(boundary for boundary in boundaries if boundary > moment)
+        return datetime.fromordinal(target // 1440) + timedelta(minutes=target % 1440)
+    
+    def schedule_refresh(self):
+        now = datetime.now()
+        wait = self.next_refresh_time(now) - now
+        # 稍晚于边界唤醒，保证醒来时已进入新的一分钟
+        self.refresh_timer.start(int(wait.total_seconds() * 1000) + 500)
+    
+    @profiler.timed("timer.refresh")
+    def on_refresh_timer(self):
+        self.wakeups["refresh"] += 1
+        if self.display_day != date.today():
+            # 跨天后本周课表可能进入新的一周
+            self.display_day = date.today()
+            self.populate_week_table()
+            # 已提醒记录只在当天有用，常驻数月也不应一直累积
+            self.reminded_classes.clear()
+            self.reminded_day_before.clear()
+        self.update_current_date()
+        self.update_tray_week_info()
+        self.update_today_course_info()
+        self.update_tray_tooltip()
+        self.update_today_courses_display()
+        self.check_class_alarm()
+        self.schedule_refresh()
+    
     def check_class_alarm(self):
         if not self.settings.value("alarm_enabled", True, type=bool):
             return
         
         now = datetime.now()
-        today = now.date()
-        current_time = now.time()
-        
-        courses = get_courses_on_date(today)
-        class_times = data_manager.get_class_times()
-        
-        for course in courses:
-            first_section = course.get("sections", [1])[0]
-            if first_section not in class_times:
-                continue
-            
-            class_start_str = class_times[first_section][0]
-            class_start = datetime.strptime(class_start_str, "%H:%M").time()
-            
-            class_datetime = datetime.combine(today, class_start)
-            remind_datetime = class_datetime - timedelta(minutes=30)
-            remind_time = remind_datetime.time()
-            
-            course_id = f"{today}_{course.get('name')}_{first_section}"
-            
-            current_minutes = current_time.hour * 60 + current_time.minute
-            remind_minutes = remind_time.hour * 60 + remind_time.minute
-            
-            if abs(current_minutes - remind_minutes) <= 1 and course_id not in self.reminded_classes:
+        # 提前30分钟提醒，允许1分钟误差；只计查询，不计提醒窗口停留的时间
+        with profiler.span("alarm.class"):
+            upcoming = data_manager.get_term_schedule().sessions_between(
+                now + timedelta(minutes=29), now + timedelta(minutes=32))
+        
+        for session in upcoming:
+            course = session.course
+            course_id = f"{session.day}_{course.name}_{course.sections[0]}"
+            if course_id not in self.reminded_classes:
                 self.reminded_classes.add(course_id)
-                self.show_class_alarm(course, class_start_str)
+                self.show_class_alarm(course, session.start_time)
     
     def show_class_alarm(self, course, start_time):
         try:
@@ -1254,15 +5650,15 @@ class CalendarApp(QMainWindow):
         except:
             pass
         
-        sections = course.get("sections", [])
+        sections = course.sections
         sections_str = f"第{sections[0]}-{sections[-1]}节" if sections else ""
         
         self.tray_icon.showMessage(
             "上课提醒",
             f"30分钟后上课！\n\n"
-            f"课程: {course.get('name')}\n"
+            f"课程: {course.name}\n"
             f"时间: {start_time} ({sections_str})\n"
-            f"地点: {course.get('location')}",
+            f"地点: {course.location}",
             QSystemTrayIcon.Warning,
             10000
         )
@@ -1272,10 +5668,10 @@ class CalendarApp(QMainWindow):
         msg.setWindowTitle("上课提醒")
         msg.setIcon(QMessageBox.Warning)
         msg.setText(f"30分钟后上课！\n\n"
-                   f"课程: {course.get('name')}\n"
+                   f"课程: {course.name}\n"
                    f"时间: {start_time} ({sections_str})\n"
-                   f"地点: {course.get('location')}\n"
-                   f"教师: {course.get('teacher')}")
+                   f"地点: {course.location}\n"
+                   f"教师: {course.teacher}")
         msg.exec_()
     
     def check_day_before_reminder(self):
@@ -1283,9 +5679,10 @@ class CalendarApp(QMainWindow):
             return
         
         tomorrow = date.today() + timedelta(days=1)
-        courses = get_courses_on_date(tomorrow)
+        with profiler.span("alarm.day_before"):
+            sessions = data_manager.get_term_schedule().sessions_on(tomorrow)
         
-        if not courses:
+        if not sessions:
             return
         
         reminder_id = f"day_before_{tomorrow}"
@@ -1299,20 +5696,16 @@ class CalendarApp(QMainWindow):
         self.reminded_day_before.add(reminder_id)
         self.settings.setValue("last_day_before_reminder", str(tomorrow))
         
-        class_times = data_manager.get_class_times()
         course_list = ""
-        for c in courses:
-            sections = c.get("sections", [])
-            sections_str = f"第{sections[0]}-{sections[-1]}节" if sections else ""
-            start_time = class_times.get(sections[0], ["?"])[0] if sections else "?"
-            course_list += f"\n  - {c.get('name')} ({start_time}, {sections_str})"
+        for session in sessions:
+            course_list += f"\n  - {session.course.name} ({session.start_time}, {session.sections_text()})"
         
         semester, week_num = get_week_number(tomorrow)
         weekday = get_weekday_name(tomorrow)
         
         self.tray_icon.showMessage(
             "明日课程提醒",
-            f"明天 ({tomorrow.strftime('%m月%d日')} {weekday}) 有 {len(courses)} 节课"
+            f"明天 ({tomorrow.strftime('%m月%d日')} {weekday}) 有 {len(sessions)} 节课"
             f"{course_list}",
             QSystemTrayIcon.Information,
             15000
@@ -1337,84 +5730,75 @@ class CalendarApp(QMainWindow):
                 if days_to_spring > 0:
                     text += f"距离春季学期开学还有 {days_to_spring} 天\n"
         
-        courses = get_courses_on_date(today_date)
-        text += f"今日课程: {len(courses)}节" if courses else "今日无课"
+        sessions = data_manager.get_term_schedule().sessions_on(today_date)
+        text += f"今日课程: {len(sessions)}节" if sessions else "今日无课"
         
         self.date_label.setText(text)
     
     def update_today_courses_display(self):
-        today = date.today()
-        courses = get_courses_on_date(today)
-        semester, week_num = get_week_number(today)
-        class_times = data_manager.get_class_times()
-        
-        if not semester:
-            spring_start, _ = data_manager.get_semester_dates("spring")
-            if spring_start:
-                days = (spring_start - today).days
-                text = f"<b style='color:#E91E63;'>当前为假期</b><br><br>"
-                text += f"<span>距离开学还有 <b>{days}</b> 天</span>"
-            else:
-                text = "<b>当前为假期</b>"
-            self.today_course_label.setText(text)
-            return
-        
-        if not courses:
-            text = f"<b>第{week_num}周 {get_weekday_name(today)}</b><br><br>"
-            text += "<span style='color:#666;'>今日没有课程安排</span>"
+        text = self.renderer.today_panel(date.today())
+        if text != self.today_course_label.text():
             self.today_course_label.setText(text)
-            return
-        
-        text = f"<b>今日课程 (第{week_num}周 {get_weekday_name(today)})</b><br><br>"
-        
-        for course in courses:
-            sections = course.get("sections", [])
-            start_time = class_times.get(sections[0], ["?", "?"])[0] if sections else "?"
-            end_time = class_times.get(sections[-1], ["?", "?"])[1] if sections else "?"
-            sections_str = f"第{sections[0]}-{sections[-1]}节" if sections else ""
-            
-            text += f"<div style='margin-bottom:10px; padding:10px; background:#E3F2FD; border-radius:5px;'>"
-            text += f"<b style='color:#1565C0;'>{course.get('name')}</b><br>"
-            text += f"<span style='color:#666;'>时间: {start_time}-{end_time} ({sections_str})</span><br>"
-            text += f"<span style='color:#666;'>地点: {course.get('location')}</span>"
-            text += "</div>"
-        
-        self.today_course_label.setText(text)
     
     def populate_week_table(self):
         today = date.today()
         semester, week_num = get_week_number(today)
-        class_times = data_manager.get_class_times()
-        
-        for row in range(10):
-            time_str = class_times.get(row + 1, ["?", "?"])[0]
+        class_schedule = data_manager.get_class_schedule()
+        rows = class_schedule.max_section() or 10
+        self.week_table.setRowCount(rows)
+        # 节次时间重叠或顺序颠倒时在课表上提示
+        self.week_table.setToolTip("\n".join(class_schedule.problems))
+        
+        for row in range(rows):
+            time_str = class_schedule.default.start_text(row + 1)
             item = QTableWidgetItem(f"{row+1}节\n{time_str}")
             item.setTextAlignment(Qt.AlignCenter)
             self.week_table.setItem(row, 0, item)
         
-        for row in range(10):
+        for row in range(rows):
             for col in range(1, 8):
                 self.week_table.setItem(row, col, QTableWidgetItem(""))
         
-        display_week = week_num if semester else 1
+        # 列 -> 当天执行的 (星期几, 周次)；学期内按日期类型表处理放假和调休补课
+        headers = ["节次", *WEEKDAY_NAMES]
+        if semester:
+            day_table = data_manager.get_day_table()
+            monday = today - timedelta(days=today.weekday())
+            columns = {}
+            for col in range(1, 8):
+                info = day_table.day_info(monday + timedelta(days=col - 1))
+                if info and info.day_type != DAY_TEACHING:
+                    headers[col] += f"\n{info.describe()}"
+                    for row in range(rows):
+                        self.week_table.item(row, col).setBackground(QColor("#F5F5F5"))
+                if info and info.has_classes:
+                    columns[col] = (info.weekday, info.class_week)
+        else:
+            columns = {col: (col, 1) for col in range(1, 8)}
+        self.week_table.setHorizontalHeaderLabels(headers)
         
-        for course in data_manager.get_courses():
-            if display_week not in course.get("weeks", []):
-                continue
-            
-            weekday = course.get("weekday", 1)
-            for section in course.get("sections", []):
-                if section <= 10:
-                    name = course.get("name", "")[:6]
-                    loc = course.get("location", "")
-                    item = QTableWidgetItem(f"{name}\n{loc}")
-                    item.setTextAlignment(Qt.AlignCenter)
-                    item.setBackground(QColor("#E3F2FD"))
-                    item.setToolTip(f"{course.get('name')}\n{loc}\n{course.get('teacher')}")
-                    self.week_table.setItem(section - 1, weekday, item)
+        for col, (weekday, week) in columns.items():
+            bit = 1 << week
+            for course in data_manager.get_courses():
+                if course.weekday != weekday or not course.week_mask & bit:
+                    continue
+                self.fill_week_course(course, col, rows, class_schedule)
         
         self.week_table.resizeRowsToContents()
     
+    def fill_week_course(self, course, col, rows, class_schedule):
+        # 按星期或校区使用其他节次时间表的课程，提示中给出实际时间
+        span = class_schedule.for_course(course).span(course.sections[0], course.sections[-1]) \
+            if course.sections else None
+        time_text = f"\n{minutes_to_hm(span[0])}-{minutes_to_hm(span[1])}" if span else ""
+        for section in course.sections:
+            if section <= rows:
+                item = QTableWidgetItem(f"{course.name[:6]}\n{course.location}")
+                item.setTextAlignment(Qt.AlignCenter)
+                item.setBackground(QColor("#E3F2FD"))
+                item.setToolTip(f"{course.name}\n{course.location}\n{course.teacher}{time_text}")
+                self.week_table.setItem(section - 1, col, item)
+    
     def highlight_important_dates(self):
         # 清除旧的高亮
         self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
@@ -1424,12 +5808,20 @@ class CalendarApp(QMainWindow):
         highlight_format.setForeground(QColor("#333"))
         
         for item in data_manager.get_important_dates():
-            try:
-                event_date = datetime.strptime(item["date"], "%Y-%m-%d")
-                qdate = QDate(event_date.year, event_date.month, event_date.day)
-                self.calendar.setDateTextFormat(qdate, highlight_format)
-            except:
-                continue
+            qdate = QDate(item.day.year, item.day.month, item.day.day)
+            self.calendar.setDateTextFormat(qdate, highlight_format)
+        self.highlight_recurring_dates()
+    
+    def highlight_recurring_dates(self, *_):
+        """只展开日历当前页（含前后月份的日期格）内的重复日期"""
+        highlight_format = QTextCharFormat()
+        highlight_format.setBackground(QColor("#FFEB3B"))
+        highlight_format.setForeground(QColor("#333"))
+        
+        first = date(self.calendar.yearShown(), self.calendar.monthShown(), 1) - timedelta(days=7)
+        for item in data_manager.get_recurring_occurrences(first, first + timedelta(days=49)):
+            self.calendar.setDateTextFormat(QDate(item.day.year, item.day.month, item.day.day),
+                                            highlight_format)
     
     def highlight_course_dates(self):
         course_format = QTextCharFormat()
@@ -1453,86 +5845,556 @@ class CalendarApp(QMainWindow):
                 current += timedelta(days=1)
     
     def populate_events_table(self):
-        dates = data_manager.get_important_dates()
-        sorted_events = sorted(dates, key=lambda x: x.get("date", ""))
-        
-        self.events_table.setRowCount(len(sorted_events))
+        # 重复日期只展开两个学期覆盖的范围，没有设置学期时展开今后一年
+        first, last = data_manager.get_term_range()
+        if not first:
+            first = date.today()
+            last = first + timedelta(days=365)
+        self.events_model.set_events(
+            data_manager.get_important_dates() + data_manager.get_recurring_occurrences(first, last))
+        self.update_events_count()
+    
+    def filter_events_table(self, *_):
+        first = last = None
+        if self.events_range_checkbox.isChecked():
+            first = self.events_from.date().toString("yyyy-MM-dd")
+            last = self.events_to.date().toString("yyyy-MM-dd")
+        self.events_model.set_filter(self.events_category.currentData(), first, last,
+                                     self.events_search.text().strip())
+        self.update_events_count()
+    
+    def update_events_count(self):
+        self.events_count_label.setText(f"共 {self.events_model.total()} 条")
+    
+    def update_free_rooms(self):
+        """课表或节次时间变化后刷新楼栋列表、节次范围并重新查询"""
+        for spin in (self.room_section_from, self.room_section_to):
+            spin.blockSignals(True)
+            spin.setRange(1, self.room_index.max_sections)
+            spin.blockSignals(False)
+        current = self.room_building.currentData()
+        self.room_building.blockSignals(True)
+        self.room_building.clear()
+        self.room_building.addItem("全部楼栋", None)
+        for building in self.room_index.list_buildings():
+            self.room_building.addItem(building, building)
+        index = self.room_building.findData(current)
+        self.room_building.setCurrentIndex(max(index, 0))
+        self.room_building.blockSignals(False)
+        self.query_free_rooms()
+    
+    def query_free_rooms(self):
+        first = self.room_section_from.value()
+        last = max(first, self.room_section_to.value())
+        rooms = self.room_index.free_rooms(
+            self.room_week.value(), self.room_weekday.currentIndex() + 1,
+            range(first, last + 1), self.room_building.currentData()
+        )
+        self.free_rooms_label.setText(f"空闲教室 {len(rooms)} 间")
+        self.free_rooms_list.clear()
+        self.free_rooms_list.addItems(rooms)
+    
+    def update_teacher_view(self):
+        """课表或节次时间变化后刷新教师列表并重新查询"""
+        current = self.teacher_combo.currentText()
+        self.teacher_combo.blockSignals(True)
+        self.teacher_combo.clear()
+        self.teacher_combo.addItems(self.teacher_index.teachers())
+        index = self.teacher_combo.findText(current)
+        self.teacher_combo.setCurrentIndex(max(index, 0))
+        self.teacher_combo.blockSignals(False)
+        self.query_teacher_timetable()
+    
+    def run_search(self, *_):
+        text = self.search_edit.text()
+        sources = None
+        if not self.search_all_checkbox.isChecked():
+            sources = {"local"}
+        elif text.strip():
+            # 其他档案在第一次真正搜索时才加载，只建立一次索引，不常驻监听
+            for profile_id, _ in profile_manager.list_profiles():
+                if profile_id != profile_manager.active and profile_id not in self.search_other_profiles:
+                    self.search_other_profiles.add(profile_id)
+                    manager = profile_manager.get_manager(profile_id)
+                    self.search_index.sync_courses(profile_id, manager.get_courses())
+                    self.search_index.sync_events(profile_id, manager.get_important_dates(),
+                                                  manager.get_recurring_dates())
+        
+        self.search_results.clear()
+        for result in self.search_index.search(text, sources=sources):
+            text = f"[{'课程' if result.kind == 'course' else '日期'}] {result.title}    {result.detail}"
+            if result.source != "local":
+                text += f"    〔{profile_manager.get_display_name(result.source)}〕"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, result.day)
+            self.search_results.addItem(item)
+    
+    def on_profile_switched(self, profile_id):
+        """切换档案后其他档案的集合变了，丢弃它们的索引，下次搜索时重新加载"""
+        for source in self.search_other_profiles:
+            self.search_index.sync_courses(source, [])
+            self.search_index.sync_events(source, [])
+        self.search_other_profiles.clear()
+        self.run_search()
+    
+    def on_search_result_activated(self, item):
+        """重要日期的结果在日历中定位到该日期"""
+        day = item.data(Qt.UserRole)
+        if day:
+            qdate = QDate(day.year, day.month, day.day)
+            self.calendar.setSelectedDate(qdate)
+            self.on_date_clicked(qdate)
+    
+    def query_teacher_timetable(self):
+        teacher = self.teacher_combo.currentText()
+        week = self.teacher_week.value()
+        rows = data_manager.get_class_schedule().max_section() or 10
+        self.teacher_table.clearContents()
+        self.teacher_table.setRowCount(rows)
+        self.teacher_table.setVerticalHeaderLabels([f"{row}节" for row in range(1, rows + 1)])
+        if not teacher:
+            self.teacher_hours_label.setText("暂无教师数据")
+            self.teacher_conflict_label.setText("")
+            return
         
-        for row, item in enumerate(sorted_events):
-            try:
-                event_date = datetime.strptime(item["date"], "%Y-%m-%d").date()
-            except:
+        for weekday, section, record in self.teacher_index.timetable(teacher, week):
+            if not 1 <= section <= rows or not 1 <= weekday <= 7:
                 continue
-            
-            date_item = QTableWidgetItem(item["date"])
-            date_item.setTextAlignment(Qt.AlignCenter)
-            self.events_table.setItem(row, 0, date_item)
-            
-            semester, week_num = get_week_number(event_date)
-            week_text = f"第{week_num}周" if semester and week_num else "-"
-            week_item = QTableWidgetItem(week_text)
-            week_item.setTextAlignment(Qt.AlignCenter)
-            self.events_table.setItem(row, 1, week_item)
-            
-            event_item = QTableWidgetItem(item.get("event", ""))
-            self.events_table.setItem(row, 2, event_item)
-            
-            category = item.get("category", "")
-            category_item = QTableWidgetItem(category)
-            category_item.setTextAlignment(Qt.AlignCenter)
-            color = CATEGORY_COLORS.get(category, "#333")
-            category_item.setForeground(QColor(color))
-            self.events_table.setItem(row, 3, category_item)
+            cell = self.teacher_table.item(section - 1, weekday - 1)
+            text = f"{record.name[:6]}\n{record.location}"
+            if cell:
+                # 同一格有多门课说明时间冲突
+                cell.setText(f"{cell.text()}\n{text}")
+                cell.setBackground(QColor("#FFCDD2"))
+                continue
+            item = QTableWidgetItem(text)
+            item.setTextAlignment(Qt.AlignCenter)
+            item.setBackground(QColor("#E3F2FD"))
+            item.setToolTip(f"{record.name}\n{record.location}\n{record.teacher}")
+            self.teacher_table.setItem(section - 1, weekday - 1, item)
+        self.teacher_table.resizeRowsToContents()
+        
+        self.teacher_hours_label.setText(
+            f"第{week}周授课 {self.teacher_index.week_hours(teacher, week):.1f} 小时 | "
+            f"本学期共 {self.teacher_index.semester_hours(teacher):.1f} 小时"
+        )
+        conflicts = self.teacher_index.conflicts(teacher)
+        if conflicts:
+            weekday_names = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+            lines = [f"第{w}周{weekday_names[d - 1]}第{sec}节: "
+                     + "、".join(f"{name}({room})" for name, room in lectures)
+                     for _, w, d, sec, lectures in conflicts[:5]]
+            more = f" 等{len(conflicts)}处" if len(conflicts) > 5 else ""
+            self.teacher_conflict_label.setText("时间冲突" + more + "：" + "；".join(lines))
+        else:
+            self.teacher_conflict_label.setText("")
+    
+    def update_stats_view(self):
+        """按所选学期重新统计当前课表"""
+        semester = self.stats_semester.currentData()
+        stats = self.semester_stats = SemesterAnalytics(data_manager, semester).compute(
+            data_manager.get_courses())
+        busiest = "、".join(f"{day.month}月{day.day}日({minutes / 60:.1f}h)"
+                            for day, _, minutes in stats.busiest_days[:3])
+        free = " ".join(f"{WEEKDAY_NAMES[weekday - 1]}{count}"
+                        for weekday, count in sorted(stats.free_days_by_weekday.items()))
+        self.stats_summary_label.setText(
+            f"{stats.courses} 门课程，共 {stats.sessions} 课次、{stats.minutes / 60:.1f} 学时 | "
+            f"晚课 {stats.evening_sessions} 课次（{stats.evening_share:.1%}） | "
+            f"放假 {stats.holidays} 天，无课 {stats.free_days} 天（{free or '无'}）\n"
+            f"最忙的日期：{busiest or '无'}"
+        )
+        
+        weeks = len(stats.weekly_sessions) - 1
+        peak = max(stats.weekly_sessions, default=0) or 1
+        self.stats_weeks_table.setRowCount(weeks)
+        self.stats_weeks_table.setVerticalHeaderLabels([f"第{week}周" for week in range(1, weeks + 1)])
+        for row in range(weeks):
+            count = stats.weekly_sessions[row + 1]
+            values = (str(count), f"{stats.weekly_minutes[row + 1] / 60:.1f}",
+                      "█" * round(count * 20 / peak))
+            for column, value in enumerate(values):
+                self.stats_weeks_table.setItem(row, column, QTableWidgetItem(value))
+        
+        course_hours = stats.course_hours()
+        self.stats_courses_table.setRowCount(len(course_hours))
+        for row, (name, sessions, hours) in enumerate(course_hours):
+            for column, value in enumerate((name, str(sessions), f"{hours:.1f}")):
+                self.stats_courses_table.setItem(row, column, QTableWidgetItem(value))
+    
+    def export_stats(self):
+        stats = self.semester_stats
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出统计", f"{stats.name}统计.csv", "CSV文件 (*.csv)")
+        if not file_path:
+            return
+        try:
+            stats.write_csv(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "导出失败", str(e))
+            return
+        QMessageBox.information(self, "导出完成", f"统计已导出到 {file_path}")
     
     def on_date_clicked(self, qdate):
         selected = date(qdate.year(), qdate.month(), qdate.day())
-        selected_str = selected.strftime("%Y-%m-%d")
-        weekday = get_weekday_name(selected)
-        
-        semester, week_num = get_week_number(selected)
-        week_info = f" | {semester} 第{week_num}周 {weekday}" if semester and week_num else f" {weekday}"
+        text, has_items = self.renderer.day_detail(selected)
+        self.selected_date_label.setText(text)
         
-        text = f"<b>{selected.strftime('%Y年%m月%d日')}{week_info}</b><br>"
-        text += "━" * 25 + "<br>"
-        
-        events_on_date = [item for item in data_manager.get_important_dates() 
-                         if item.get("date") == selected_str]
-        if events_on_date:
-            for event in events_on_date:
-                color = CATEGORY_COLORS.get(event.get("category"), "#333")
-                text += f"<span style='color:{color};'>● {event.get('event')} ({event.get('category')})</span><br>"
-        
-        courses = get_courses_on_date(selected)
-        class_times = data_manager.get_class_times()
-        if courses:
-            text += "<br><b>课程安排:</b><br>"
-            for course in courses:
-                sections = course.get("sections", [])
-                start_time = class_times.get(sections[0], ["?"])[0] if sections else "?"
-                sections_str = f"第{sections[0]}-{sections[-1]}节" if sections else ""
-                text += f"<span style='color:#1565C0;'>● {course.get('name')}</span><br>"
-                text += f"  <span style='color:#666;'>{start_time} {sections_str} | {course.get('location')}</span><br>"
-        
-        if not events_on_date and not courses:
-            text += "<span style='color:#666;'>无安排</span>" if semester else "<span style='color:#666;'>假期</span>"
+        # 只有状态变化时才重新设置样式表，避免每次点击都重新解析样式
+        if has_items != self.selected_date_has_items:
+            self.selected_date_has_items = has_items
+            colors = ("#E8F5E9", "#4CAF50") if has_items else ("#FFF8E1", "#FFC107")
+            self.selected_date_label.setStyleSheet(SELECTED_DATE_STYLE % colors)
+
+# ==================== HTTP查询服务 ====================
+SERVER_CACHE_SIZE = 4096
+# 同一档案两次检查数据文件是否被修改的最小间隔（秒）
+SERVER_RELOAD_INTERVAL = 1.0
+
+HTTP_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request",
+                404: "Not Found", 405: "Method Not Allowed"}
+
+def course_payload(course, class_schedule):
+    """课程的JSON表示，附带按其星期和校区的节次时间表算出的起止时间"""
+    sections = course.sections
+    span = class_schedule.for_course(course).span(sections[0], sections[-1]) if sections else None
+    return {
+        "name": course.name,
+        "teacher": course.teacher,
+        "location": course.location,
+        "weekday": course.weekday,
+        "sections": list(sections),
+        "start": minutes_to_hm(span[0]) if span else None,
+        "end": minutes_to_hm(span[1]) if span else None,
+        "type": course.type,
+    }
+
+def date_payload(target_date, manager):
+    """某一天的周次、重要日期和课程"""
+    semester, week_num = get_week_number(target_date, manager)
+    date_str = target_date.strftime("%Y-%m-%d")
+    class_schedule = manager.get_class_schedule()
+    return {
+        "date": date_str,
+        "weekday": get_weekday_name(target_date),
+        "semester": semester,
+        "week": week_num,
+        "events": [item.to_dict() for item in manager.get_important_dates() if item.date == date_str]
+                  + [rule.occurrence(target_date).to_dict() for rule in manager.get_recurring_dates()
+                     if rule.occurs_on(target_date)],
+        "courses": [course_payload(course, class_schedule)
+                    for course in get_courses_on_date(target_date, manager)],
+    }
+
+def week_payload(semester, week_num, manager):
+    """某学期第N周每天的课程"""
+    start, _ = manager.get_semester_dates(semester)
+    if not start:
+        raise KeyError(semester)
+    monday = start - timedelta(days=start.weekday()) + timedelta(weeks=week_num - 1)
+    return {
+        "semester": semester,
+        "week": week_num,
+        "days": [date_payload(monday + timedelta(days=offset), manager) for offset in range(7)],
+    }
+
+def next_class_payload(now, manager):
+    """从now起的下一节课"""
+    session = manager.get_term_schedule().next_session(now)
+    info = None
+    if session:
+        info = course_payload(session.course, manager.get_class_schedule())
+        info["date"] = session.day.strftime("%Y-%m-%d")
+    return {"now": now.strftime("%Y-%m-%d %H:%M"), "next": info}
+
+def stats_payload(semester, manager):
+    """某学期的课表统计"""
+    return SemesterAnalytics(manager, semester).compute(manager.get_courses()).to_dict()
+
+def current_semester_key(now, manager):
+    return "spring" if get_week_number(now, manager)[0] == "春季学期" else "fall"
+
+class ScheduleServer:
+    """课表查询HTTP服务 - 基于asyncio的JSON接口，供校园门户查询
+    
+    响应带ETag并支持If-None-Match条件请求；生成的响应按 (档案, 接口, 日期/周次)
+    缓存在LRU中，数据代数变化后自动失效。
+    """
+    
+    def __init__(self, host="127.0.0.1", port=8765, cache_size=SERVER_CACHE_SIZE):
+        self.host = host
+        self.port = port
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.last_reload_check = {}
+        # 进程标识，保证重启后代数从头计数时ETag也不会与之前的重复
+        self.token = f"{os.getpid():x}{int(time.time()):x}"
+    
+    def run(self):
+        asyncio.run(self.serve_forever())
+    
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+    
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                parts = lines[0].split()
+                if len(parts) != 3:
+                    writer.write(self.build_response(400, {"error": "bad request"}))
+                    break
+                method, target, version = parts
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+                
+                status, body, etag = self.respond(method, target, headers)
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              if version == "HTTP/1.1"
+                              else headers.get("connection", "").lower() == "keep-alive")
+                writer.write(self.build_response(status, body, etag, keep_alive,
+                                                 head_only=method == "HEAD"))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    def build_response(self, status, body, etag=None, keep_alive=False, head_only=False):
+        if isinstance(body, dict):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        if status == 304:
+            body = b""
+        headers = [
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Cache-Control: no-cache",
+            "Access-Control-Allow-Origin: *",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if etag:
+            headers.append(f"ETag: {etag}")
+        head = ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1")
+        return head if head_only else head + body
+    
+    def get_manager(self, profile):
+        manager = profile_manager.get_manager(profile)
+        now = time.monotonic()
+        if now - self.last_reload_check.get(profile, 0) >= SERVER_RELOAD_INTERVAL:
+            self.last_reload_check[profile] = now
+            manager.reload_if_changed()
+        return manager
+    
+    def respond(self, method, target, headers):
+        """处理一个请求，返回 (状态码, 响应体, ETag)"""
+        if method not in ("GET", "HEAD"):
+            return 405, {"error": "method not allowed"}, None
+        path, _, query = target.partition("?")
+        params = parse_qs(query)
+        profile = params.get("profile", [profile_manager.active])[0]
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts[:1] != ["api"] or len(parts) < 2:
+            return 404, {"error": "not found"}, None
+        if parts[1] == "profiles":
+            return 200, {"active": profile_manager.active,
+                         "profiles": dict(profile_manager.list_profiles())}, None
         
-        self.selected_date_label.setText(text)
+        try:
+            manager = self.get_manager(profile)
+            now = datetime.now()
+            endpoint = parts[1]
+            if endpoint == "today":
+                today = now.date()
+                key = (profile, "date", today)
+                build = lambda: date_payload(today, manager)
+            elif endpoint == "date" and len(parts) == 3:
+                target_date = datetime.strptime(parts[2], "%Y-%m-%d").date()
+                key = (profile, "date", target_date)
+                build = lambda: date_payload(target_date, manager)
+            elif endpoint == "week" and len(parts) == 3:
+                week_num = int(parts[2])
+                semester = params.get("semester", [None])[0] or current_semester_key(now, manager)
+                key = (profile, "week", semester, week_num)
+                build = lambda: week_payload(semester, week_num, manager)
+            elif endpoint == "stats":
+                semester = params.get("semester", [None])[0] or current_semester_key(now, manager)
+                key = (profile, "stats", semester)
+                build = lambda: stats_payload(semester, manager)
+            elif endpoint == "next":
+                minute = now.replace(second=0, microsecond=0)
+                key = (profile, "next", minute)
+                build = lambda: next_class_payload(minute, manager)
+            else:
+                return 404, {"error": "not found"}, None
+            body, etag = self.cached_response(key, manager.generation, build)
+        except KeyError:
+            return 404, {"error": "not found"}, None
+        except ValueError:
+            return 400, {"error": "bad request"}, None
+        
+        if etag in headers.get("if-none-match", ""):
+            return 304, b"", etag
+        return 200, body, etag
+    
+    def cached_response(self, key, generation, build):
+        """取缓存的响应，数据代数变化后重新生成；超出容量时淘汰最久未用的"""
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] == generation:
+            self.cache.move_to_end(key)
+            return entry[1], entry[2]
+        body = json.dumps(build(), ensure_ascii=False).encode("utf-8")
+        etag = f'"{self.token}-{generation}-{zlib.crc32(body):08x}"'
+        self.cache[key] = (generation, body, etag)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return body, etag
+
+# ==================== 单实例 ====================
+# 主实例还在启动（首次运行向导、加载数据）时，后启动的实例最多等待这么久
+INSTANCE_FORWARD_SECONDS = 30
+INSTANCE_RETRY_INTERVAL = 0.2
+
+class SingleInstance:
+    """单实例控制 - 再次启动时把命令行参数转发给已运行的实例后退出"""
+    
+    def __init__(self):
+        user = os.environ.get("USERNAME") or os.environ.get("USER") or ""
+        self.server_name = f"{APP_KEY}-{user}"
+        self.lock = FileLock(os.path.join(get_data_dir(), "instance.lock"))
+        self.server = None
+        self.callback = None
+        # 主窗口创建之前收到的参数，设置callback后依次处理
+        self.pending = []
+    
+    def acquire(self):
+        """尝试成为主实例（进程退出前一直持有实例锁）"""
+        return self.lock.acquire(blocking=False)
+    
+    def acquire_or_forward(self, args, timeout=INSTANCE_FORWARD_SECONDS):
+        """成为主实例时返回True；否则把参数转发给主实例后返回False
         
-        style = """
-            QLabel {
-                background-color: %s;
-                padding: 15px;
-                border-radius: 8px;
-                border-left: 4px solid %s;
-            }
+        主实例可能还在启动、尚未开始监听，期间反复重试；主实例退出后由本进程接替。
+        超时仍无法转发时也返回False，后启动的实例不会再打开界面。
         """
-        if events_on_date or courses:
-            self.selected_date_label.setStyleSheet(style % ("#E8F5E9", "#4CAF50"))
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.acquire():
+                return True
+            if self.forward(args) or time.monotonic() >= deadline:
+                return False
+            time.sleep(INSTANCE_RETRY_INTERVAL)
+    
+    def forward(self, args, timeout=1000):
+        """把参数转发给已运行的实例，成功返回True"""
+        socket = QLocalSocket()
+        socket.connectToServer(self.server_name)
+        if not socket.waitForConnected(timeout):
+            return False
+        socket.write(json.dumps(args, ensure_ascii=False).encode("utf-8"))
+        socket.waitForBytesWritten(timeout)
+        socket.disconnectFromServer()
+        return True
+    
+    def listen(self):
+        """监听后续启动的实例，在主窗口创建之前调用，收到的参数先排队"""
+        # 上次异常退出可能残留套接字文件
+        QLocalServer.removeServer(self.server_name)
+        self.server = QLocalServer()
+        self.server.newConnection.connect(self.on_new_connection)
+        self.server.listen(self.server_name)
+    
+    def set_callback(self, callback):
+        """之后收到参数时调用callback(args)，并处理已排队的参数"""
+        self.callback = callback
+        pending, self.pending = self.pending, []
+        for args in pending:
+            callback(args)
+    
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.disconnected.connect(lambda socket=socket: self.on_message(socket))
+    
+    def on_message(self, socket):
+        try:
+            args = json.loads(bytes(socket.readAll()).decode("utf-8") or "[]")
+        except ValueError:
+            args = []
+        socket.deleteLater()
+        if self.callback is None:
+            self.pending.append(args)
         else:
-            self.selected_date_label.setStyleSheet(style % ("#FFF8E1", "#FFC107"))
+            self.callback(args)
+
+def parse_args(argv):
+    """解析命令行参数，未识别的参数留给Qt"""
+    parser = argparse.ArgumentParser(prog=APP_NAME)
+    parser.add_argument("--migrate-sqlite", action="store_true",
+                        help="把JSON数据文件迁移到SQLite数据库后退出")
+    parser.add_argument("--serve", action="store_true",
+                        help="以HTTP/JSON查询服务模式运行（不显示界面）")
+    parser.add_argument("--host", default="127.0.0.1", help="查询服务监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="查询服务端口")
+    parser.add_argument("--profile-resident", nargs="?", const="", metavar="REPORT",
+                        help="常驻监控：定期记录内存、唤醒次数和Qt对象数到报告文件")
+    parser.add_argument("--profile-interval", type=float, default=RESIDENT_SNAPSHOT_MINUTES,
+                        help="常驻监控的快照间隔（分钟）")
+    parser.add_argument("--stats", metavar="CSV", help="把课表统计导出为CSV后退出")
+    parser.add_argument("--semester", choices=("fall", "spring"), help="统计的学期，默认为当前学期")
+    parser.add_argument("--all-profiles", action="store_true",
+                        help="统计所有档案（不含归档）的课表，同一门课只计一次")
+    args, qt_args = parser.parse_known_args(argv[1:])
+    return args, argv[:1] + qt_args
 
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    if args.migrate_sqlite:
+        profile = profile_manager.active
+        dates_count, courses_count = migrate_json_to_sqlite(get_data_file(profile),
+                                                            get_database_file(profile))
+        print(f"已迁移到 {get_database_file(profile)}：{dates_count} 个重要日期，{courses_count} 门课程")
+        return
+    if args.stats:
+        semester = args.semester or current_semester_key(datetime.now(), data_manager)
+        analytics = SemesterAnalytics(data_manager, semester)
+        if args.all_profiles:
+            store = TimetableStore(data_manager)
+            store.load_profiles()
+            stats = analytics.compute_store(store)
+        else:
+            stats = analytics.compute(data_manager.get_courses())
+        stats.write_csv(args.stats)
+        print(f"已导出 {stats.name} 的统计到 {args.stats}：{stats.courses} 门课程，{stats.sessions} 课次")
+        return
+    if args.serve:
+        print(f"课表查询服务: http://{args.host}:{args.port}/api/today")
+        ScheduleServer(args.host, args.port).run()
+        return
+    
+    app = QApplication(qt_args)
+    
+    # 开机自启动后再手动启动时，只唤出已运行的实例
+    instance = SingleInstance()
+    if not instance.acquire_or_forward(sys.argv[1:]):
+        return
+    instance.listen()
+    
     app.setStyle('Fusion')
     app.setQuitOnLastWindowClosed(False)
     
@@ -1541,6 +6403,13 @@ def main():
     
     window = CalendarApp()
     window.show()
+    resident_report = args.profile_resident
+    if resident_report is None and os.environ.get(RESIDENT_PROFILE_ENV, "") not in ("", "0"):
+        resident_report = os.environ[RESIDENT_PROFILE_ENV]
+    if resident_report is not None:
+        report_path = resident_report if resident_report not in ("", "1") else None
+        window.resident_monitor = ResidentMonitor(window, report_path, args.profile_interval).start()
+    instance.set_callback(window.handle_instance_message)
     
     sys.exit(app.exec_())
 
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""pytest公共设置：无界面运行，每个测试使用自己的临时数据目录"""
+
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("CALENDAR_DATA_DIR", tempfile.mkdtemp(prefix="calendar_test_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sicau_calendar as sc  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CALENDAR_DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def write_data(data_dir):
+    """写入数据文件：默认设置加上给出的数据段，不带示例课程和重要日期，返回文件路径"""
+    def write(path=None, **sections):
+        document = json.loads(json.dumps(sc.DEFAULT_DATA))
+        document.update(courses=[], important_dates=[])
+        document.update(sections)
+        path = path or sc.get_data_file()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False)
+        return path
+    return write
+
+
+@pytest.fixture
+def open_manager(write_data):
+    """打开数据文件的DataManager，文件不存在时先写入空课表"""
+    def open_file(path=None):
+        path = path or sc.get_data_file()
+        if not os.path.exists(path):
+            write_data(path)
+        return sc.DataManager(backend=sc.JsonFileBackend(path))
+    return open_file
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""学期统计"""
+
+import csv
+from datetime import date, timedelta
+
+import sicau_calendar as sc
+
+
+def course(name, weekday, sections, weeks):
+    return sc.Course(name, "张老师", "10-101", weekday, sections, weeks, "必修")
+
+
+def naive_minutes(manager, courses):
+    """逐日计算的学时，作为对照"""
+    start, end = manager.get_semester_dates("fall")
+    times = manager.get_class_schedule().default
+    total = 0
+    day = start
+    while day <= end:
+        total += sum(times.duration(item.sections) for item in sc.get_courses_on_date(day, manager))
+        day += timedelta(days=1)
+    return total
+
+
+def test_reduction_matches_day_by_day_totals(write_data, open_manager):
+    write_data(important_dates=[{"date": "2025-10-01", "event": "国庆节", "category": "节日",
+                                 "end_date": "2025-10-03"}])
+    manager = open_manager()
+    courses = [course("高等数学", 1, (1, 2), range(1, 17)), course("大学英语", 3, (3, 4), range(1, 9)),
+               course("大学英语", 3, (3, 4), range(1, 9)), course("晚间讲座", 4, (9, 10), (2, 4)),
+               course("未知节次", 5, (12,), (1,))]
+    manager.set_courses(courses)
+    stats = sc.SemesterAnalytics(manager, "fall").compute(manager.get_courses())
+    # 节次不在时间表中的课程不计入
+    assert stats.courses == 4
+    assert stats.minutes == naive_minutes(manager, courses)
+    # 国庆节放假是第4周周三到周五，第4周的晚课也停了
+    assert stats.weekly_sessions[4] == 1 and stats.weekly_sessions[3] == 3
+    assert stats.evening_sessions == 1
+    assert stats.holidays == 3
+    assert stats.course_hours()[0][0] == "高等数学"
+    assert stats.busiest_days[0][0].weekday() == 2
+
+
+def test_csv_export(open_manager, tmp_path):
+    manager = open_manager()
+    manager.set_courses([course("高等数学", 1, (1, 2), (1,))])
+    stats = sc.SemesterAnalytics(manager, "fall").compute(manager.get_courses())
+    path = tmp_path / "stats.csv"
+    stats.write_csv(str(path))
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["项目", "数值"] and ["课次", "1"] in rows
+    assert [date(2025, 9, 8).strftime("%Y-%m-%d"), "周一", "1", "1.67"] in rows
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""编译后的节次时间表"""
+
+from datetime import datetime
+
+import sicau_calendar as sc
+
+CAMPUS_TABLES = {
+    "成都校区": {"campus": "成都", "times": {"1": ["08:30", "09:15"], "2": ["09:20", "10:05"],
+                                            "11": ["20:00", "20:45"]}},
+    "周五": {"weekdays": [5], "times": {"1": ["09:00", "09:45"], "2": ["09:40", "10:30"]}},
+}
+
+
+def test_default_and_additional_tables(write_data, open_manager):
+    write_data(class_time_tables=CAMPUS_TABLES)
+    schedule = open_manager().get_class_schedule()
+    assert schedule.default.span(1, 2) == (8 * 60, 9 * 60 + 45)
+    assert schedule.default.duration((1, 2)) == 100
+    chengdu = sc.Course("高等数学", weekday=1, sections=(1, 2), extra={"campus": "成都"})
+    assert schedule.for_course(chengdu).span(1, 2) == (8 * 60 + 30, 10 * 60 + 5)
+    assert schedule.table_for(5).start_text(1) == "09:00"
+    assert schedule.table_for(3) is schedule.default
+    assert schedule.max_section() == 11
+    # 周五的表第2节早于第1节结束
+    assert len(schedule.problems) == 1
+
+
+def test_schedule_follows_generation(write_data, open_manager):
+    manager = open_manager()
+    schedule = manager.get_class_schedule()
+    assert manager.get_class_schedule() is schedule
+    # 其他程序修改了节次时间，重新加载后重新编译
+    write_data(class_times={"1": ["07:50", "08:40"], "2": ["08:45", "09:35"]})
+    assert "class_times" in manager.reload_if_changed()
+    assert manager.get_class_schedule() is not schedule
+    assert manager.get_class_times() == {1: ("07:50", "08:40"), 2: ("08:45", "09:35")}
+    manager.set_courses([sc.Course("高等数学", "张老师", "101", 1, (1, 2), (1,))])
+    current = manager.get_term_schedule().current_session(datetime(2025, 9, 8, 9, 30))
+    assert (current.start_time, current.end_time) == ("07:50", "09:35")
+
+
+def test_campus_survives_shared_course_keys():
+    chengdu = sc.Course("高等数学", "张老师", "101", 1, (1, 2), (1,), extra={"campus": "成都"})
+    yaan = sc.Course("高等数学", "张老师", "101", 1, (1, 2), (1,), extra={"campus": "雅安"})
+    assert chengdu.key() != yaan.key()
+    assert sc.Course.from_key(chengdu.key()).extra == {"campus": "成都"}
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""学期日期类型表：放假、调休补课和考试"""
+
+from datetime import date
+
+import sicau_calendar as sc
+
+
+def course(name, weekday):
+    return sc.Course(name, "张老师", "10-101", weekday, (1, 2), range(1, 17), "必修")
+
+
+def test_makeup_day_follows_the_given_weekday_and_week(write_data, open_manager):
+    # 第5周周六补第4周周三的课，国庆节放假
+    write_data(
+        important_dates=[{"date": "2025-10-01", "event": "国庆节", "category": "节日",
+                          "end_date": "2025-10-03"}],
+        day_overrides=[{"date": "2025-10-11", "type": "makeup", "weekday": 3, "week": 4}])
+    manager = open_manager()
+    table = manager.get_day_table()
+    assert table.class_day(date(2025, 10, 11)) == (3, 4)
+    assert table.class_day(date(2025, 10, 12)) == (7, 5)
+    assert [table.class_day(date(2025, 10, day)) for day in (1, 2, 3)] == [None] * 3
+    assert table.class_day(date(2025, 9, 8)) == (1, 1)
+
+    wednesday = course("高等数学", 3)
+    manager.add_course(wednesday)
+    assert sc.get_courses_on_date(date(2025, 10, 11), manager) == [wednesday]
+    assert sc.get_courses_on_date(date(2025, 10, 1), manager) == []
+
+
+def test_only_day_off_categories_cancel_classes(write_data, open_manager):
+    events = [("2025-09-10", "教师节", "节日"), ("2025-09-11", "校运动会 体育节", "节日"),
+              ("2025-09-12", "第3节 班会", "上课"), ("2025-09-15", "寒假开始", "假期"),
+              ("2025-09-16", "停课一天", "放假"), ("2025-10-01", "国庆节", "节日")]
+    write_data(important_dates=[
+        {"date": day, "event": event, "category": category} for day, event, category in events])
+    table = open_manager().get_day_table()
+    cancelled = [event for day, event, _ in events
+                 if table.class_day(date.fromisoformat(day)) is None]
+    assert cancelled == ["停课一天", "国庆节"]
+
+
+def test_bare_keywords_do_not_pick_day_off_categories():
+    assert sc.map_event_category("", "第3节 班会") == "上课"
+    assert sc.map_event_category("", "教师节") != "放假"
+    assert sc.map_event_category("", "请假说明") == "上课"
+    assert sc.map_event_category("", "国庆节") == "节日"
+    assert sc.map_event_category("", "国庆节放假") == "放假"
+
+
+def test_overrides(write_data, open_manager):
+    write_data(
+        important_dates=[{"date": "2025-11-03", "event": "运动会", "category": "放假"}],
+        day_overrides=[{"date": "2025-11-03", "type": "teaching"},
+                       {"date": "2025-09-28", "type": "makeup", "weekday": 5}])
+    table = open_manager().get_day_table()
+    # 手动设置优先于类别；补课日不写周次时按所在的周
+    assert table.class_day(date(2025, 11, 3)) == (1, 9)
+    assert table.class_day(date(2025, 9, 28)) == (5, 3)
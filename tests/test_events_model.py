@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""重要日期表格模型"""
+
+from datetime import date, timedelta
+
+from PyQt5.QtCore import QModelIndex, Qt
+
+import sicau_calendar as sc
+
+
+def events(count):
+    first = date(2025, 9, 1)
+    categories = ("考试", "节日", "实践")
+    return [sc.ImportantDate((first + timedelta(days=n % 300)).isoformat(), f"活动{n}",
+                             categories[n % 3]) for n in range(count)]
+
+
+def test_filters_run_on_the_index():
+    index = sc.EventIndex(events(900))
+    rows = index.select(category="考试", first="2025-10-01", last="2025-10-31")
+    assert rows and all(index.events[row].category == "考试" for row in rows)
+    assert all("2025-10-01" <= index.dates[row] <= "2025-10-31" for row in rows)
+    assert [index.events[row].event for row in index.select(text="活动899")] == ["活动899"]
+
+
+def test_rows_are_fetched_in_batches_and_sorted(open_manager):
+    model = sc.EventTableModel(open_manager())
+    model.set_events(events(600))
+    assert model.total() == 600 and model.rowCount() == sc.EVENT_FETCH_BATCH
+    while model.canFetchMore(QModelIndex()):
+        model.fetchMore(QModelIndex())
+    assert model.rowCount() == 600
+    # 2025-09-08 是秋季学期第1周
+    row = next(row for row in range(600) if model.event_at(row).date == "2025-09-08")
+    assert model.data(model.index(row, 1)) == "第1周"
+
+    model.sort(3, Qt.DescendingOrder)
+    assert model.rowCount() == sc.EVENT_FETCH_BATCH
+    categories = [model.event_at(row).category for row in range(model.total())]
+    assert categories == sorted(categories, reverse=True)
+    # 同一类别内仍按日期排列
+    dates = [model.event_at(row).date for row in range(200)]
+    assert dates == sorted(dates)
+    model.set_filter(text="活动1")
+    assert all(model.event_at(row).event.startswith("活动1") for row in range(model.total()))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""ICS/CSV流式导入"""
+
+import pytest
+
+import sicau_calendar as sc
+
+
+def write_text(path, text, encoding="utf-8"):
+    with open(path, "w", encoding=encoding, newline="") as f:
+        f.write(text)
+    return str(path)
+
+
+def ics(*events):
+    body = "".join("BEGIN:VEVENT\r\n" + "".join(line + "\r\n" for line in event) + "END:VEVENT\r\n"
+                   for event in events)
+    return "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + body + "END:VCALENDAR\r\n"
+
+
+def test_all_day_events_keep_multi_day_end_date(open_manager, tmp_path):
+    manager = open_manager()
+    path = write_text(tmp_path / "calendar.ics", ics(
+        ["DTSTART;VALUE=DATE:20251001", "DTEND;VALUE=DATE:20251008", "SUMMARY:国庆节",
+         "CATEGORIES:节日"],
+        ["DTSTART;VALUE=DATE:20251110", "DTEND;VALUE=DATE:20251111", "SUMMARY:期末考试"],
+        ["DTSTART;VALUE=DATE:20251201", "SUMMARY:学籍注册\\, 报到",
+         "BEGIN:VALARM", "TRIGGER:-PT15M", "END:VALARM"]))
+    assert sc.CalendarFileImporter(manager).import_file(path) == (3, 0)
+    dates = {item.event: item for item in manager.get_important_dates()}
+    assert dates["国庆节"].extra == {"end_date": "2025-10-07"}
+    assert dates["国庆节"].category == "节日"
+    assert dates["期末考试"].extra is None and dates["期末考试"].category == "考试"
+    assert dates["学籍注册, 报到"].category == "注册"
+
+
+def test_timed_events_are_merged_into_courses(open_manager, tmp_path):
+    manager = open_manager()
+    # 2025-09-08 是秋季学期第1周周一，08:00-09:45 对应第1-2节
+    sessions = [[f"DTSTART:202509{day:02d}T080000", f"DTEND:202509{day:02d}T094500",
+                 "SUMMARY:高等数学", "LOCATION:10-101", "DESCRIPTION:张老师"] for day in (8, 15, 29)]
+    path = write_text(tmp_path / "courses.ics", ics(*sessions))
+    assert sc.CalendarFileImporter(manager).import_file(path) == (0, 1)
+    course, = manager.get_courses()
+    assert (course.name, course.teacher, course.location) == ("高等数学", "张老师", "10-101")
+    assert course.weekday == 1 and course.sections == (1, 2) and list(course.weeks) == [1, 2, 4]
+
+
+def test_csv_in_batches(open_manager, tmp_path):
+    manager = open_manager()
+    rows = "".join(f"2025-10-{day:02d},活动{day},实践\n" for day in range(1, 31))
+    path = write_text(tmp_path / "dates.csv", "日期,事件,类别\n" + rows)
+    assert sc.CalendarFileImporter(manager, batch_size=7).import_file(path) == (30, 0)
+    assert [item.event for item in manager.get_important_dates()] == [f"活动{day}" for day in range(1, 31)]
+    assert (sc.encode_document(sc.DataManager().data)["important_dates"]
+            == sc.encode_document(manager.data)["important_dates"])
+
+
+def test_gbk_course_csv(open_manager, tmp_path):
+    manager = open_manager()
+    path = write_text(tmp_path / "courses.csv",
+                      "课程名,教师,教室,星期,节次,周次\n大学英语,李老师,7-302,周三,3-4,1-8\n",
+                      encoding="gbk")
+    assert sc.CalendarFileImporter(manager).import_file(path) == (0, 1)
+    course, = manager.get_courses()
+    assert course.name == "大学英语" and course.weekday == 3
+    assert course.sections == (3, 4) and list(course.weeks) == list(range(1, 9))
+
+
+def test_mixed_encodings_are_rejected(open_manager, tmp_path):
+    manager = open_manager()
+    path = tmp_path / "mixed.csv"
+    # 前面是UTF-8，后面夹着一段两种编码都无法解码的字节
+    path.write_bytes("日期,事件,类别\n2025-10-01,国庆节,节日\n".encode("utf-8") + b"\xff\xff\n")
+    with pytest.raises(ValueError):
+        sc.CalendarFileImporter(manager).import_file(str(path))
+    assert manager.get_important_dates() == []
+
+
+def test_excel_courses(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    wb.active.append(["课程名", "教师", "教室", "星期", "节次", "周次"])
+    wb.active.append(["高等数学", "张老师", "10-101", "周二", "3-4", "1-8"])
+    wb.active.append([None, "空行"])
+    wb.active.append(["体育"])
+    path = str(tmp_path / "courses.xlsx")
+    wb.save(path)
+    first, second = sc.read_excel_courses(path)
+    assert (first.name, first.weekday, first.sections, list(first.weeks)) == (
+        "高等数学", 2, (3, 4), list(range(1, 9)))
+    # 缺少的列使用默认值
+    assert (second.weekday, second.sections, len(second.weeks)) == (1, (1, 2), 16)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""文件锁和单实例控制"""
+
+import sicau_calendar as sc
+
+
+def test_file_lock_is_exclusive_and_reentrant(tmp_path):
+    path = str(tmp_path / "data.lock")
+    first, second = sc.FileLock(path), sc.FileLock(path, timeout=0)
+    with first:
+        with first:
+            assert not second.acquire(blocking=False)
+        assert not second.acquire()
+    assert second.acquire(blocking=False)
+    second.release()
+
+
+def test_second_instance_does_not_start_when_forwarding_fails(data_dir):
+    primary, secondary = sc.SingleInstance(), sc.SingleInstance()
+    assert primary.acquire_or_forward([])
+    try:
+        # 主实例还没有开始监听，转发超时后也不会接替为主实例
+        assert not secondary.acquire_or_forward(["--show"], timeout=0)
+    finally:
+        primary.lock.release()
+    assert secondary.acquire_or_forward([], timeout=0)
+    secondary.lock.release()
+
+
+def test_messages_before_window_are_queued(data_dir):
+    instance = sc.SingleInstance()
+    instance.pending.append(["--show"])
+    received = []
+    instance.set_callback(received.append)
+    assert received == [["--show"]] and instance.pending == []
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""数据模型"""
+
+import pytest
+
+import sicau_calendar as sc
+
+COURSE = {"name": "高等数学", "teacher": "张老师", "location": "101", "weekday": 1,
+          "sections": [1, 2], "weeks": [1, 2, 3], "type": "必修"}
+
+
+def test_document_round_trips_with_extra_fields():
+    document = sc.encode_document(sc.decode_document(sc.DEFAULT_DATA))
+    document["courses"] = [dict(COURSE, campus="雅安")]
+    document["important_dates"] = [{"date": "2025-10-01", "event": "国庆节", "category": "节日",
+                                    "end_date": "2025-10-07"}]
+    data = sc.decode_document(document)
+    course, = data["courses"]
+    assert course.name == "高等数学" and course.extra == {"campus": "雅安"}
+    assert course.week_mask == 0b1110
+    assert sc.encode_document(data) == document
+
+
+def test_courses_share_tuples_and_strings():
+    first, second = sc.Course.from_dict(COURSE), sc.Course.from_dict(dict(COURSE, name="线性代数"))
+    assert first.sections is second.sections and first.weeks is second.weeks
+    assert first.teacher is second.teacher
+
+
+def test_invalid_records_are_rejected(open_manager):
+    manager = open_manager()
+    for bad in ({"weekday": 8}, {"sections": ["一"]}, {"weeks": [0]}):
+        with pytest.raises(ValueError):
+            sc.Course.from_dict(dict(COURSE, **bad))
+    with pytest.raises(ValueError):
+        manager.set_important_dates([{"date": "2025-13-01", "event": "错误"}])
+    with pytest.raises(ValueError):
+        sc.Semester.from_dict({"name": "秋季", "start_date": "2026-01-01", "end_date": "2025-09-01"})
+    # 设置时接受模型或字典
+    manager.set_courses([COURSE, sc.Course.from_dict(dict(COURSE, name="线性代数"))])
+    assert [course.name for course in manager.get_courses()] == ["高等数学", "线性代数"]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""日期详情和今日课程面板"""
+
+from datetime import date
+
+import sicau_calendar as sc
+
+
+def test_day_detail_is_cached_until_data_changes(open_manager):
+    manager = open_manager()
+    manager.add_course({"name": "高等数学", "teacher": "张老师", "location": "10-101", "weekday": 1,
+                        "sections": [1, 2], "weeks": [1], "type": "必修"})
+    renderer = sc.PanelRenderer(manager)
+    # 2025-09-08 是秋季学期第1周周一
+    day = date(2025, 9, 8)
+    text, has_items = renderer.day_detail(day)
+    assert has_items and "高等数学" in text and "08:00 第1-2节 | 10-101" in text
+    assert renderer.day_detail(day)[0] is text
+    manager.add_important_date("2025-09-08", "开学典礼", "开学")
+    text, _ = renderer.day_detail(day)
+    assert "开学典礼 (开学)" in text
+    assert not renderer.day_detail(date(2025, 9, 9))[1]
+    assert "假期" in renderer.day_detail(date(2025, 8, 1))[0]
+
+
+def test_today_panel(open_manager):
+    manager = open_manager()
+    renderer = sc.PanelRenderer(manager)
+    assert "今日没有课程安排" in renderer.today_panel(date(2025, 9, 8))
+    # 两个学期之间显示距春季学期开学的天数
+    assert "<b>12</b> 天" in renderer.today_panel(date(2026, 2, 18))
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""耗时记录"""
+
+import json
+
+import sicau_calendar as sc
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = sc.Profiler()
+    timed = profiler.timed("计时")(lambda value: value * 2)
+    assert timed(3) == 6 and profiler.call("调用", len, "abc") == 3
+    with profiler.span("代码段"):
+        pass
+    assert profiler.histograms == {} and not profiler.events
+
+
+def test_histograms_and_exports(tmp_path):
+    profiler = sc.Profiler(enabled=True)
+    for milliseconds in (0.5, 3, 3, 3000):
+        profiler.record("保存", 0.0, milliseconds / 1e3)
+    profiler.call("调用", sorted, [3, 1, 2])
+    histogram = dict(profiler.summary())["保存"]
+    assert histogram.count == 4 and histogram.max == 3000
+    assert histogram.percentile(0.5) == 5
+    # 超出最后一个桶时取最大值
+    assert histogram.percentile(1.0) == 3000
+
+    profiler.export_json(str(tmp_path / "timings.json"))
+    with open(tmp_path / "timings.json", encoding="utf-8") as f:
+        timings = json.load(f)["timings"]
+    assert list(timings) == ["保存", "调用"] and timings["保存"]["count"] == 4
+    profiler.export_chrome_trace(str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json", encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    assert len(events) == 5 and {event["ph"] for event in events} == {"X"}
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""档案和学年归档"""
+
+import os
+from datetime import date
+
+import pytest
+
+import sicau_calendar as sc
+
+COURSE = {"name": "高等数学", "teacher": "张老师", "location": "101", "weekday": 1,
+          "sections": [1, 2], "weeks": [1, 2, 3], "type": "必修"}
+
+
+@pytest.fixture
+def profiles(open_manager, monkeypatch):
+    manager = open_manager()
+    # 当前档案的数据管理器是全局的data_manager
+    monkeypatch.setattr(sc, "data_manager", manager)
+    manager.add_course(COURSE)
+    manager.add_important_date("2025-10-01", "国庆节", "节日")
+    return sc.ProfileManager(), manager
+
+
+def test_attach_does_not_write_manifest(profiles):
+    profile_manager, manager = profiles
+    profile_manager.attach(manager)
+    assert not os.path.exists(profile_manager.manifest_file)
+    manager.add_course(dict(COURSE, name="线性代数"))
+    assert profile_manager.get_info(sc.DEFAULT_PROFILE)["courses"] == 2
+    assert os.path.exists(profile_manager.manifest_file)
+
+
+def test_new_profile_keeps_settings_but_not_records(profiles):
+    profile_manager, manager = profiles
+    profile_id = profile_manager.create_profile("二班", "2026-2027", template=manager)
+    created = profile_manager.get_manager(profile_id)
+    assert created.get_academic_year() == "2026-2027"
+    assert (sc.encode_document(created.data)["semesters"]
+            == sc.encode_document(manager.data)["semesters"])
+    assert created.get_courses() == [] and created.get_important_dates() == []
+
+
+def test_archive_is_read_only_and_unchanged(profiles):
+    profile_manager, manager = profiles
+    profile_manager.attach(manager)
+    archive_id = profile_manager.archive_profile(sc.DEFAULT_PROFILE)
+    archive = profile_manager.get_manager(archive_id)
+    before = sc.encode_document(archive.data)
+    assert archive.read_only and before["courses"] == sc.encode_document(manager.data)["courses"]
+    with pytest.raises(PermissionError):
+        archive.add_course(dict(COURSE, name="线性代数"))
+    with pytest.raises(PermissionError):
+        archive.remove_courses([0])
+    with pytest.raises(PermissionError):
+        archive.add_recurring_date({"date": "2025-09-10", "event": "例会"})
+    with pytest.raises(PermissionError):
+        archive.set_school_info("其他学校", "2026-2027")
+    with pytest.raises(PermissionError):
+        with archive.batch():
+            archive.set_courses([])
+    # 拒绝修改时内存中的数据保持不变
+    assert sc.encode_document(archive.data) == before
+
+
+def test_new_profile_starts_without_dated_records(write_data, open_manager, data_dir):
+    template = open_manager(write_data(
+        str(data_dir / "template.json"), courses=[COURSE],
+        recurring_dates=[{"date": "2025-09-10", "event": "例会", "category": "实践"}],
+        day_overrides=[{"date": "2025-10-11", "type": "makeup", "weekday": 3}]))
+    profile_manager = sc.ProfileManager()
+    created = profile_manager.get_manager(profile_manager.create_profile("张三", "2026-2027",
+                                                                        template=template))
+    assert created.get_courses() == [] and created.get_recurring_dates() == []
+    assert created.data.get("day_overrides", []) == []
+    assert created.get_day_table().class_day(date(2025, 10, 11)) == (6, 5)
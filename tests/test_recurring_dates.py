@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""重复的重要日期"""
+
+from datetime import date
+
+import sicau_calendar as sc
+
+
+
+def rule(start, repeat, **fields):
+    return sc.RecurringDate.from_dict(dict(date=start, event="测试", category="其他",
+                                           repeat=repeat, **fields))
+
+
+def test_yearly_on_feb_29_only_occurs_in_leap_years():
+    days = list(rule("2024-02-29", "yearly").occurrences(date(2024, 1, 1), date(2032, 12, 31)))
+    assert days == [date(2024, 2, 29), date(2028, 2, 29), date(2032, 2, 29)]
+    assert not rule("2024-02-29", "yearly").occurs_on(date(2025, 3, 1))
+
+
+def test_monthly_on_31st_skips_short_months():
+    days = list(rule("2025-01-31", "monthly").occurrences(date(2025, 1, 1), date(2025, 6, 30)))
+    assert days == [date(2025, 1, 31), date(2025, 3, 31), date(2025, 5, 31)]
+
+
+def test_monthly_on_29th_in_february():
+    days = list(rule("2023-12-29", "monthly").occurrences(date(2024, 2, 1), date(2025, 2, 28)))
+    assert date(2024, 2, 29) in days
+    assert all(day.month != 2 or day.year == 2024 for day in days)
+
+
+def test_weekly_range_starts_between_occurrences():
+    weekly = rule("2025-09-01", "weekly", interval=2, until="2025-10-27", **{"except": ["2025-09-29"]})
+    days = list(weekly.occurrences(date(2025, 9, 10), date(2025, 12, 31)))
+    assert days == [date(2025, 9, 15), date(2025, 10, 13), date(2025, 10, 27)]
+    assert all(weekly.occurs_on(day) for day in days)
+
+
+def test_occurrences_agree_with_occurs_on():
+    for item in (rule("2024-02-29", "yearly", interval=2), rule("2025-01-30", "monthly", interval=3),
+                 rule("2025-09-03", "weekly", interval=3, until="2026-05-01")):
+        first, last = date(2024, 6, 1), date(2027, 6, 1)
+        expected = [date.fromordinal(n) for n in range(first.toordinal(), last.toordinal() + 1)
+                    if item.occurs_on(date.fromordinal(n))]
+        assert list(item.occurrences(first, last)) == expected
+
+
+def test_day_table_marks_recurring_holidays_only_inside_semesters(write_data, open_manager):
+    write_data(recurring_dates=[
+        {"date": "2024-09-10", "event": "校庆", "category": "放假", "repeat": "yearly"}])
+    table = open_manager().get_day_table()
+    assert table.class_day(date(2025, 9, 10)) is None
+    assert table.day_info(date(2025, 9, 10)).note == "校庆"
+    # 学期开始前和两个学期之间没有日期项
+    assert table.day_info(date(2025, 9, 7)) is None
+    assert table.day_info(date(2026, 2, 1)) is None
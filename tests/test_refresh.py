@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""主窗口的定时刷新时刻"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import sicau_calendar as sc
+
+
+class Settings:
+    def __init__(self, **values):
+        self.values = values
+
+    def value(self, key, default=None, type=None):
+        return self.values.get(key, default)
+
+
+def next_refresh(now, alarm=True):
+    window = SimpleNamespace(settings=Settings(alarm_enabled=alarm))
+    return sc.CalendarApp.next_refresh_time(window, now)
+
+
+def test_countdown_steps():
+    assert [sc.countdown_step(m) for m in (90, 60, 45, 30, 12, 5, 1)] == [None, 60, 60, 30, 15, 5, 5]
+
+
+def test_refresh_wakes_only_at_boundaries(open_manager, monkeypatch):
+    manager = open_manager()
+    manager.set_courses([{"name": "高等数学", "teacher": "张老师", "location": "10-101", "weekday": 1,
+                          "sections": [1, 2], "weeks": [1], "type": "必修"}])
+    monkeypatch.setattr(sc, "data_manager", manager)
+    # 2025-09-08 是秋季学期第1周周一，第1节08:00开始、第2节09:45下课
+    wakeups = []
+    now = datetime(2025, 9, 8, 6, 30)
+    while now < datetime(2025, 9, 8, 11, 0):
+        now = next_refresh(now, alarm=False)
+        wakeups.append(now.strftime("%H:%M"))
+    # 开课前按倒计时档位唤醒，上课期间最多等待一小时
+    assert wakeups == ["07:00", "07:30", "07:45", "07:55", "08:00", "09:00", "09:45", "10:45", "11:45"]
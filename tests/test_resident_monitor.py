@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""常驻进程监控"""
+
+import json
+import tracemalloc
+
+import pytest
+from PyQt5.QtWidgets import QApplication
+
+import sicau_calendar as sc
+
+
+@pytest.fixture
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_snapshots_are_appended_and_rotated(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(sc, "RESIDENT_REPORT_BYTES", 200)
+    report = tmp_path / "diagnostics" / "resident_report.jsonl"
+    monitor = sc.ResidentMonitor(report_path=str(report))
+    tracing = tracemalloc.is_tracing()
+    tracemalloc.start()
+    try:
+        first = monitor.snapshot()
+        second = monitor.snapshot()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    assert first["top_growth"] == [] and monitor.first is first
+    assert second["since_start"]["widget_growth"] == 0
+    # 第一份快照已超过上限，第二份写入前滚动
+    assert json.loads((tmp_path / "diagnostics" / "resident_report.jsonl.1").read_text("utf-8"))
+    lines = report.read_text("utf-8").splitlines()
+    assert len(lines) == 1 and json.loads(lines[0])["qt"]["widgets"] == second["qt"]["widgets"]
+
+
+def test_summary_reports_growth_per_hour():
+    def entry(time, memory, wakeups):
+        return {"time": time, "memory_kb": memory, "wakeups": {"refresh": wakeups},
+                "qt": {"widgets": 10, "table_items": 5}}
+    summary = sc.ResidentMonitor.summary(entry("2025-09-08T08:00:00", 100.0, 3),
+                                         entry("2025-09-08T10:00:00", 150.5, 13))
+    assert summary == {"hours": 2.0, "memory_growth_kb": 50.5, "widget_growth": 0,
+                       "table_item_growth": 0, "wakeups_per_hour": 5.0}
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""空教室索引"""
+
+import sicau_calendar as sc
+
+
+def course(name, location, weekday=3, sections=(3, 4), weeks=range(1, 17)):
+    return {"name": name, "teacher": "张老师", "location": location, "weekday": weekday,
+            "sections": list(sections), "weeks": list(weeks), "type": "必修"}
+
+
+def test_room_names_are_normalized():
+    assert sc.normalize_room(" 第一教学楼１０１ ") == "第一教学楼101"
+    assert sc.normalize_room("10—101") == sc.normalize_room("10-101")
+    assert sc.split_building("第一教学楼101") == ("第一教学楼", "101")
+
+
+def test_free_rooms_follow_course_changes(open_manager):
+    manager = open_manager()
+    manager.set_courses([course("高等数学", "第一教学楼101"), course("体育", "第二教学楼201"),
+                         course("大学英语", "第一教学楼102", weekday=2)])
+    index = sc.RoomIndex().attach(manager)
+    assert index.list_buildings() == ["第一教学楼", "第二教学楼"]
+    assert index.free_rooms(7, 3, [3, 4]) == ["第一教学楼102"]
+    assert index.free_rooms(7, 3, [1, 2]) == ["第一教学楼101", "第一教学楼102", "第二教学楼201"]
+    assert index.free_rooms(7, 3, [4], building="第一教学楼") == ["第一教学楼102"]
+    manager.set_courses(manager.get_courses()[1:])
+    assert index.free_rooms(7, 3, [3, 4]) == ["第一教学楼102"]
+    assert "第一教学楼101" not in index.display_names
+
+
+def test_masks_widen_for_late_periods(open_manager):
+    manager = open_manager()
+    manager.set_courses([course("高等数学", "101", sections=(1, 2))])
+    index = sc.RoomIndex().attach(manager)
+    assert index.max_sections == 16
+    manager.add_course(course("晚课", "101", sections=(17, 18)))
+    assert index.max_sections == 18
+    assert not index.is_free("101", 1, 3, [1]) and not index.is_free("101", 1, 3, [18])
+    assert index.is_free("101", 1, 3, [16])
+    manager.add_course(course("夜课", "102", sections=(70,)))
+    assert not index.is_free("102", 1, 3, [70]) and not index.is_free("101", 1, 3, [17])
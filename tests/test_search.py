@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""搜索索引"""
+
+import sicau_calendar as sc
+
+
+def course(name, teacher="张老师", location="10-101"):
+    return sc.Course(name, teacher, location, 1, (1, 2), range(1, 17), "必修")
+
+
+def search_titles(index, query):
+    return sorted((result.kind, result.title) for result in index.search(query, limit=1000))
+
+
+def test_incremental_index_matches_rebuilt_index(open_manager):
+    manager = open_manager()
+    index = sc.SearchIndex().attach(manager)
+    manager.extend_courses([course("高等数学"), course("高等数学"), course("大学物理", teacher="李老师")])
+    manager.add_important_date("2025-10-01", "国庆节", "节日")
+    manager.set_courses(manager.get_courses()[1:])
+    manager.add_course(course("数学建模", location="7-302"))
+
+    rebuilt = sc.SearchIndex().attach(manager)
+    for query in ("数学", "gdsx", "李", "7-302", "国庆", "物理", "高"):
+        assert search_titles(index, query) == search_titles(rebuilt, query)
+    assert len(index) == len(rebuilt)
+    # 两条相同的课程共用一个文档，删除其中一条后仍能搜到
+    assert search_titles(index, "高等数学") == [("course", "高等数学")]
+
+
+def test_other_profiles_are_searched_by_source(open_manager):
+    index = sc.SearchIndex().attach(open_manager())
+    index.sync_courses("二班", [course("线性代数")])
+    index.sync_events("二班", [sc.ImportantDate("2025-10-01", "国庆节", "节日")])
+    assert [result.source for result in index.search("xxds")] == ["二班"]
+    assert index.search("国庆", sources={"local"}) == []
+    index.sync_courses("二班", [])
+    index.sync_events("二班", [])
+    assert index.search("xxds") == [] and len(index) == 0
+
+
+def test_listeners_receive_appended_and_removed_records(open_manager):
+    manager = open_manager()
+    calls = []
+    manager.add_listener(lambda sections, deltas: calls.append((sections, deltas)))
+    added = course("高等数学")
+    manager.add_course(added)
+    with manager.batch():
+        manager.add_course(added)
+        manager.remove_courses([0])
+        manager.set_school_info("甲大学", "2025-2026")
+    manager.set_courses([])
+    assert calls[0] == ({"courses"}, {"courses": [([added], ())]})
+    assert calls[1][1] == {"courses": [([added], ()), ((), [added])]}
+    # 整体替换的数据段没有增量，监听器需要重新读取
+    assert calls[2] == ({"courses"}, {})
+
+
+def test_deleting_one_of_two_identical_records_keeps_the_document(open_manager):
+    manager = open_manager()
+    index = sc.SearchIndex().attach(manager)
+    manager.extend_courses([course("高等数学"), course("高等数学"), course("大学物理")])
+    manager.remove_courses([0, 2])
+    assert search_titles(index, "gdsx") == [("course", "高等数学")]
+    manager.remove_courses([0])
+    assert index.search("高等数学") == []
+    assert len(index) == len(sc.SearchIndex().attach(manager))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""HTTP课表查询服务"""
+
+import json
+
+import pytest
+
+import sicau_calendar as sc
+
+# 2025-09-08 是秋季学期第1周周一
+COURSE = {"name": "高等数学", "teacher": "张老师", "location": "10-101", "weekday": 1,
+          "sections": [1, 2], "weeks": list(range(1, 17)), "type": "必修"}
+
+
+@pytest.fixture
+def server(open_manager, monkeypatch):
+    manager = open_manager()
+    manager.add_course(COURSE)
+    monkeypatch.setattr(sc, "data_manager", manager)
+    return sc.ScheduleServer(), manager
+
+
+def get(server, target, **headers):
+    status, body, etag = server.respond("GET", target, headers)
+    # 错误响应的响应体是字典，由build_response编码
+    return status, json.loads(body) if isinstance(body, bytes) and body else body, etag
+
+
+def test_date_lists_courses_with_times(server):
+    server, _ = server
+    status, body, etag = get(server, "/api/date/2025-09-08")
+    assert status == 200 and etag
+    assert body["semester"] == "秋季学期" and body["week"] == 1
+    assert [(c["name"], c["start"], c["end"]) for c in body["courses"]] == [("高等数学", "08:00", "09:45")]
+    assert get(server, "/api/date/2025-09-09")[1]["courses"] == []
+
+
+def test_etag_is_revalidated_until_data_changes(server):
+    server, manager = server
+    _, _, etag = get(server, "/api/week/1?semester=fall")
+    assert get(server, "/api/week/1?semester=fall", **{"if-none-match": etag})[0] == 304
+    manager.add_course(dict(COURSE, name="大学英语", weekday=2))
+    status, body, new_etag = get(server, "/api/week/1?semester=fall", **{"if-none-match": etag})
+    assert status == 200 and new_etag != etag
+    assert [c["name"] for c in body["days"][1]["courses"]] == ["大学英语"]
+
+
+def test_errors(server):
+    server, _ = server
+    assert get(server, "/api/date/2025-13-01")[0] == 400
+    assert get(server, "/api/week/1?semester=summer")[0] == 404
+    assert get(server, "/api/unknown")[0] == 404
+    assert server.respond("POST", "/api/today", {})[0] == 405
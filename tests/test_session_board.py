@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""所有租户的当前/下一节课程看板"""
+
+from datetime import datetime
+
+import sicau_calendar as sc
+
+
+def course(name, sections, weekday=1):
+    return {"name": name, "teacher": "张老师", "location": "10-101", "weekday": weekday,
+            "sections": list(sections), "weeks": list(range(1, 17)), "type": "必修"}
+
+
+def names(state):
+    return tuple(item[2].name if item else None for item in state)
+
+
+def test_board_follows_the_day(open_manager):
+    store = sc.TimetableStore(open_manager())
+    store.set_tenant("a", [course("高等数学", (1, 2)), course("大学英语", (3, 4))])
+    store.set_tenant("b", [course("大学英语", (3, 4))])
+    store.set_tenant("c", [course("体育", (1, 2), weekday=2)])
+    board = sc.SessionBoard(store)
+    # 2025-09-08 是秋季学期第1周周一
+    states = board.snapshot(datetime(2025, 9, 8, 7, 0))
+    assert set(states) == {"a", "b"}
+    assert names(states["a"]) == (None, "高等数学") and names(states["b"]) == (None, "大学英语")
+    assert board.advance(datetime(2025, 9, 8, 8, 0)) == {"a"}
+    assert names(board.state("a")) == ("高等数学", "大学英语")
+    assert board.advance(datetime(2025, 9, 8, 9, 50)) == {"a"}
+    assert names(board.state("a")) == (None, "大学英语")
+    assert board.advance(datetime(2025, 9, 8, 9, 55)) == set()
+    assert board.advance(datetime(2025, 9, 8, 10, 5)) == {"a", "b"}
+    assert names(board.state("b")) == ("大学英语", None)
+    assert names(board.state("c")) == (None, None)
+
+
+def test_board_rebuilds_after_tenant_changes(open_manager):
+    store = sc.TimetableStore(open_manager())
+    store.set_tenant("a", [course("高等数学", (1, 2))])
+    board = sc.SessionBoard(store)
+    board.snapshot(datetime(2025, 9, 8, 7, 0))
+    store.set_tenant("b", [course("大学英语", (3, 4))])
+    assert names(board.snapshot(datetime(2025, 9, 8, 7, 1))["b"]) == (None, "大学英语")
+    # 换到第二天（周二）时重新生成
+    assert board.snapshot(datetime(2025, 9, 9, 7, 0)) == {}
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""JSON数据文件的二进制快照"""
+
+import os
+
+import pytest
+
+import sicau_calendar as sc
+
+
+def sample_data():
+    return sc.decode_document(dict(
+        sc.DEFAULT_DATA,
+        courses=[dict(name=f"课程{n}", teacher="王老师", location="10-101", weekday=n % 7 + 1,
+                      sections=[1, 2], weeks=list(range(1, 17)), campus="雅安" if n % 2 else "成都")
+                 for n in range(50)],
+        important_dates=[{"date": "2025-10-01", "event": "国庆节", "category": "节日",
+                          "end_date": "2025-10-07"}],
+        recurring_dates=[{"date": "2024-02-29", "event": "测试", "category": "其他",
+                          "repeat": "yearly", "except": ["2028-02-29"]}],
+        day_overrides=[{"date": "2025-10-11", "type": "makeup", "weekday": 3, "week": 4}]))
+
+
+def file_source(path):
+    with open(path, "rb") as f:
+        return sc.snapshot_source(os.fstat(f.fileno()), f.read())
+
+
+@pytest.fixture
+def source(write_data):
+    return write_data(**sc.encode_document(sample_data()))
+
+
+def test_snapshot_round_trip(source):
+    data = sample_data()
+    snapshot = sc.snapshot_path_for(source)
+    sc.write_snapshot(snapshot, file_source(source), data)
+    loaded = sc.read_snapshot(snapshot, source)
+    assert loaded is not None
+    assert sc.encode_document(loaded) == sc.encode_document(data)
+
+
+def test_snapshot_ignored_after_data_file_changes(source, write_data):
+    snapshot = sc.snapshot_path_for(source)
+    sc.write_snapshot(snapshot, file_source(source), sample_data())
+    # 只改修改时间时按内容哈希判断，仍然有效
+    os.utime(source, ns=(0, 0))
+    assert sc.read_snapshot(snapshot, source) is not None
+    write_data(source, school_name="另一所学校")
+    assert sc.read_snapshot(snapshot, source) is None
+
+
+def test_backend_rewrites_snapshot_on_save(source, open_manager, monkeypatch):
+    monkeypatch.setattr(sc, "SNAPSHOT_MIN_RECORDS", 10)
+    manager = open_manager(source)
+    assert os.path.exists(sc.snapshot_path_for(source))
+    manager.add_course({"name": "高等数学", "weekday": 1, "sections": [1, 2], "weeks": [1]})
+    manager.set_school_info("甲大学", "2025-2026")
+    expected = sc.encode_document(manager.data)
+    assert sc.encode_document(sc.read_snapshot(sc.snapshot_path_for(source), source)) == expected
+    assert sc.encode_document(open_manager(source).data) == expected
+
+
+def test_snapshot_not_stale_when_file_is_replaced_during_load(source, write_data, monkeypatch):
+    monkeypatch.setattr(sc, "SNAPSHOT_MIN_RECORDS", 10)
+    document = sc.encode_document(sample_data())
+    decode = sc.decode_document
+
+    def replace_while_loading(raw):
+        # 同步软件在读取之后、写快照之前替换了数据文件
+        monkeypatch.setattr(sc, "decode_document", decode)
+        write_data(source, **dict(document, school_name="另一所学校"))
+        return decode(raw)
+    monkeypatch.setattr(sc, "decode_document", replace_while_loading)
+    assert sc.JsonFileBackend(source).load()["school_name"] != "另一所学校"
+    assert sc.JsonFileBackend(source).load()["school_name"] == "另一所学校"
+
+
+def test_snapshot_not_stale_when_file_is_replaced_after_save(source, write_data, open_manager,
+                                                             monkeypatch):
+    monkeypatch.setattr(sc, "SNAPSHOT_MIN_RECORDS", 10)
+    manager = open_manager(source)
+    write = sc.write_snapshot
+
+    def replace_then_write(*args):
+        write_data(source, school_name="另一所学校")
+        write(*args)
+    monkeypatch.setattr(sc, "write_snapshot", replace_then_write)
+    manager.set_school_info("甲大学", "2025-2026")
+    assert sc.JsonFileBackend(source).load()["school_name"] == "另一所学校"
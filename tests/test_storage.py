@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""JSON和SQLite存储后端"""
+
+import sicau_calendar as sc
+
+COURSE = {"name": "高等数学", "teacher": "张老师", "location": "101", "weekday": 1,
+          "sections": [1, 2], "weeks": [1, 2, 3], "type": "必修"}
+
+
+def count_calls(monkeypatch, backend, *names):
+    calls = []
+    for name in names:
+        method = getattr(backend, name)
+
+        def wrapper(*args, _name=name, _method=method):
+            calls.append(_name)
+            return _method(*args)
+        monkeypatch.setattr(backend, name, wrapper)
+    return calls
+
+
+def test_migrated_sqlite_matches_json(write_data, data_dir):
+    json_path = write_data(courses=[COURSE],
+                           important_dates=[{"date": "2025-10-01", "event": "国庆节", "category": "节日"}])
+    db_path = str(data_dir / "calendar.db")
+    assert sc.migrate_json_to_sqlite(json_path, db_path) == (1, 1)
+    backend = sc.SqliteBackend(db_path)
+    try:
+        assert (sc.encode_document(backend.load())
+                == sc.encode_document(sc.JsonFileBackend(json_path).load()))
+        assert [course.to_dict() for course in backend.query_courses(week=2, weekday=1)] == [COURSE]
+        assert backend.query_courses(week=4) == []
+    finally:
+        backend.close()
+
+
+def test_sqlite_batch_replays_row_writes(monkeypatch, data_dir):
+    db_path = str(data_dir / "calendar.db")
+    manager = sc.DataManager(backend=sc.SqliteBackend(db_path))
+    manager.save_data()
+    manager.set_courses([COURSE])
+    calls = count_calls(monkeypatch, manager.backend, "save", "append_records", "replace_records")
+    with manager.batch():
+        manager.set_important_dates([{"date": "2025-10-01", "event": "国庆节", "category": "节日"}])
+        manager.extend_important_dates([{"date": "2026-01-10", "event": "期末考试", "category": "考试"}])
+        manager.add_course(dict(COURSE, name="线性代数"))
+        assert calls == []
+    assert calls == ["replace_records", "append_records", "append_records"]
+    manager.backend.close()
+    reopened = sc.SqliteBackend(db_path)
+    try:
+        # 追加扩展了同一个列表，替换时写入的是当时的副本，不会重复
+        assert sc.encode_document(reopened.load()) == sc.encode_document(manager.data)
+    finally:
+        reopened.close()
+
+
+def test_json_batch_saves_once(monkeypatch, open_manager):
+    manager = open_manager()
+    calls = count_calls(monkeypatch, manager.backend, "save", "save_settings", "append_records")
+    with manager.batch():
+        manager.set_school_info("四川农业大学", "2025-2026")
+        manager.add_course(COURSE)
+        manager.add_important_date("2025-10-01", "国庆节", "节日")
+    assert calls == ["save"]
+    assert (sc.encode_document(sc.JsonFileBackend(sc.get_data_file()).load())
+            == sc.encode_document(manager.data))
+
+
+def test_sqlite_deletes_only_the_removed_rows(monkeypatch, data_dir):
+    db_path = str(data_dir / "calendar.db")
+    manager = sc.DataManager(backend=sc.SqliteBackend(db_path))
+    manager.save_data()
+    manager.set_courses([dict(COURSE, name=name) for name in ("高等数学", "大学英语", "线性代数")])
+    calls = count_calls(monkeypatch, manager.backend, "save", "replace_records", "delete_records")
+    manager.remove_courses([0, 2])
+    assert calls == ["delete_records"]
+    manager.backend.close()
+    reopened = sc.SqliteBackend(db_path)
+    try:
+        assert [course.name for course in reopened.load()["courses"]] == ["大学英语"]
+        assert [course.name for course in reopened.query_courses(week=1)] == ["大学英语"]
+    finally:
+        reopened.close()
+
+
+def test_record_list_model_removes_ranges():
+    model = sc.RecordListModel(str)
+    model.set_records(range(6))
+    removed = []
+    model.rowsAboutToBeRemoved.connect(lambda parent, first, last: removed.append((first, last)))
+    model.remove_rows([0, 1, 4])
+    assert model.records == [2, 3, 5] and removed == [(4, 4), (0, 1)]
+    model.insert_records(1, [9])
+    assert model.data(model.index(1)) == "9"
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""多个实例同时修改数据文件时的重新加载和合并"""
+
+import sicau_calendar as sc
+
+
+def course(name, weekday=1, teacher="张老师", location="10-101", **extra):
+    return sc.Course(name, teacher, location, weekday, (1, 2), range(1, 17), extra=extra or None)
+
+
+def names(courses):
+    return sorted(item.name for item in courses)
+
+
+def test_merge_records_keeps_both_sides():
+    a, b, c = course("高等数学"), course("大学英语"), course("线性代数")
+    base = sc.section_fingerprint("courses", [a])
+    merged = sc.merge_records(base, [a, b], [a, c])
+    assert names(merged) == ["大学英语", "线性代数", "高等数学"]
+
+
+def test_merge_records_local_delete_wins_over_unchanged_record():
+    a, b = course("高等数学"), course("大学英语")
+    base = sc.section_fingerprint("courses", [a, b])
+    assert names(sc.merge_records(base, [b], [a, b])) == ["大学英语"]
+
+
+def test_merge_records_keeps_duplicates_from_theirs():
+    a = course("高等数学")
+    base = sc.section_fingerprint("courses", [])
+    assert len(sc.merge_records(base, [], [a, a])) == 2
+
+
+def test_concurrent_appends_are_merged(open_manager):
+    first, second = open_manager(), open_manager()
+    first.add_course(course("高等数学"))
+    second.add_course(course("大学英语"))
+    expected = ["大学英语", "高等数学"]
+    assert names(second.get_courses()) == expected
+    assert names(open_manager().get_courses()) == expected
+    assert first.reload_if_changed() == {"courses"}
+    assert names(first.get_courses()) == expected
+
+
+def test_concurrent_delete_and_append_are_merged(open_manager):
+    open_manager().set_courses([course("高等数学"), course("大学英语")])
+    first, second = open_manager(), open_manager()
+    first.remove_courses([0])
+    second.add_course(course("线性代数"))
+    assert names(open_manager().get_courses()) == ["大学英语", "线性代数"]
+
+
+def test_courses_differing_only_in_extra_fields_are_distinct(open_manager):
+    first, second = open_manager(), open_manager()
+    first.add_course(course("高等数学", campus="雅安"))
+    second.add_course(course("高等数学", campus="成都"))
+    merged = open_manager().get_courses()
+    assert sorted(item.extra["campus"] for item in merged) == ["成都", "雅安"]
+
+
+def test_conflicting_setting_keeps_local_value(open_manager):
+    first, second = open_manager(), open_manager()
+    first.set_school_info("甲大学", "2025-2026")
+    second.set_school_info("乙大学", "2025-2026")
+    assert open_manager().get_school_name() == "乙大学"
+
+
+def test_unrelated_setting_and_records_are_merged(open_manager):
+    first, second = open_manager(), open_manager()
+    first.set_school_info("甲大学", "2025-2026")
+    second.add_course(course("高等数学"))
+    reloaded = open_manager()
+    assert reloaded.get_school_name() == "甲大学"
+    assert names(reloaded.get_courses()) == ["高等数学"]
+
+
+def test_batch_merges_external_changes(open_manager):
+    first, second = open_manager(), open_manager()
+    second.add_course(course("大学英语"))
+    with first.batch():
+        first.add_course(course("高等数学"))
+        first.set_school_info("甲大学", "2025-2026")
+    reloaded = open_manager()
+    assert names(reloaded.get_courses()) == ["大学英语", "高等数学"]
+    assert reloaded.get_school_name() == "甲大学"
+
+
+def test_file_replaced_while_loading_is_reloaded(write_data, monkeypatch):
+    path = write_data()
+    backend = sc.JsonFileBackend(path)
+    load = backend.load
+
+    def load_then_replace():
+        data = load()
+        write_data(path, school_name="另一所学校")
+        return data
+    monkeypatch.setattr(backend, "load", load_then_replace)
+    manager = sc.DataManager(backend=backend)
+    monkeypatch.setattr(backend, "load", load)
+    assert "school_name" in manager.reload_if_changed()
+    assert manager.get_school_name() == "另一所学校"
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""教师工作量索引"""
+
+import sicau_calendar as sc
+
+
+def course(name, teacher="张老师", location="10-101", weekday=1, sections=(1, 2), weeks=range(1, 17)):
+    return {"name": name, "teacher": teacher, "location": location, "weekday": weekday,
+            "sections": list(sections), "weeks": list(weeks), "type": "必修"}
+
+
+def test_hours_and_co_taught_courses(open_manager):
+    manager = open_manager()
+    manager.set_courses([course("高等数学", weeks=range(1, 9)),
+                         course("线性代数", teacher="张老师、李老师", weekday=3)])
+    index = sc.TeacherIndex(manager).attach(manager)
+    assert index.teachers() == sorted(["张老师", "李老师"])
+    # 第1、2节共100分钟
+    assert index.week_hours("张老师", 1) == 200 / 60 and index.week_hours("张老师", 9) == 100 / 60
+    assert index.semester_hours("李老师") == 16 * 100 / 60
+    timetable = index.timetable("张老师", 1)
+    assert [(day, section) for day, section, _ in timetable] == [(1, 1), (1, 2), (3, 1), (3, 2)]
+    manager.set_courses(manager.get_courses()[:1])
+    assert index.teachers() == ["张老师"] and index.semester_hours("张老师") == 8 * 100 / 60
+
+
+def test_conflicts_depend_on_course_identity(open_manager):
+    manager = open_manager()
+    index = sc.TeacherIndex(manager).attach(manager)
+    # 同一门课在同一教室合班上课（两个班各有一条记录）不算冲突
+    manager.set_courses([course("高等数学", weeks=[1]),
+                         course("高等数学", teacher="张老师、李老师", weeks=[1])])
+    assert index.conflicts() == []
+    # 不同的课即使在同一教室也是冲突
+    manager.add_course(course("线性代数", weeks=[1], sections=(2,)))
+    assert index.conflicts("张老师") == [
+        ("张老师", 1, 1, 2, sorted([("线性代数", "10-101"), ("高等数学", "10-101")]))]
+    # 同一门课在不同教室也是冲突
+    manager.set_courses([course("高等数学", weeks=[1]), course("高等数学", location="10-102", weeks=[1])])
+    assert [conflict[3] for conflict in index.conflicts()] == [1, 2]
+    manager.set_courses(manager.get_courses()[:1])
+    assert index.conflicts() == []
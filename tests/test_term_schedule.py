@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""学期课次时间表"""
+
+from datetime import date, datetime
+
+import sicau_calendar as sc
+
+
+def course(name, weekday, sections, weeks):
+    return sc.Course(name, "张老师", "10-101", weekday, sections, weeks, "必修")
+
+
+def test_current_and_next_session(open_manager):
+    manager = open_manager()
+    manager.set_courses([course("高等数学", 1, (1, 2), [1, 2]), course("大学英语", 1, (3, 4), [1]),
+                         course("体育", 3, (1, 2), [1])])
+    schedule = manager.get_term_schedule()
+    # 2025-09-08 是秋季学期第1周周一
+    assert schedule.current_session(datetime(2025, 9, 8, 7, 59)) is None
+    assert schedule.next_session(datetime(2025, 9, 8, 7, 59)).course.name == "高等数学"
+    current = schedule.current_session(datetime(2025, 9, 8, 9, 0))
+    assert current.course.name == "高等数学"
+    assert (current.start_time, current.end_time) == ("08:00", "09:45")
+    assert schedule.current_session(datetime(2025, 9, 8, 9, 50)) is None
+    assert schedule.next_session(datetime(2025, 9, 8, 12, 0)).day == date(2025, 9, 10)
+    assert [s.course.name for s in schedule.sessions_on(date(2025, 9, 15))] == ["高等数学"]
+    # 课程不区分学期，秋季学期之后是春季学期第1周（2026-03-02）
+    assert schedule.next_session(datetime(2025, 9, 15, 12, 0)).day == date(2026, 3, 2)
+    assert schedule.next_session(datetime(2026, 3, 9, 12, 0)) is None
+
+
+def test_schedule_is_cached_until_data_changes(open_manager):
+    manager = open_manager()
+    manager.set_courses([course("高等数学", 1, (1, 2), [1])])
+    schedule = manager.get_term_schedule()
+    assert manager.get_term_schedule() is schedule
+    manager.add_course(course("大学英语", 1, (3, 4), [1]))
+    assert len(manager.get_term_schedule().sessions_on(date(2025, 9, 8))) == 2
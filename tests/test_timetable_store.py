@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""多租户课表存储"""
+
+import json
+from datetime import date
+
+import sicau_calendar as sc
+
+
+def course(name, weekday=1, weeks=range(1, 17)):
+    return {"name": name, "teacher": "张老师", "location": "10-101", "weekday": weekday,
+            "sections": [3, 4] if name == "大学英语" else [1, 2], "weeks": list(weeks), "type": "必修"}
+
+
+def test_identical_courses_share_one_record(open_manager):
+    store = sc.TimetableStore(open_manager())
+    store.set_tenant("a", [course("高等数学"), course("大学英语")])
+    store.set_tenant("b", [course("高等数学")])
+    assert store.stats() == {"tenants": 2, "records": 2, "references": 3}
+    assert store.tenant_records("a")[0] is store.tenant_records("b")[0]
+
+
+def test_records_are_recycled_when_unused(open_manager):
+    store = sc.TimetableStore(open_manager())
+    store.set_tenant("a", [course("高等数学")])
+    store.set_tenant("a", [course("线性代数")])
+    assert store.stats()["records"] == 1
+    store.set_tenant("b", [course("大学英语")])
+    # 释放的编号被重新使用
+    assert len(store.records) == 2 and None not in store.records
+
+
+def test_courses_on_uses_week_and_weekday(open_manager, tmp_path):
+    manager = open_manager()
+    folder = tmp_path / "timetables"
+    folder.mkdir()
+    (folder / "s1.json").write_text(json.dumps(
+        [course("大学英语"), course("高等数学"), course("物理", weekday=2), course("体育", weeks=[2])]),
+        encoding="utf-8")
+    store = sc.TimetableStore(manager)
+    store.load_directory(str(folder))
+    # 2025-09-08 是秋季学期第1周周一，第2周的同一天是 2025-09-15
+    assert [r.name for r in store.courses_on("s1", date(2025, 9, 8))] == ["高等数学", "大学英语"]
+    assert [r.name for r in store.courses_on("s1", date(2025, 9, 15))] == ["高等数学", "体育", "大学英语"]
+    assert store.courses_on("s1", date(2025, 8, 1)) == []
+    # 学期设置变化后周次缓存失效
+    manager.set_semester("fall", "秋季学期", "2025-09-01", "2026-01-18")
+    assert [r.name for r in store.courses_on("s1", date(2025, 9, 8))] == ["高等数学", "体育", "大学英语"]